@@ -1,29 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlmodel import Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from cache import TTLCache
 from database import get_session
 from models import User
 import os
+import time
+import revisions
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "insecure_default_key_change_me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 1 month
 
+# Authenticated users, keyed by token subject (email). Entries are dropped
+# explicitly on user mutations; other workers notice through the "users"
+# revision, checked at most every AUTH_CACHE_REVALIDATE seconds.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60")),
+)
+AUTH_CACHE_REVALIDATE = float(os.getenv("AUTH_CACHE_REVALIDATE", "2"))
+_users_revision = {"valeur": None, "checked_at": 0.0}
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# bcrypt runs on its own small pool so that login bursts cannot take the
+# whole request threadpool. Beyond PASSWORD_HASH_QUEUE pending hashes,
+# requests are rejected with 503 instead of piling up.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER = "1"
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+class HashStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.count = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.pending >= PASSWORD_HASH_QUEUE:
+                self.rejected += 1
+                return False
+            self.pending += 1
+            return True
+
+    def release(self, elapsed: float):
+        with self._lock:
+            self.pending -= 1
+            self.count += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "workers": PASSWORD_HASH_WORKERS,
+                "queue_limit": PASSWORD_HASH_QUEUE,
+                "pending": self.pending,
+                "count": self.count,
+                "rejected": self.rejected,
+                "avg_ms": 1000 * self.total_seconds / self.count if self.count else 0.0,
+                "max_ms": 1000 * self.max_seconds,
+            }
+
+hash_stats = HashStats()
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def _run_hash(fn, *args):
+    if not hash_stats.try_acquire():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, retry later",
+            headers={"Retry-After": PASSWORD_HASH_RETRY_AFTER},
+        )
+    # Latency includes the wait for a free hashing thread
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        hash_stats.release(time.perf_counter() - start)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_hash(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_hash(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,7 +118,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -48,12 +132,33 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     except JWTError:
         raise credentials_exception
 
-    user = session.query(User).filter(User.email == email).first()
+    await _revalidate_user_cache(session)
+    user = user_cache.get(email)
     if user is None:
-        raise credentials_exception
+        user = (await session.exec(select(User).where(User.email == email))).first()
+        if user is None:
+            raise credentials_exception
+        # Detached copy: safe to share between requests
+        user = user_cache.put(email, User(**user.model_dump()))
     return user
 
-def get_current_admin(current_user: User = Depends(get_current_user)):
+async def _revalidate_user_cache(session: AsyncSession):
+    now = time.monotonic()
+    if now - _users_revision["checked_at"] < AUTH_CACHE_REVALIDATE:
+        return
+    valeur = await session.run_sync(revisions.current, revisions.USERS)
+    if valeur != _users_revision["valeur"]:
+        user_cache.clear()
+    _users_revision.update(valeur=valeur, checked_at=now)
+
+async def commit_user_change(session: AsyncSession, user: User):
+    """Commit une modification d'utilisateur et invalide son entrée en cache."""
+    session.add(user)
+    await session.run_sync(revisions.bump, revisions.USERS)
+    await session.commit()
+    user_cache.invalidate(user.email)
+
+async def get_current_admin(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,282 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import DateTime, and_, func, literal, union_all
+from sqlmodel import Session, select
+
+import revisions
+from models import Objet, Reservation
+
+RESERVATION_DURATION = timedelta(days=7)
+DAY = timedelta(days=1)
+
+def booking_window(date_debut: datetime):
+    """Fenêtre [debut, fin) occupée par une réservation commençant à date_debut."""
+    return date_debut, date_debut + RESERVATION_DURATION
+
+def count_overlaps(session: Session, objet_id: int, start: datetime, end: datetime) -> int:
+    """Nombre de réservations actives de l'objet qui chevauchent [start, end), lu en base."""
+    return session.exec(
+        select(func.count(Reservation.id))
+        .where(Reservation.objet_id == objet_id)
+        .where(Reservation.status == "active")
+        .where(Reservation.date_debut < end)
+        .where(Reservation.date_fin > start)
+    ).one()
+
+def count_overlaps_many(session: Session, windows: List[Tuple[int, datetime, datetime]]) -> List[int]:
+    """
+    count_overlaps pour plusieurs (objet_id, start, end) en une requête
+    groupée : les fenêtres forment une table dérivée jointe aux réservations.
+    """
+    if not windows:
+        return []
+    demandes = union_all(*(
+        select(literal(i).label("i"), literal(objet_id).label("objet_id"),
+               literal(start, DateTime).label("debut"), literal(end, DateTime).label("fin"))
+        for i, (objet_id, start, end) in enumerate(windows)
+    )).subquery()
+    overlaps = and_(
+        Reservation.objet_id == demandes.c.objet_id,
+        Reservation.status == "active",
+        Reservation.date_debut < demandes.c.fin,
+        Reservation.date_fin > demandes.c.debut,
+    )
+    counts = dict(session.exec(
+        select(demandes.c.i, func.count(Reservation.id))
+        .select_from(demandes)
+        .outerjoin(Reservation, overlaps)
+        .group_by(demandes.c.i)
+    ).all())
+    return [counts.get(i, 0) for i in range(len(windows))]
+
+def lock_objet(session: Session, objet_id: int) -> Optional[Objet]:
+    """
+    Ouvre la transaction de réservation de l'objet et le relit sous verrou.
+
+    Postgres : verrou de ligne (SELECT ... FOR UPDATE), les réservations
+    d'objets différents restent parallèles. SQLite n'a qu'un écrivain :
+    BEGIN IMMEDIATE prend le verrou d'écriture dès la lecture, si bien que
+    le comptage des chevauchements et l'insertion sont atomiques.
+    La session ne doit pas avoir de transaction d'écriture en cours.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+        return session.get(Objet, objet_id, populate_existing=True)
+    return session.exec(select(Objet).where(Objet.id == objet_id).with_for_update()).first()
+
+def lock_objets(session: Session, objet_ids: Iterable[int]) -> Dict[int, Objet]:
+    """
+    lock_objet pour plusieurs objets (panier) : relit les objets sous verrou.
+    Hors SQLite, les lignes sont verrouillées dans l'ordre des ids pour que
+    deux paniers qui se recouvrent ne s'interbloquent pas.
+    """
+    query = select(Objet).where(Objet.id.in_(set(objet_ids))).order_by(Objet.id)
+    if session.get_bind().dialect.name == "sqlite":
+        session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+        query = query.execution_options(populate_existing=True)
+    else:
+        query = query.with_for_update()
+    return {obj.id: obj for obj in session.exec(query).all()}
+
+def daily_overlaps(starts: List[datetime], ends: List[datetime], first_day: date, days: int,
+                   window: timedelta = DAY) -> List[int]:
+    """
+    Pour chaque jour i de [first_day, first_day + days), nombre d'intervalles
+    [start, end) qui chevauchent [jour_i 00:00, jour_i 00:00 + window).
+
+    Tableau de différences puis somme cumulée : O(réservations + jours)
+    au lieu d'un comptage par jour. Un intervalle chevauche le jour i si
+    start < jour_i + window et end > jour_i, soit i > start - window
+    (il entre à ce jour-là) et i < end (il sort à ce jour-là).
+    """
+    origin = datetime.combine(first_day, time())
+    diff = [0] * (days + 1)
+    for start in starts:
+        entry, _ = divmod(start - window - origin, DAY)
+        diff[min(max(entry + 1, 0), days)] += 1
+    for end in ends:
+        exit_, rest = divmod(end - origin, DAY)
+        diff[min(max(exit_ + (rest > timedelta(0)), 0), days)] -= 1
+    return list(accumulate(diff[:days]))
+
+class _Timeline:
+    """Réservations actives d'un objet : débuts et fins triés séparément."""
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+
+    def add(self, debut: datetime, fin: datetime):
+        insort(self.starts, debut)
+        insort(self.ends, fin)
+
+    def remove(self, debut: datetime, fin: datetime):
+        del self.starts[bisect_left(self.starts, debut)]
+        del self.ends[bisect_left(self.ends, fin)]
+
+    def count(self, start: datetime, end: datetime) -> int:
+        # Overlap = (res.start < end) minus (res.end <= start): since every
+        # reservation ends after it starts, the second set is included in the first.
+        return bisect_left(self.starts, end) - bisect_right(self.ends, start)
+
+class AvailabilityIndex:
+    """
+    Index en mémoire des réservations actives, par objet.
+
+    Répond en O(log n) à "combien d'unités de l'objet X sont réservées
+    sur [a, b)" sans relire l'historique des réservations. L'index est
+    construit au démarrage puis tenu à jour à chaque création ou retour.
+    Les écritures faites par un autre worker ou une tâche de fond sont
+    rattrapées par `sync` : chaque réservation porte la révision
+    `reservations` de sa dernière écriture, seules les lignes plus
+    récentes que l'index sont relues.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._timelines: Dict[int, _Timeline] = {}
+        self._reservations: Dict[int, Tuple[int, datetime, datetime]] = {}
+        # Instants at which "can a booking start now" flips for some objet
+        self._changes: List[datetime] = []
+        self.generation: Optional[int] = None
+
+    def rebuild(self, session: Session):
+        generation = revisions.current(session, revisions.RESERVATIONS)
+        rows = session.exec(
+            select(Reservation.id, Reservation.objet_id, Reservation.date_debut, Reservation.date_fin)
+            .where(Reservation.status == "active")
+        ).all()
+        timelines: Dict[int, _Timeline] = {}
+        reservations = {}
+        changes = []
+        for res_id, objet_id, debut, fin in rows:
+            timelines.setdefault(objet_id, _Timeline()).add(debut, fin)
+            reservations[res_id] = (objet_id, debut, fin)
+            changes += _change_points(debut, fin)
+        changes.sort()
+        # Swap in one step: readers never see a half-built index
+        with self._lock:
+            self._timelines = timelines
+            self._reservations = reservations
+            self._changes = changes
+            self.generation = generation
+
+    def sync(self, session: Session):
+        """Rattrape les écritures faites par ailleurs depuis la révision de l'index."""
+        generation = self.generation
+        if generation is None:
+            self.rebuild(session)
+            return
+        valeur = revisions.current(session, revisions.RESERVATIONS)
+        if valeur == generation:
+            return
+        if valeur < generation:
+            # A lagging replica never sends the index back in time (revisions.outdated);
+            # on the primary, revisions went back because the database was replaced
+            if not session.info.get(revisions.REPLICA):
+                self.rebuild(session)
+            return
+        # Rows committed after `valeur` may show up too: applying them twice is harmless
+        rows = session.exec(
+            select(Reservation.id, Reservation.objet_id, Reservation.date_debut, Reservation.date_fin,
+                   Reservation.status)
+            .where(Reservation.revision > generation)
+        ).all()
+        with self._lock:
+            for res_id, objet_id, debut, fin, status in rows:
+                if status == "active":
+                    self._insert(res_id, objet_id, debut, fin)
+                else:
+                    self._remove(res_id)
+            self.generation = max(self.generation, valeur)
+
+    def record(self, reservation: Reservation, generation: int):
+        """Enregistre une réservation active commitée avec la révision `generation`."""
+        self.record_many([reservation], generation)
+
+    def record_many(self, reservations: Iterable[Reservation], generation: int):
+        """Enregistre des réservations commitées dans une même transaction (révision `generation`)."""
+        with self._lock:
+            if self._advance(generation):
+                for reservation in reservations:
+                    self._insert(reservation.id, reservation.objet_id, reservation.date_debut, reservation.date_fin)
+
+    def discard(self, reservation_id: int, generation: int):
+        """Retire une réservation qui n'est plus active (retour, annulation)."""
+        with self._lock:
+            if self._advance(generation):
+                self._remove(reservation_id)
+
+    def booked(self, objet_id: int, start: datetime, end: datetime) -> int:
+        with self._lock:
+            timeline = self._timelines.get(objet_id)
+            return timeline.count(start, end) if timeline else 0
+
+    def daily_booked(self, objet_id: int, first_day: date, days: int,
+                     window: timedelta = DAY) -> List[int]:
+        """Réservations actives de l'objet chevauchant chaque jour (ou chaque fenêtre commençant ce jour)."""
+        with self._lock:
+            timeline = self._timelines.get(objet_id)
+            if timeline is None:
+                return [0] * days
+            return daily_overlaps(timeline.starts, timeline.ends, first_day, days, window)
+
+    def earliest_free_slot(self, objet_id: int, quantite: int, after: datetime) -> Optional[datetime]:
+        """Première date >= after à laquelle une réservation de 7 jours peut commencer."""
+        if quantite <= 0:
+            return None
+        with self._lock:
+            timeline = self._timelines.get(objet_id)
+            if timeline is None:
+                return after
+            # Availability can only improve when a reservation ends
+            candidates = [after] + timeline.ends[bisect_right(timeline.ends, after):]
+            for start in candidates:
+                if timeline.count(*booking_window(start)) < quantite:
+                    return start
+        return None
+
+    def last_change(self, now: datetime) -> Optional[datetime]:
+        """
+        Dernier instant <= now où une réservation active a commencé à gêner
+        ou cessé de gêner une réservation démarrant à cet instant : la liste
+        des objets disponibles "maintenant" n'a pas changé depuis, hors écritures.
+        """
+        with self._lock:
+            i = bisect_right(self._changes, now)
+            return self._changes[i - 1] if i else None
+
+    def _advance(self, generation: int) -> bool:
+        # Our write is the only one since the last sync: apply it now.
+        # Otherwise another writer interleaved: the next sync re-reads the
+        # rows of every revision since ours, this write included.
+        if self.generation is not None and generation == self.generation + 1:
+            self.generation = generation
+            return True
+        return False
+
+    def _insert(self, res_id: int, objet_id: int, debut: datetime, fin: datetime):
+        # A row may come from both record() and sync(): never count it twice
+        self._remove(res_id)
+        self._timelines.setdefault(objet_id, _Timeline()).add(debut, fin)
+        self._reservations[res_id] = (objet_id, debut, fin)
+        for instant in _change_points(debut, fin):
+            insort(self._changes, instant)
+
+    def _remove(self, res_id: int):
+        if res_id not in self._reservations:
+            return
+        objet_id, debut, fin = self._reservations.pop(res_id)
+        self._timelines[objet_id].remove(debut, fin)
+        for instant in _change_points(debut, fin):
+            del self._changes[bisect_left(self._changes, instant)]
+
+def _change_points(debut: datetime, fin: datetime) -> Tuple[datetime, datetime]:
+    # A booking starting at t overlaps [debut, fin) from t > debut - duration until t >= fin
+    return debut - RESERVATION_DURATION, fin
+
+availability_index = AvailabilityIndex()
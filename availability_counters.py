@@ -0,0 +1,173 @@
+"""
+État de disponibilité matérialisé par objet (table `objet_disponibilite`).
+
+Savoir si un objet est réservable maintenant demande de compter ses
+réservations qui chevauchent [maintenant, maintenant + 7 jours). Plutôt que
+de le recalculer à chaque lecture, chaque objet porte :
+
+- `reservees` : ce nombre, calculé lors du dernier rafraîchissement ;
+- `reservable` : une réservation commençant à ce moment serait acceptée ;
+- `valide_jusqu_a` : date à laquelle cet état peut changer sans écriture
+  (une réservation se termine, ou entre dans la fenêtre de 7 jours).
+
+Les routes qui modifient la disponibilité appellent `refresh_counters`
+dans leur transaction, sous le verrou de l'objet. `reconcile` (tâche de
+fond et `python availability_counters.py reconcile`) rafraîchit les états
+périmés ou manquants ; `check_counters` (et `... check`) compare les
+compteurs aux réservations sans rien modifier.
+
+GET /objets filtre sur cet état en SQL ; un état périmé ou absent n'exclut
+jamais un objet, il est alors vérifié par l'index en mémoire.
+"""
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, insert, or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+import revisions
+from availability import RESERVATION_DURATION, booking_window, lock_objets
+from models import Objet, ObjetDisponibilite, Reservation
+from scheduler import scheduler
+
+BATCH_SIZE = int(os.getenv("COUNTERS_BATCH_SIZE", "500"))
+INTERVAL_SECONDS = float(os.getenv("COUNTERS_INTERVAL_SECONDS", "300"))
+
+class Etat(NamedTuple):
+    reservees: int
+    reservable: bool
+    valide_jusqu_a: Optional[datetime]
+
+def compute_state(quantite: int, disponible: bool, reservations: List[tuple], now: datetime) -> Etat:
+    """État à `now` d'un objet, à partir de ses réservations actives (debut, fin) non terminées."""
+    start, end = booking_window(now)
+    reservees = sum(1 for debut, fin in reservations if debut < end and fin > start)
+    if not disponible:
+        # Only an admin write can change it, and that write refreshes the state
+        return Etat(reservees, False, None)
+    # Next instant the count may change: a reservation ends, or a later one enters the window
+    changes = [fin for _, fin in reservations] + [debut - RESERVATION_DURATION for debut, _ in reservations if debut >= end]
+    return Etat(reservees, quantite > reservees, min(changes, default=None))
+
+def expected_states(session: Session, now: datetime, objet_ids: Optional[Iterable[int]] = None) -> Dict[int, Etat]:
+    """États recalculés depuis les réservations en base (toutes les lignes, ou `objet_ids`)."""
+    objets = select(Objet.id, Objet.quantite, Objet.disponibilite_globale)
+    reservations = (
+        select(Reservation.objet_id, Reservation.date_debut, Reservation.date_fin)
+        .where(Reservation.status == "active", Reservation.date_fin > now)
+    )
+    if objet_ids is not None:
+        objet_ids = list(objet_ids)
+        objets = objets.where(Objet.id.in_(objet_ids))
+        reservations = reservations.where(Reservation.objet_id.in_(objet_ids))
+    by_objet: Dict[int, List[tuple]] = {}
+    for objet_id, debut, fin in session.exec(reservations):
+        by_objet.setdefault(objet_id, []).append((debut, fin))
+    return {
+        objet_id: compute_state(quantite, disponible, by_objet.get(objet_id, []), now)
+        for objet_id, quantite, disponible in session.exec(objets)
+    }
+
+def refresh_counters(session: Session, objet_ids: Iterable[int], now: Optional[datetime] = None):
+    """
+    Recalcule l'état des objets dans la transaction en cours.
+
+    À appeler après l'écriture (réservation, retour, disponibilité) et sous
+    le verrou de l'objet, pour ne pas écrire un état calculé avant une
+    transaction concurrente.
+    """
+    objet_ids = list(objet_ids)
+    if not objet_ids:
+        return
+    # Autoflush: pending writes of the transaction are counted
+    states = expected_states(session, now or datetime.now(), objet_ids)
+    session.exec(delete(ObjetDisponibilite).where(ObjetDisponibilite.objet_id.in_(objet_ids)))
+    if states:
+        session.execute(insert(ObjetDisponibilite), [dict(state._asdict(), objet_id=objet_id)
+                                                     for objet_id, state in states.items()])
+
+def reservable_filter(now: datetime):
+    """Clause de GET /objets : exclut seulement les objets dont l'état à jour dit non réservable."""
+    return or_(
+        ObjetDisponibilite.objet_id == None,
+        ObjetDisponibilite.reservable == True,
+        ObjetDisponibilite.valide_jusqu_a <= now,
+    )
+
+def _stored(session: Session) -> Dict[int, ObjetDisponibilite]:
+    return {row.objet_id: row for row in session.exec(select(ObjetDisponibilite))}
+
+def _is_stale(row: ObjetDisponibilite, now: datetime) -> bool:
+    return row.valide_jusqu_a is not None and row.valide_jusqu_a <= now
+
+def check_counters(session: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Compare les compteurs aux réservations, sans rien modifier.
+
+    Un état périmé n'est pas une erreur (il sera revérifié à la lecture) ;
+    un état à jour différent du recalcul, ou une ligne manquante, en est une.
+    """
+    now = now or datetime.now()
+    expected = expected_states(session, now)
+    stored = _stored(session)
+    mismatches, stale = [], 0
+    for objet_id, attendu in expected.items():
+        row = stored.get(objet_id)
+        if row is not None and _is_stale(row, now):
+            stale += 1
+            continue
+        stocke = None if row is None else Etat(row.reservees, row.reservable, row.valide_jusqu_a)
+        if stocke != attendu:
+            mismatches.append({"objet_id": objet_id, "stocke": stocke and stocke._asdict(), "attendu": attendu._asdict()})
+    return {"objets": len(expected), "stale": stale, "mismatches": mismatches}
+
+def reconcile(engine: Engine, now: Optional[datetime] = None, batch_size: int = BATCH_SIZE) -> int:
+    """Rafraîchit les états manquants, périmés ou faux ; renvoie le nombre d'objets rafraîchis."""
+    now = now or datetime.now()
+    with Session(engine) as session:
+        expected = expected_states(session, now)
+        stored = _stored(session)
+    missing_or_stale = {
+        objet_id for objet_id in expected
+        if objet_id not in stored or _is_stale(stored[objet_id], now)
+    }
+    wrong = {
+        objet_id for objet_id, attendu in expected.items()
+        if objet_id not in missing_or_stale
+        and Etat(stored[objet_id].reservees, stored[objet_id].reservable, stored[objet_id].valide_jusqu_a) != attendu
+    }
+    drifted = sorted(missing_or_stale | wrong)
+    for i in range(0, len(drifted), batch_size):
+        batch = drifted[i:i + batch_size]
+        with Session(engine) as session:
+            # Recomputed under the lock: a booking committed since the scan is not overwritten
+            lock_objets(session, batch)
+            refresh_counters(session, batch, now)
+            if wrong.intersection(batch):
+                # A wrong state could hide objets from the catalogue: its ETag must change.
+                # Missing and stale states are ignored by reservable_filter.
+                revisions.bump(session, revisions.OBJETS)
+            session.commit()
+    return len(drifted)
+
+@scheduler.every(INTERVAL_SECONDS, name="availability_counters")
+def run_reconcile() -> int:
+    from database import engine
+    return reconcile(engine)
+
+if __name__ == "__main__":
+    from database import engine
+    if sys.argv[1:] == ["check"]:
+        with Session(engine) as session:
+            report = check_counters(session)
+        print(f"{report['objets']} objet(s), {report['stale']} stale, {len(report['mismatches'])} mismatch(es)")
+        for mismatch in report["mismatches"]:
+            print(mismatch)
+        sys.exit(1 if report["mismatches"] else 0)
+    elif sys.argv[1:] == ["reconcile"]:
+        print(f"{reconcile(engine)} objet(s) refreshed.")
+    else:
+        sys.exit("usage: python availability_counters.py check|reconcile")
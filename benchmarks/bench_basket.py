@@ -0,0 +1,91 @@
+"""
+Paniers de plusieurs objets contre main.app en process (httpx.ASGITransport) :
+
+- single : un POST /reservations par objet du panier ;
+- batch  : un POST /reservations/batch par panier (une transaction).
+
+Puis la vérification de N couples (objet, date) : un GET
+/objets/{id}/calendar par couple contre un POST /objets/availability.
+
+    python -m benchmarks.bench_basket --baskets 200 --size 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlmodel import Session, select
+
+from models import Objet
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=5_000)
+    parser.add_argument("--baskets", type=int, default=200)
+    parser.add_argument("--size", type=int, default=3, help="Objets par panier")
+    parser.add_argument("--checks", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    # Imported after DATABASE_URL is set so that the app uses the bench database
+    import httpx
+    from auth import create_access_token
+    from database import engine
+    from main import app
+    from benchmarks.datagen import populate
+
+    now = populate(engine, n_objets=args.objets, n_reservations=0)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user2@bench.local'})}"}
+    rng = random.Random(42)
+    with Session(engine) as session:
+        available = session.exec(select(Objet.id).where(Objet.disponibilite_globale == True)).all()
+    # Disjoint objets and far-apart dates: every booking succeeds in both variants
+    ids = rng.sample(available, 2 * args.baskets * args.size)
+
+    def baskets(offset, days):
+        return [
+            [{"objet_id": ids[offset + b * args.size + i], "lieu_id": 1,
+              "date_debut": (now + timedelta(days=days)).isoformat()} for i in range(args.size)]
+            for b in range(args.baskets)
+        ]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            timings = {}
+            start = time.perf_counter()
+            for basket in baskets(0, 30):
+                for item in basket:
+                    assert (await client.post("/reservations", json=item, headers=headers)).status_code == 200
+            timings["single"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for basket in baskets(args.baskets * args.size, 60):
+                assert (await client.post("/reservations/batch", json=basket, headers=headers)).status_code == 200
+            timings["batch"] = time.perf_counter() - start
+
+            day = (now + timedelta(days=30)).date()
+            pairs = ids[:args.checks]
+            start = time.perf_counter()
+            for objet_id in pairs:
+                await client.get(f"/objets/{objet_id}/calendar", params={"from": day.isoformat(), "to": day.isoformat()})
+            timings["calendar"] = time.perf_counter() - start
+            start = time.perf_counter()
+            demandes = [{"objet_id": objet_id, "date_debut": (now + timedelta(days=30)).isoformat()} for objet_id in pairs]
+            assert (await client.post("/objets/availability", json=demandes)).status_code == 200
+            timings["availability"] = time.perf_counter() - start
+            return timings
+
+    t = asyncio.run(run())
+    tmp.cleanup()
+    print(f"{args.baskets} baskets of {args.size}: single {t['single'] * 1000:.0f} ms, "
+          f"batch {t['batch'] * 1000:.0f} ms (x{t['single'] / t['batch']:.1f})")
+    print(f"{args.checks} checks: calendar {t['calendar'] * 1000:.0f} ms, "
+          f"availability {t['availability'] * 1000:.1f} ms (x{t['calendar'] / t['availability']:.0f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Stress test de POST /reservations : des milliers de réservations
+parallèles sur quelques objets très demandés. Vérifie qu'aucun objet
+n'est sur-réservé et mesure le débit obtenu.
+
+    python -m benchmarks.bench_booking --bookings 5000 --clients 32 --objets 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+from sqlmodel import Session, SQLModel, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from auth import create_access_token, get_password_hash
+from database import get_session, make_engine, make_async_engine
+from main import app
+from models import User, Lieu, Objet, Reservation
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--objets", type=int, default=20)
+    parser.add_argument("--dates", type=int, default=10, help="distinct start weeks requested")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = make_engine(url, echo=False)
+        async_engine = make_async_engine(url, echo=False)
+        SQLModel.metadata.create_all(engine)
+
+        async def get_session_override():
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+
+        rng = random.Random(42)
+        with Session(engine) as session:
+            session.add(User(nom="Bench", prenom="B", email="bench@bench.local", password_hash=get_password_hash("x")))
+            session.add(Lieu(nom="Bench", lat=0, long=0, adresse="Dijon"))
+            quantites = {}
+            for i in range(1, args.objets + 1):
+                quantites[i] = rng.randint(1, 3)
+                session.add(Objet(id=i, nom=f"Objet {i}", description="bench", quantite=quantites[i]))
+            session.commit()
+
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@bench.local'})}"}
+        base = datetime(2030, 1, 1)
+        payloads = [
+            {"objet_id": rng.randint(1, args.objets), "lieu_id": 1,
+             "date_debut": (base + timedelta(days=7 * rng.randrange(args.dates))).isoformat()}
+            for _ in range(args.bookings)
+        ]
+
+        async def book_all():
+            queue = list(reversed(payloads))
+            codes = []
+
+            async def client_loop(client):
+                while queue:
+                    res = await client.post("/reservations", json=queue.pop(), headers=headers)
+                    codes.append(res.status_code)
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                await asyncio.gather(*(client_loop(client) for _ in range(args.clients)))
+            return codes
+
+        start = time.perf_counter()
+        codes = asyncio.run(book_all())
+        elapsed = time.perf_counter() - start
+
+        with Session(engine) as session:
+            rows = session.exec(
+                select(Reservation.objet_id, Reservation.date_debut, func.count(Reservation.id))
+                .group_by(Reservation.objet_id, Reservation.date_debut)
+            ).all()
+        overbooked = [(o, d, n) for o, d, n in rows if n > quantites[o]]
+        app.dependency_overrides.pop(get_session)
+
+    print(f"{args.bookings} bookings, {args.clients} clients: {args.bookings / elapsed:.0f} req/s")
+    print(f"status codes: {dict(Counter(codes))}")
+    print(f"overbooked (objet, week) pairs: {len(overbooked)}")
+    if overbooked:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
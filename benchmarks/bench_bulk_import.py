@@ -0,0 +1,64 @@
+"""
+Débit d'import d'un catalogue : création objet par objet comme
+POST /objets (commit, refresh, liens, second commit) contre
+bulk_import.import_objets (validation par lots, executemany, une transaction).
+
+    python -m benchmarks.bench_bulk_import --objets 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel, func, select
+
+import search  # noqa: F401  (the full-text triggers are part of the real write cost)
+from bulk_import import import_objets
+from database import make_engine
+from models import Consommable, Objet, ObjetConsommableLink, Tag
+
+def catalogue(n, tag_id, consommable_ids):
+    return [
+        {"nom": f"Objet {i}", "description": f"Description de l'objet {i}", "quantite": 1 + i % 3,
+         "tag_id": tag_id, "consommable_ids": consommable_ids}
+        for i in range(n)
+    ]
+
+def one_by_one(session, rows):
+    for row in rows:
+        objet = Objet(**{k: v for k, v in row.items() if k != "consommable_ids"})
+        session.add(objet)
+        session.commit()
+        session.refresh(objet)
+        for c_id in row["consommable_ids"]:
+            session.add(ObjetConsommableLink(objet_id=objet.id, consommable_id=c_id))
+        session.commit()
+
+def bulk(session, rows):
+    report = import_objets(session, rows)
+    session.commit()
+    assert not report.errors, report.errors[:3]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=5000)
+    args = parser.parse_args()
+
+    for name, fn in [("one by one", one_by_one), ("bulk import", bulk)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+            SQLModel.metadata.create_all(engine)
+            with Session(engine) as session:
+                tag, vis, clous = Tag(nom="Bricolage"), Consommable(nom="Vis", prix=0.1), Consommable(nom="Clous", prix=0.05)
+                session.add_all([tag, vis, clous])
+                session.commit()
+                rows = catalogue(args.objets, tag.id, [vis.id, clous.id])
+
+                start = time.perf_counter()
+                fn(session, rows)
+                elapsed = time.perf_counter() - start
+                assert session.exec(select(func.count(Objet.id))).one() == args.objets
+            print(f"{name:12s}: {elapsed:7.2f} s  ({args.objets / elapsed:9.0f} objets/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Calendrier de disponibilité sur 90 jours : un appel à GET /objets?date_check=
+par jour (parcours de toutes les pages, comme le faisaient les clients)
+contre un seul GET /objets/calendar pour un lot d'objets.
+
+    python -m benchmarks.bench_calendar --objets 10000 --reservations 500000 --days 90
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi import Request, Response
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from availability import availability_index
+from database import make_async_engine
+from pagination import MAX_LIMIT, NEXT_CURSOR_HEADER, Page
+from routers.objets import list_objets, objets_calendar
+from benchmarks.datagen import make_engine, populate
+
+# Called outside of a request: no conditional headers
+LIST_REQUEST = Request({"type": "http", "method": "GET", "path": "/objets", "query_string": b"", "headers": []})
+
+async def per_day(session, ids, first_day, days):
+    """Jours réservables de chaque objet, un parcours de list_objets par jour."""
+    reservable = {i: [] for i in ids}
+    for d in range(days):
+        day = datetime.combine(first_day + timedelta(days=d), datetime.min.time())
+        listed, cursor = set(), None
+        while True:
+            response = Response()
+            page = orjson.loads((await list_objets(LIST_REQUEST, response, nom=None, tag_id=None, available=True, date_check=day,
+                                     page=Page(limit=MAX_LIMIT, cursor=cursor), proximite=None, expand=set(), session=session)).body)
+            listed.update(o["id"] for o in page)
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+        for i in ids:
+            reservable[i].append(i in listed)
+    return reservable
+
+async def calendar(session, ids, first_day, days):
+    calendriers = await objets_calendar(ids=ids, period=(first_day, days), session=session)
+    return {c.objet_id: [j.reservable for j in c.jours] for c in calendriers}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=10_000)
+    parser.add_argument("--reservations", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--batch", type=int, default=20, help="Objets par calendrier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_engine(path)
+        async_engine = make_async_engine(f"sqlite:///{path}", echo=False)
+        print(f"Seeding {args.objets} objets / {args.reservations} reservations...")
+        now = populate(engine, n_objets=args.objets, n_reservations=args.reservations)
+        with Session(engine) as session:
+            availability_index.rebuild(session)
+        ids = list(range(1, args.batch + 1))
+
+        async def run(fn):
+            async with AsyncSession(async_engine) as session:
+                start = time.perf_counter()
+                result = await fn(session, ids, now.date(), args.days)
+                return time.perf_counter() - start, result
+
+        t_before, r_before = asyncio.run(run(per_day))
+        t_after, r_after = asyncio.run(run(calendar))
+        assert r_before == r_after
+
+        print(f"{args.days} x list_objets: {t_before * 1000:9.1f} ms")
+        print(f"1 x calendar ({args.batch} objets): {t_after * 1000:9.1f} ms")
+        print(f"speedup: x{t_before / t_after:.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Démarrage à froid d'un vrai serveur sur une base peuplée : temps entre le
+lancement et la première réponse de GET /objets, et latence de cette
+première requête.
+
+- avant : `python seed.py` puis `uvicorn main:app`, sans préchauffage
+  (index et caches construits par la première requête) ;
+- après : `gunicorn main:app -c gunicorn.conf.py` (schéma et données
+  initiales dans le maître, préchauffage des workers), premier appel dès
+  que /readyz répond 200.
+
+    python -m benchmarks.bench_cold_start --objets 20000 --reservations 200000
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for(client, url, timeout=120):
+    """Interroge `url` jusqu'à une réponse 200 ; renvoie la latence de celle-ci."""
+    import httpx
+
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+def cold_start(env, commands, probe):
+    """Lance `commands` l'une après l'autre (la dernière est le serveur) ; renvoie (premier /objets, sa latence)."""
+    import httpx
+
+    port = free_port()
+    env = dict(env, BIND=f"127.0.0.1:{port}")
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    for command in commands[:-1]:
+        subprocess.run(command, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen([arg.format(port=port) for arg in commands[-1]], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=None) as client:
+            if probe:
+                wait_for(client, f"{base}{probe}")
+            first = wait_for(client, f"{base}/objets?limit=20")
+            return time.perf_counter() - start, first
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=20_000)
+    parser.add_argument("--reservations", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp.name, 'bench.db')}",
+               WEB_CONCURRENCY=str(args.workers))
+    os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+    # Imported after the environment is set so that the bench database is populated
+    from database import engine
+    from benchmarks.datagen import populate
+    from scheduler import scheduler
+    import availability_counters, lifecycle  # register their background jobs
+    import seed
+
+    populate(engine, n_objets=args.objets, n_reservations=args.reservations)
+    seed.seed()
+    # A restart, not a first deployment: the counters are up to date
+    scheduler.catch_up(all_jobs=True)
+    engine.dispose()
+
+    results = {
+        "seed.py + uvicorn": cold_start(dict(env, STARTUP_WARMUP="false"), [
+            [sys.executable, "seed.py"],
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", "{port}"],
+        ], probe=None),
+        "gunicorn + warm-up": cold_start(env, [
+            [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py"],
+        ], probe="/readyz"),
+    }
+    tmp.cleanup()
+    for name, (ttfr, first) in results.items():
+        print(f"{name:20s}: first /objets after {ttfr * 1000:8.1f} ms   first request {first * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Client qui rafraîchit une page de 1000 objets du catalogue (GET /objets) :
+
+- full      : réponse complète, non compressée ;
+- gzip      : réponse complète compressée (CompressionMiddleware) ;
+- 304       : revalidation avec If-None-Match, le catalogue n'a pas changé.
+
+Affiche latence et octets transférés par requête.
+
+    python -m benchmarks.bench_conditional --objets 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=20_000)
+    parser.add_argument("--reservations", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    # Imported after DATABASE_URL is set so that the app uses the bench database
+    import httpx
+    from database import engine
+    from main import app
+    from pagination import MAX_LIMIT
+    from benchmarks.datagen import populate
+
+    populate(engine, n_objets=args.objets, n_reservations=args.reservations)
+    url = f"/objets?limit={MAX_LIMIT}"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            etag = (await client.get(url)).headers["etag"]
+            variants = {
+                "full": {"Accept-Encoding": "identity"},
+                "gzip": {"Accept-Encoding": "gzip"},
+                "304": {"Accept-Encoding": "gzip", "If-None-Match": etag},
+            }
+            results = {}
+            for name, headers in variants.items():
+                best, size = float("inf"), 0
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    res = await client.get(url, headers=headers)
+                    best = min(best, time.perf_counter() - start)
+                    # Bytes on the wire: compressed body when encoded
+                    size = int(res.headers.get("content-length", 0))
+                assert res.status_code == (304 if name == "304" else 200)
+                results[name] = (best, size)
+            return results
+
+    results = asyncio.run(run())
+    tmp.cleanup()
+    full = results["full"][0]
+    for name, (seconds, size) in results.items():
+        print(f"{name:5s} {seconds * 1000:8.2f} ms   {size:9d} bytes   x{full / seconds:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+GET /objets?available=true quand la plupart des objets sont réservés :
+sans compteurs matérialisés (chaque objet est lu puis écarté en Python
+par l'index en mémoire) contre le filtre SQL sur objet_disponibilite.
+
+    python -m benchmarks.bench_counters --objets 20000 --booked 0.9
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import delete, insert
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from availability import availability_index
+from availability_counters import reconcile
+from database import make_async_engine
+from models import ObjetDisponibilite, Reservation
+from pagination import MAX_LIMIT, NEXT_CURSOR_HEADER, Page
+from routers.objets import list_objets
+from benchmarks.datagen import make_engine, populate
+
+# Called outside of a request: no conditional headers
+LIST_REQUEST = Request({"type": "http", "method": "GET", "path": "/objets", "query_string": b"", "headers": []})
+
+async def walk_pages(async_engine):
+    items, cursor = [], None
+    async with AsyncSession(async_engine) as session:
+        while True:
+            response = Response()
+            items += orjson.loads((await list_objets(LIST_REQUEST, response, nom=None, tag_id=None, available=True, date_check=None,
+                                       page=Page(limit=MAX_LIMIT, cursor=cursor), proximite=None, expand=set(),
+                                       session=session)).body)
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                return {o["id"] for o in items}
+
+def best_of(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=20_000)
+    parser.add_argument("--booked", type=float, default=0.9, help="Part des objets entièrement réservés maintenant")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_engine(path)
+        async_engine = make_async_engine(f"sqlite:///{path}", echo=False)
+        populate(engine, n_objets=args.objets, n_reservations=0)
+        rng = random.Random(42)
+        now = datetime.now()
+        with engine.begin() as conn:
+            # Every unit of the booked objets is taken for the coming days
+            conn.execute(insert(Reservation), [
+                {"objet_id": objet_id, "user_id": 1, "lieu_id": 1, "status": "active",
+                 "date_debut": now - timedelta(days=2), "date_fin": now + timedelta(days=5)}
+                for objet_id in range(1, args.objets + 1) if rng.random() < args.booked
+                for _ in range(3)
+            ])
+        with Session(engine) as session:
+            availability_index.rebuild(session)
+
+        t_reconcile, refreshed = best_of(lambda: reconcile(engine), 1)
+        print(f"reconcile: {refreshed} objets in {t_reconcile * 1000:.0f} ms")
+        t_after, r_after = best_of(lambda: asyncio.run(walk_pages(async_engine)), args.repeat)
+
+        with engine.begin() as conn:
+            conn.execute(delete(ObjetDisponibilite))
+        t_before, r_before = best_of(lambda: asyncio.run(walk_pages(async_engine)), args.repeat)
+        assert r_before == r_after
+
+        print(f"before (index only):    {t_before * 1000:8.1f} ms  ({len(r_before)} objets available)")
+        print(f"after  (SQL counters):  {t_after * 1000:8.1f} ms")
+        print(f"speedup: x{t_before / t_after:.1f}")
+
+if __name__ == "__main__":
+    main()
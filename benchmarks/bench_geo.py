@@ -0,0 +1,66 @@
+"""
+Requêtes "k plus proches lieux" : index en grille (geo.py) contre le calcul
+de toutes les distances, ce que faisaient les clients après avoir
+téléchargé la liste complète des lieux.
+
+    python -m benchmarks.bench_geo --lieux 100000 --k 10
+"""
+import argparse
+import heapq
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel, select
+
+import revisions
+from geo import GeoIndex, haversine_km
+from models import Lieu
+from benchmarks.datagen import make_engine
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lieux", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    # Sites spread over metropolitan France
+    points = [(rng.uniform(42.5, 51.0), rng.uniform(-4.5, 8.0)) for _ in range(args.lieux)]
+    queries = [(rng.uniform(42.5, 51.0), rng.uniform(-4.5, 8.0)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"))
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.bulk_insert_mappings(Lieu, [
+                {"nom": f"Lieu {i}", "lat": lat, "long": long, "adresse": ""}
+                for i, (lat, long) in enumerate(points)
+            ])
+            revisions.bump(session, revisions.METADATA)
+            session.commit()
+
+            index = GeoIndex(Lieu)
+            start = time.perf_counter()
+            index.rebuild(session)
+            print(f"Index rebuild: {(time.perf_counter() - start) * 1000:.1f} ms for {args.lieux} lieux")
+
+            rows = session.exec(select(Lieu.id, Lieu.lat, Lieu.long)).all()
+
+        start = time.perf_counter()
+        for lat, long in queries:
+            index.nearest(lat, long, k=args.k)
+        t_index = (time.perf_counter() - start) / len(queries)
+
+        scan_queries = queries[:max(1, len(queries) // 20)]
+        start = time.perf_counter()
+        for lat, long in scan_queries:
+            heapq.nsmallest(args.k, rows, key=lambda r: haversine_km(lat, long, r[1], r[2]))
+        t_scan = (time.perf_counter() - start) / len(scan_queries)
+
+        print(f"k={args.k}: grid index {t_index * 1000:.3f} ms/query, full scan {t_scan * 1000:.1f} ms/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare le filtre de disponibilité de GET /objets :
+l'ancienne boucle Python (lazy-load de obj.reservations, N+1)
+et l'implémentation actuelle de routers.objets.list_objets.
+
+    python -m benchmarks.bench_list_objets --objets 10000 --reservations 500000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import orjson
+from fastapi import Request, Response
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from availability import booking_window
+from database import make_async_engine
+from models import Objet
+from pagination import MAX_LIMIT, NEXT_CURSOR_HEADER, Page
+from routers.objets import list_objets
+from benchmarks.datagen import make_engine, populate
+
+# Called outside of a request: no conditional headers
+LIST_REQUEST = Request({"type": "http", "method": "GET", "path": "/objets", "query_string": b"", "headers": []})
+
+def legacy_list_objets(session, date_check):
+    check_start, check_end = booking_window(date_check)
+    available_objets = []
+    for obj in session.exec(select(Objet)).all():
+        if not obj.disponibilite_globale:
+            continue
+        overlap_count = 0
+        for res in obj.reservations:
+            if res.status == 'active':
+                if res.date_debut < check_end and res.date_fin > check_start:
+                    overlap_count += 1
+        if obj.quantite > overlap_count:
+            available_objets.append(obj)
+    return available_objets
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=10_000)
+    parser.add_argument("--reservations", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_engine(path)
+        async_engine = make_async_engine(f"sqlite:///{path}", echo=False)
+        print(f"Seeding {args.objets} objets / {args.reservations} reservations...")
+        now = populate(engine, n_objets=args.objets, n_reservations=args.reservations)
+
+        def before():
+            with Session(engine) as session:
+                return legacy_list_objets(session, now)
+
+        async def walk_pages():
+            # Walk every page, as a client would
+            items, cursor = [], None
+            async with AsyncSession(async_engine) as session:
+                while True:
+                    response = Response()
+                    items += orjson.loads((await list_objets(LIST_REQUEST, response, nom=None, tag_id=None, available=True, date_check=now,
+                                         page=Page(limit=MAX_LIMIT, cursor=cursor), proximite=None, expand=set(), session=session)).body)
+                    cursor = response.headers.get(NEXT_CURSOR_HEADER)
+                    if not cursor:
+                        return items
+
+        def after():
+            return asyncio.run(walk_pages())
+
+        t_before, r_before = timed(before, args.repeat)
+        t_after, r_after = timed(after, args.repeat)
+        assert {o.id for o in r_before} == {o["id"] for o in r_after}
+
+        print(f"before (python loop): {t_before * 1000:9.1f} ms  ({len(r_before)} objets)")
+        print(f"after  (list_objets):  {t_after * 1000:9.1f} ms  ({len(r_after)} objets)")
+        print(f"speedup: x{t_before / t_after:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Test de charge en process : N clients concurrents envoient des requêtes
+à main.app via httpx.ASGITransport (pas de serveur ni de réseau).
+Mesure le débit et les latences p50/p99.
+
+    python -m benchmarks.bench_load --clients 500 --requests 5000
+
+Avec `--ref`, la même charge est aussi jouée contre un autre commit (extrait
+dans un worktree git temporaire), puis contre l'arbre courant : les deux
+résultats s'affichent côte à côte. Les chiffres « avant » de la pile
+synchrone s'obtiennent avec le commit qui précède le passage en async
+(« Move routes and get_current_user to an async database stack ») ; avec
+le pool par défaut (5+10), la pile synchrone épuise son pool, d'où
+`--pool-size` :
+
+    python -m benchmarks.bench_load --clients 500 --requests 4000 --ref 4c898f7^ --pool-size 600
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+async def run(app, token, clients, total):
+    import httpx
+
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    headers = {"Authorization": f"Bearer {token}"}
+    routes = ["/objets?limit=20", "/users/me", "/admin_meta/tags", "/objets?available=false&limit=20"]
+
+    async def client_loop(client):
+        nonlocal errors
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            res = await client.get(routes[i % len(routes)], headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if res.status_code != 200:
+                errors += 1
+
+    # App exceptions (e.g. QueuePool timeouts of the sync stack) count as errors
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed, latencies, errors
+
+def measure(args) -> dict:
+    """Joue la charge contre l'application importable (arbre courant ou worktree)."""
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+
+    # Imported after DATABASE_URL is set so that the app uses the bench database
+    from auth import create_access_token
+    from database import engine
+    from main import app
+    from benchmarks.datagen import populate
+
+    populate(engine, n_objets=args.objets, n_reservations=args.reservations, n_users=100)
+    token = create_access_token({"sub": "user1@bench.local"})
+
+    rate, latencies, errors = asyncio.run(run(app, token, args.clients, args.requests))
+    tmp.cleanup()
+    return {"rate": rate, "errors": errors, "p50": percentile(latencies, 50) * 1000,
+            "p99": percentile(latencies, 99) * 1000, "mean": statistics.mean(latencies) * 1000}
+
+@contextmanager
+def worktree(ref: str):
+    """Extrait `ref` dans un worktree git temporaire, supprimé à la sortie."""
+    path = tempfile.mkdtemp(prefix="bench_load_")
+    subprocess.run(["git", "worktree", "add", "--detach", path, ref], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL)
+    try:
+        yield path
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", path], cwd=ROOT, check=True)
+
+def measure_in(tree: str, args) -> dict:
+    # Fresh process per tree: the app modules of each tree are imported on their own
+    command = [sys.executable, os.path.abspath(__file__), "--json", "--clients", str(args.clients),
+               "--requests", str(args.requests), "--objets", str(args.objets),
+               "--reservations", str(args.reservations)]
+    env = dict(os.environ, PYTHONPATH=tree)
+    result = subprocess.run(command, cwd=tree, env=env, capture_output=True, text=True)
+    if result.returncode:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Benchmark failed in {tree}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+def report(name: str, args, result: dict):
+    print(f"{name}{args.clients} clients, {args.requests} requests: {result['rate']:.0f} req/s, "
+          f"{result['errors']} errors")
+    print(f"{' ' * len(name)}latency p50 {result['p50']:.1f} ms, p99 {result['p99']:.1f} ms, "
+          f"mean {result['mean']:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--objets", type=int, default=2000)
+    parser.add_argument("--reservations", type=int, default=20000)
+    parser.add_argument("--ref", help="Commit git à mesurer aussi, avant l'arbre courant")
+    parser.add_argument("--pool-size", type=int, help="DB_POOL_SIZE des deux mesures")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.pool_size is not None:
+        os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+
+    if args.json:
+        print(json.dumps(measure(args)))
+    elif args.ref:
+        with worktree(args.ref) as path:
+            before = measure_in(path, args)
+        after = measure_in(ROOT, args)
+        report(f"{args.ref}: ", args, before)
+        report("HEAD: ", args, after)
+    else:
+        report("", args, measure(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Réservations pendant une navigation intensive du catalogue, contre main.app
+en process : lectures (GET /objets?available=false) sur la base principale,
+puis sur un instantané SQLite (replica.py, mode snapshot).
+
+Affiche le débit de lecture et la latence p95 des réservations.
+
+    python -m benchmarks.bench_replica --readers 16 --reads 2000 --bookings 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from benchmarks.bench_load import percentile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=20_000)
+    parser.add_argument("--reservations", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--reads", type=int, default=2_000)
+    parser.add_argument("--bookings", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    # Snapshot mode; the scheduler is not started, snapshots are taken below
+    os.environ["SQLITE_SNAPSHOT_INTERVAL_SECONDS"] = "60"
+    # Imported after the environment is set so that the app uses the bench database
+    import httpx
+    import replica
+    from auth import create_access_token
+    from database import engine
+    from main import app
+    from benchmarks.datagen import populate
+
+    now = populate(engine, n_objets=args.objets, n_reservations=args.reservations)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user2@bench.local'})}"}
+
+    async def run(day_offset):
+        rng = random.Random(day_offset)
+        reads, booking_latencies = [args.reads], []
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def reader():
+                while reads[0] > 0:
+                    reads[0] -= 1
+                    await client.get("/objets", params={"available": False, "limit": 100,
+                                                        "tag_id": rng.randint(1, 20)})
+
+            async def booker():
+                for _ in range(args.bookings):
+                    item = {"objet_id": rng.randint(1, args.objets), "lieu_id": 1,
+                            "date_debut": (now + timedelta(days=day_offset + rng.random() * 300)).isoformat()}
+                    start = time.perf_counter()
+                    await client.post("/reservations", json=item, headers=headers)
+                    booking_latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            readers = asyncio.gather(*(reader() for _ in range(args.readers)))
+            await booker()
+            await readers
+            return args.reads / (time.perf_counter() - start), percentile(booking_latencies, 95)
+
+    results = {}
+    results["primary"] = asyncio.run(run(400))
+    replica.take_snapshot()
+    assert replica.status.usable()
+    results["snapshot"] = asyncio.run(run(800))
+    tmp.cleanup()
+    for name, (throughput, p95) in results.items():
+        print(f"reads on {name:8s}: {throughput:8.1f} reads/s   booking p95 {p95 * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
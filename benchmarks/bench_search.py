@@ -0,0 +1,51 @@
+"""
+Recherche dans un catalogue de grande taille : index FTS5 (search.py)
+contre l'ancien filtre LIKE '%x%' sur le nom seul.
+
+    python -m benchmarks.bench_search --objets 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlmodel import Session, select
+
+from models import Objet
+from search import search_objets
+from benchmarks.datagen import make_engine, populate
+
+QUERIES = ["perceuse", "echelle pliante", "tonn", "crepiere electrique", "jardin bois"]
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objets", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"))
+        print(f"Seeding {args.objets} objets...")
+        populate(engine, n_objets=args.objets, n_reservations=0)
+
+        with Session(engine) as session:
+            # Plus a selective term: the brand of the first objet
+            marque = session.get(Objet, 1).nom.split()[-1]
+            for q in QUERIES + [marque, marque[:3]]:
+                t_like, r_like = timed(lambda: session.exec(
+                    select(Objet).where(Objet.nom.contains(q)).limit(args.limit)).all(), args.repeat)
+                t_fts, r_fts = timed(lambda: search_objets(session, q, args.limit), args.repeat)
+                print(f"{q!r:24s} LIKE {t_like * 1000:7.2f} ms ({len(r_like):3d} hits)   "
+                      f"FTS5 {t_fts * 1000:7.2f} ms ({len(r_fts):3d} hits, ranked)")
+
+if __name__ == "__main__":
+    main()
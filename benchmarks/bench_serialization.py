@@ -0,0 +1,87 @@
+"""
+Sérialisation de réponses de 10 000 lignes (objets, réservations), requête
+comprise, via une petite application FastAPI :
+
+- orm      : instances ORM, response_model = modèle de table, JSONResponse
+             (les routes de liste avant ce changement) ;
+- slim     : instances ORM en dict, response_model = schéma *Read,
+             ORJSONResponse (validation FastAPI conservée) ;
+- dicts    : instances ORM en dict encodées par orjson (listes avec expand) ;
+- rows     : colonnes lues en tuples, encodées directement par orjson
+             (schemas.json_rows, le chemin actuel des listes).
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from models import Objet, Reservation
+from schemas import ObjetRead, ReservationRead, json_rows, read_columns
+from benchmarks.datagen import make_engine, populate
+
+def make_app(engine, model, read_model, rows):
+    app = FastAPI()
+
+    def load():
+        with Session(engine) as session:
+            return session.exec(select(model).limit(rows)).all()
+
+    @app.get("/orm", response_model=List[model])
+    def orm():
+        return load()
+
+    @app.get("/slim", response_model=List[read_model], response_model_exclude_unset=True,
+             response_class=ORJSONResponse)
+    def slim():
+        return [item.model_dump() for item in load()]
+
+    @app.get("/dicts")
+    def dicts():
+        return json_rows([item.model_dump() for item in load()])
+
+    @app.get("/rows")
+    def tuples():
+        with Session(engine) as session:
+            return json_rows(session.exec(select(*read_columns(read_model, model)).limit(rows)).all())
+
+    return app
+
+def best_of(client, path, repeat):
+    best, body = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = client.get(path)
+        best = min(best, time.perf_counter() - start)
+        body = res.json()
+    return best, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"))
+        populate(engine, n_objets=args.rows, n_reservations=args.rows)
+        for model, read_model in ((Objet, ObjetRead), (Reservation, ReservationRead)):
+            client = TestClient(make_app(engine, model, read_model, args.rows))
+            timings = {}
+            bodies = {}
+            for path in ("orm", "slim", "dicts", "rows"):
+                timings[path], bodies[path] = best_of(client, f"/{path}", args.repeat)
+            assert bodies["orm"] == bodies["slim"] == bodies["dicts"] == bodies["rows"]
+            print(f"{model.__name__} x {args.rows}:")
+            for path, seconds in timings.items():
+                print(f"  {path:5s} {seconds * 1000:8.1f} ms   x{timings['orm'] / seconds:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Débit d'écriture SQLite avec plusieurs workers concurrents, comme les
+workers gunicorn qui partagent database.db : réglages SQLite par défaut
+(journal rollback, synchronous=FULL) contre database.make_engine
+(WAL, synchronous=NORMAL, busy_timeout...).
+
+    python -m benchmarks.bench_sqlite_writes --workers 4 --transactions 500
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel
+
+from database import make_engine
+from models import Reservation
+
+def _engine(path, tuned):
+    url = f"sqlite:///{path}"
+    if tuned:
+        return make_engine(url, echo=False)
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+def _worker(path, tuned, transactions, worker_id, results):
+    engine = _engine(path, tuned)
+    table = Reservation.__table__
+    errors = 0
+    debut = datetime(2024, 1, 1)
+    for i in range(transactions):
+        try:
+            with engine.begin() as conn:
+                conn.execute(table.insert().values(
+                    date_debut=debut, date_fin=debut + timedelta(days=7), status="active",
+                    user_id=worker_id, objet_id=i % 100, lieu_id=1,
+                ))
+        except OperationalError:
+            errors += 1
+    results.put(errors)
+
+def run(tuned, workers, transactions):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        SQLModel.metadata.create_all(_engine(path, tuned))
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_worker, args=(path, tuned, transactions, w, results))
+            for w in range(workers)
+        ]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+        errors = sum(results.get() for _ in procs)
+    committed = workers * transactions - errors
+    return committed / elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--transactions", type=int, default=500, help="transactions per worker")
+    args = parser.parse_args()
+
+    for label, tuned in [("default pragmas", False), ("make_engine", True)]:
+        rate, errors = run(tuned, args.workers, args.transactions)
+        print(f"{label:16s}: {rate:8.0f} commits/s  ({errors} 'database is locked' errors)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Générateur de données synthétiques pour les benchmarks.
+
+Les lignes sont insérées en masse (executemany) sans passer par l'ORM,
+pour pouvoir construire rapidement des catalogues de grande taille.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlmodel import SQLModel, create_engine
+
+import search  # noqa: F401  (creates the full-text index along with the objet table)
+from models import Association, Tag, Lieu, User, Objet, Reservation
+
+STATUSES = ["active", "terminee", "annulee"]
+MOTS = [
+    "perceuse", "visseuse", "scie", "ponceuse", "échelle", "tondeuse", "taille-haie", "bêche",
+    "râteau", "brouette", "tonnelle", "barnum", "sono", "projecteur", "appareil", "raclette",
+    "crêpière", "gaufrier", "nettoyeur", "aspirateur", "escabeau", "niveau", "marteau", "clé",
+    "électrique", "sans-fil", "pliante", "professionnel", "jardin", "fête", "bois", "métal",
+]
+
+def make_engine(path: str):
+    return create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+def _insert(conn, model, rows, chunk=50_000):
+    table = model.__table__
+    for i in range(0, len(rows), chunk):
+        conn.execute(table.insert(), rows[i:i + chunk])
+
+def populate(engine, n_objets=10_000, n_reservations=500_000, n_users=1_000, n_tags=20, years=3, seed=42,
+             n_associations=1):
+    """
+    Remplit une base vide et renvoie la date 'maintenant' de référence.
+
+    Chaque association a son lieu de retrait, autour de Dijon. L'utilisateur 1
+    (user1@bench.local) est administrateur.
+    """
+    rng = random.Random(seed)
+    MARQUES = [f"{rng.choice('bcdfgklmnprstvz')}{rng.choice('aeiouy')}{rng.choice('bcdfgklmnprstvz')}{rng.choice('aeiouy')}{n}" for n in range(500)]
+    SQLModel.metadata.create_all(engine)
+    now = datetime(2024, 6, 1)
+    history = timedelta(days=365 * years)
+
+    with engine.begin() as conn:
+        sites = [(47.32 + rng.uniform(-0.3, 0.3), 5.04 + rng.uniform(-0.4, 0.4)) for _ in range(n_associations)]
+        _insert(conn, Association, [
+            {"id": i, "nom": f"Bench {i}", "lat": lat, "long": long, "description": "bench"}
+            for i, (lat, long) in enumerate(sites, start=1)
+        ])
+        _insert(conn, Lieu, [
+            {"id": i, "nom": f"Bench {i}", "lat": lat, "long": long, "adresse": "Dijon"}
+            for i, (lat, long) in enumerate(sites, start=1)
+        ])
+        _insert(conn, Tag, [{"id": i, "nom": f"Tag {i}"} for i in range(1, n_tags + 1)])
+        _insert(conn, User, [
+            {"id": i, "nom": f"User{i}", "prenom": "Bench", "email": f"user{i}@bench.local",
+             "password_hash": "x", "is_admin": i == 1, "association_id": rng.randint(1, n_associations)}
+            for i in range(1, n_users + 1)
+        ])
+        _insert(conn, Objet, [
+            {"id": i, "nom": f"{rng.choice(MOTS).capitalize()} {rng.choice(MOTS)} {rng.choice(MARQUES)}",
+             "description": " ".join(rng.choice(MOTS) for _ in range(6)), "quantite": rng.randint(1, 3),
+             "disponibilite_globale": rng.random() > 0.05, "tag_id": rng.randint(1, n_tags), "association_id": rng.randint(1, n_associations)}
+            for i in range(1, n_objets + 1)
+        ])
+        rows = []
+        for i in range(1, n_reservations + 1):
+            debut = now - history + timedelta(minutes=rng.randint(0, int(history.total_seconds() // 60) + 60 * 24 * 30))
+            fin = debut + timedelta(days=7)
+            # L'historique est majoritairement clos, seules les réservations récentes restent actives
+            status = "active" if fin > now - timedelta(days=14) and rng.random() > 0.1 else rng.choice(STATUSES[1:])
+            rows.append({"id": i, "date_debut": debut, "date_fin": fin, "status": status,
+                         "user_id": rng.randint(1, n_users), "objet_id": rng.randint(1, n_objets), "lieu_id": rng.randint(1, n_associations)})
+        _insert(conn, Reservation, rows)
+    return now
@@ -0,0 +1,236 @@
+"""
+Suite de performance reproductible : génère une base synthétique à la
+taille demandée, puis joue des scénarios contre main.app en process
+(httpx.ASGITransport, sans serveur ni réseau) et mesure pour chacun le
+débit et les latences p50/p95/p99.
+
+    python -m benchmarks.harness --size small --save            # enregistre la référence
+    python -m benchmarks.harness --size small --compare         # compare à la référence
+
+La référence (benchmarks/baseline.json par défaut) dépend de la machine :
+la générer localement avant de comparer. --compare sort en erreur si un
+scénario a des requêtes en erreur ou perd plus de --tolerance en débit ou
+en p95 ; --save refuse d'enregistrer une référence qui contient des erreurs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from benchmarks.bench_load import percentile
+
+SIZES = {
+    "small": dict(n_associations=5, n_tags=20, n_objets=2_000, n_users=200, n_reservations=20_000, years=1),
+    "medium": dict(n_associations=20, n_tags=40, n_objets=20_000, n_users=2_000, n_reservations=200_000, years=3),
+    "large": dict(n_associations=50, n_tags=60, n_objets=100_000, n_users=10_000, n_reservations=1_000_000, years=5),
+}
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    # (rng, context) -> (method, url, headers, json body)
+    request: Callable
+    requests: int
+    clients: int
+    # Expected business outcomes that are not errors (e.g. 400 on a full objet)
+    ok_statuses: tuple = (200,)
+
+@dataclass
+class Result:
+    requests: int
+    clients: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+def scenarios(sizes: Dict[str, int], scale: float) -> List[Scenario]:
+    n_objets, n_users = sizes["n_objets"], sizes["n_users"]
+    words = ["perceuse", "scie", "tonnelle", "raclette", "echelle", "jardin", "electrique"]
+
+    def browse(rng, ctx):
+        return rng.choice([
+            ("GET", "/objets?available=false&limit=50", {}, None),
+            ("GET", f"/objets?available=false&limit=50&tag_id={rng.randint(1, sizes['n_tags'])}", {}, None),
+            ("GET", "/objets?available=false&limit=20&expand=tag,association", {}, None),
+            ("GET", f"/objets/search?q={rng.choice(words)}", {}, None),
+            ("GET", "/admin_meta/tags", {}, None),
+            ("GET", "/admin_meta/lieux/nearby?lat=47.32&long=5.04&k=5", {}, None),
+        ])
+
+    def availability(rng, ctx):
+        day = ctx["now"] + timedelta(days=rng.randint(0, 60))
+        objet_id = rng.randint(1, n_objets)
+        return rng.choice([
+            ("GET", f"/objets?limit=50&date_check={day.isoformat()}", {}, None),
+            ("GET", f"/objets/{objet_id}/calendar?from={day.date()}&to={(day + timedelta(days=89)).date()}", {}, None),
+            ("GET", f"/objets/{objet_id}/next_free_slot?after={day.isoformat()}", {}, None),
+        ])
+
+    def booking(rng, ctx):
+        # Few popular objets and weeks: most requests compete for the same units
+        user = rng.randint(1, n_users)
+        body = {"objet_id": rng.randint(1, min(50, n_objets)), "lieu_id": 1,
+                "date_debut": (ctx["now"] + timedelta(days=7 * rng.randint(1, 8))).isoformat()}
+        return "POST", "/reservations", ctx["user_headers"](user), body
+
+    def export(rng, ctx):
+        return ("GET", rng.choice(["/admin/export/objets", "/admin/export/reservations?status=active",
+                                   "/admin/export/users?format=csv"]), ctx["admin_headers"], None)
+
+    n = lambda count: max(1, int(count * scale))
+    return [
+        Scenario("catalogue_browse", "listes, recherche et métadonnées", browse, n(2000), 50),
+        Scenario("availability_check", "disponibilité à une date, calendriers", availability, n(1000), 50),
+        Scenario("booking_burst", "réservations concurrentes sur 50 objets", booking, n(1000), 32,
+                 ok_statuses=(200, 400)),
+        Scenario("admin_export", "exports complets en flux", export, n(30), 3),
+    ]
+
+async def play(app, scenario: Scenario, ctx, seed: int) -> Result:
+    import httpx
+
+    rng = random.Random(seed)
+    plan = [scenario.request(rng, ctx) for _ in range(scenario.requests)]
+    plan.reverse()
+    latencies, errors = [], 0
+
+    async def client_loop(client):
+        nonlocal errors
+        while plan:
+            method, url, headers, body = plan.pop()
+            start = time.perf_counter()
+            res = await client.request(method, url, headers=headers, json=body)
+            latencies.append(time.perf_counter() - start)
+            if res.status_code not in scenario.ok_statuses:
+                errors += 1
+
+    # App exceptions become 500s counted as errors instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(scenario.clients)))
+        elapsed = time.perf_counter() - start
+    return Result(
+        requests=scenario.requests, clients=scenario.clients, errors=errors,
+        throughput=round(scenario.requests / elapsed, 1),
+        p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 99) * 1000, 2),
+    )
+
+def compare(baseline: dict, results: Dict[str, Result], tolerance: float) -> List[str]:
+    """
+    Régressions : requêtes en erreur (5xx, exceptions), quelle que soit la
+    référence, puis débit en baisse ou p95 en hausse au-delà de la tolérance.
+    """
+    regressions = [f"{name}: {result.errors} errors" for name, result in results.items() if result.errors]
+    for name, result in results.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        throughput = result.throughput / before["throughput"] - 1
+        p95 = result.p95_ms / before["p95_ms"] - 1
+        print(f"  {name:20s} throughput {throughput:+7.1%}   p95 {p95:+7.1%}")
+        if throughput < -tolerance:
+            regressions.append(f"{name}: throughput {before['throughput']} -> {result.throughput} req/s")
+        if p95 > tolerance:
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {result.p95_ms} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplie le nombre de requêtes des scénarios")
+    parser.add_argument("--scenario", action="append", help="Ne jouer que ce(s) scénario(s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Écrire les résultats comme nouvelle référence")
+    parser.add_argument("--compare", action="store_true", help="Comparer à la référence")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # Checked before generating data: the baseline is machine-specific and not versioned
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"No baseline at {args.baseline}: run with --save first", file=sys.stderr)
+            return 2
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+
+    # Imported after DATABASE_URL is set so that the app uses the bench database
+    from auth import create_access_token
+    from database import engine
+    from main import app
+    from benchmarks.datagen import populate
+
+    sizes = SIZES[args.size]
+    start = time.perf_counter()
+    now = populate(engine, seed=args.seed, **sizes)
+    print(f"Generated {args.size} dataset in {time.perf_counter() - start:.1f} s: "
+          + ", ".join(f"{k.removeprefix('n_')}={v}" for k, v in sizes.items()))
+
+    ctx = {
+        "now": now,
+        "admin_headers": {"Authorization": f"Bearer {create_access_token({'sub': 'user1@bench.local'})}"},
+        "user_headers": lambda i: {"Authorization": f"Bearer {create_access_token({'sub': f'user{i}@bench.local'})}"},
+    }
+    selected = [s for s in scenarios(sizes, args.scale) if not args.scenario or s.name in args.scenario]
+    results = {}
+
+    # One event loop for every scenario: the async engine's pool is bound to it
+    async def run_all():
+        for i, scenario in enumerate(selected):
+            result = await play(app, scenario, ctx, args.seed + i)
+            results[scenario.name] = result
+            print(f"{scenario.name:20s} {result.throughput:8.1f} req/s   p50 {result.p50_ms:8.2f} ms   "
+                  f"p95 {result.p95_ms:8.2f} ms   p99 {result.p99_ms:8.2f} ms   errors {result.errors}")
+
+    asyncio.run(run_all())
+    tmp.cleanup()
+
+    report = {
+        "meta": {"size": args.size, "scale": args.scale, "seed": args.seed, **sizes,
+                 "python": platform.python_version(), "machine": platform.machine(),
+                 "date": datetime.now().isoformat(timespec="seconds")},
+        "scenarios": {name: asdict(result) for name, result in results.items()},
+    }
+    status = 0
+    if args.compare:
+        if baseline["meta"]["size"] != args.size:
+            print(f"Baseline was recorded with --size {baseline['meta']['size']}", file=sys.stderr)
+            return 2
+        print(f"Compared to {args.baseline} ({baseline['meta']['date']}):")
+        regressions = compare(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        status = 1 if regressions else 0
+    failed = sorted(name for name, result in results.items() if result.errors)
+    if args.save and failed:
+        # Errors are the regression the suite exists to catch: never make them the reference
+        print(f"Baseline not written: errors in {', '.join(failed)}", file=sys.stderr)
+        return 1
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
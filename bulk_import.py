@@ -0,0 +1,212 @@
+"""
+Import en masse d'objets, de consommables et d'utilisateurs.
+
+Les lignes sont validées par lots (schéma, puis références vers les tags,
+associations et consommables en une requête par lot), puis insérées avec
+des executemany dans une seule transaction. Les lignes invalides ne
+bloquent pas l'import : elles sont écartées et signalées dans le rapport.
+
+Utilisé par POST /admin/objets/bulk et en ligne de commande :
+
+    python bulk_import.py objets catalogue.csv
+    python bulk_import.py users adherents.json
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+import revisions
+from auth import get_password_hash
+from availability_counters import refresh_counters
+from models import Association, Consommable, Objet, ObjetConsommableLink, Tag, User
+from routers.objets import ObjetCreate
+
+BATCH_SIZE = 1000
+
+class ConsommableCreate(BaseModel):
+    nom: str
+    description: Optional[str] = None
+    quantite: int = 0
+    prix: float
+
+class UserImport(BaseModel):
+    nom: str
+    prenom: str
+    email: str
+    password: str
+    is_admin: bool = False
+    association_id: Optional[int] = None
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    # {"row": 1-based position in the input, "detail": message}
+    errors: List[Dict[str, Any]] = []
+
+    def fail(self, row: int, detail: str):
+        self.errors.append({"row": row, "detail": detail})
+
+def _batches(rows: List[dict]):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield start, rows[start:start + BATCH_SIZE]
+
+def _validate(schema, batch: List[dict], start: int, report: ImportReport) -> List[tuple]:
+    """(position, ligne validée) des lignes conformes au schéma."""
+    valid = []
+    for offset, raw in enumerate(batch):
+        row = start + offset + 1
+        try:
+            valid.append((row, schema.model_validate(raw)))
+        except ValidationError as exc:
+            report.fail(row, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()))
+    return valid
+
+def _existing_ids(session: Session, model, ids: Iterable[Optional[int]]) -> Set[int]:
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return set()
+    return set(session.exec(select(model.id).where(model.id.in_(ids))).all())
+
+def _check_references(session: Session, valid: List[tuple], report: ImportReport, **references) -> List[tuple]:
+    """Écarte les lignes dont une clé étrangère (champ=modèle) n'existe pas."""
+    known = {
+        field: _existing_ids(session, model, (getattr(item, field) for _, item in valid))
+        for field, model in references.items()
+    }
+    kept = []
+    for row, item in valid:
+        missing = [f"{field}={getattr(item, field)}" for field in references
+                   if getattr(item, field) is not None and getattr(item, field) not in known[field]]
+        if missing:
+            report.fail(row, f"Unknown {', '.join(missing)}")
+        else:
+            kept.append((row, item))
+    return kept
+
+def import_objets(session: Session, rows: List[dict]) -> ImportReport:
+    """Importe des objets (format de POST /objets) et leurs liens vers les consommables."""
+    report = ImportReport()
+    for start, batch in _batches(rows):
+        valid = _validate(ObjetCreate, batch, start, report)
+        valid = _check_references(session, valid, report, tag_id=Tag, association_id=Association)
+        consommables = _existing_ids(session, Consommable, (c for _, item in valid for c in item.consommable_ids))
+        kept = []
+        for row, item in valid:
+            unknown = [c for c in item.consommable_ids if c not in consommables]
+            if unknown:
+                report.fail(row, f"Unknown consommable_ids={unknown}")
+            else:
+                kept.append(item)
+        if not kept:
+            continue
+        # The full-text index is filled by its triggers (search.py)
+        ids = session.execute(
+            insert(Objet).returning(Objet.id, sort_by_parameter_order=True),
+            [item.model_dump(exclude={"consommable_ids"}) for item in kept],
+        ).scalars().all()
+        links = [{"objet_id": objet_id, "consommable_id": c}
+                 for objet_id, item in zip(ids, kept) for c in dict.fromkeys(item.consommable_ids)]
+        if links:
+            session.execute(insert(ObjetConsommableLink), links)
+        refresh_counters(session, ids)
+        report.inserted += len(kept)
+    if report.inserted:
+        # The catalogue's ETag is derived from this revision
+        revisions.bump(session, revisions.OBJETS)
+    return report
+
+def import_consommables(session: Session, rows: List[dict]) -> ImportReport:
+    report = ImportReport()
+    for start, batch in _batches(rows):
+        valid = _validate(ConsommableCreate, batch, start, report)
+        if valid:
+            session.execute(insert(Consommable), [item.model_dump() for _, item in valid])
+            report.inserted += len(valid)
+    if report.inserted:
+        # Public consommable lists are cached under this revision
+        revisions.bump(session, revisions.METADATA)
+    return report
+
+def import_users(session: Session, rows: List[dict], hash_many: Callable[[List[str]], List[str]]) -> ImportReport:
+    """Importe des utilisateurs ; `hash_many` hache une liste de mots de passe (bcrypt)."""
+    report = ImportReport()
+    seen: Set[str] = set()
+    for start, batch in _batches(rows):
+        valid = _check_references(session, _validate(UserImport, batch, start, report), report,
+                                  association_id=Association)
+        emails = [item.email for _, item in valid]
+        taken = set(session.exec(select(User.email).where(User.email.in_(emails))).all()) if emails else set()
+        kept = []
+        for row, item in valid:
+            if item.email in taken or item.email in seen:
+                report.fail(row, f"Email already registered: {item.email}")
+            else:
+                seen.add(item.email)
+                kept.append(item)
+        if not kept:
+            continue
+        hashes = hash_many([item.password for item in kept])
+        session.execute(insert(User), [
+            dict(item.model_dump(exclude={"password"}), password_hash=password_hash)
+            for item, password_hash in zip(kept, hashes)
+        ])
+        report.inserted += len(kept)
+    return report
+
+def parallel_hasher(workers: int = os.cpu_count() or 1) -> Callable[[List[str]], List[str]]:
+    """bcrypt relâche le GIL : des threads suffisent pour utiliser tous les cœurs."""
+    def hash_many(passwords: List[str]) -> List[str]:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(get_password_hash, passwords))
+    return hash_many
+
+def read_rows(path: str) -> List[dict]:
+    """Lit un fichier JSON (liste d'objets) ou CSV (en-tête = noms des champs)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            return json.load(f)
+        rows = []
+        for raw in csv.DictReader(f):
+            row = {key: value for key, value in raw.items() if value != ""}
+            if "consommable_ids" in row:
+                row["consommable_ids"] = [c.strip() for c in row["consommable_ids"].replace(";", ",").split(",") if c.strip()]
+            rows.append(row)
+        return rows
+
+IMPORTERS = {
+    "objets": import_objets,
+    "consommables": import_consommables,
+    "users": lambda session, rows: import_users(session, rows, parallel_hasher()),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import en masse depuis un fichier CSV ou JSON.")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="Valider sans rien enregistrer")
+    args = parser.parse_args(argv)
+
+    from database import create_db_and_tables, engine
+    create_db_and_tables()
+    rows = read_rows(args.path)
+    with Session(engine) as session:
+        report = IMPORTERS[args.kind](session, rows)
+        if args.dry_run:
+            session.rollback()
+        else:
+            session.commit()
+    for error in report.errors:
+        print(f"row {error['row']}: {error['detail']}", file=sys.stderr)
+    verb = "Would import" if args.dry_run else "Imported"
+    print(f"{verb} {report.inserted}/{len(rows)} {args.kind} ({len(report.errors)} errors).")
+    return 1 if report.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Cache en mémoire de réponses sérialisées, invalidé par révision.
+
+Une entrée n'est valable que pour la révision (voir revisions.py) avec
+laquelle elle a été calculée. Le corps est stocké déjà encodé en JSON,
+avec un ETag fort dérivé de son contenu pour répondre 304 aux clients
+qui envoient `If-None-Match`.
+
+`Validators` porte les validateurs d'une réponse calculés sans la
+construire (ETag faible tiré des révisions, Last-Modified), pour
+répondre 304 avant toute lecture du contenu.
+
+Les ETags sont ceux de la réponse non compressée : la compression
+(compression.py) les suffixe de l'encodage (`"…-gzip"`), et la
+comparaison avec If-None-Match ignore ce suffixe.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Hashable, Iterable, Optional
+
+from fastapi import Request, Response
+
+# Content-Encoding values that may suffix an ETag (see compression.py)
+ETAG_ENCODINGS = ("gzip", "br")
+
+def etag_for(content: bytes) -> str:
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag de la même réponse compressée avec `encoding` : W/"abc" -> W/"abc-gzip"."""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+def _opaque(tag: str) -> str:
+    # Weak comparison, every encoding of a response counts as the same version
+    tag = tag.removeprefix("W/")
+    for encoding in ETAG_ENCODINGS:
+        if tag.endswith(f'-{encoding}"'):
+            return tag[:-len(encoding) - 2] + '"'
+    return tag
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    # If-None-Match uses the weak comparison function
+    opaque = _opaque(etag)
+    return "*" in tags or any(_opaque(t) == opaque for t in tags)
+
+def http_date(value: datetime) -> str:
+    """Date HTTP (GMT) ; une date naïve est prise en heure locale."""
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+def modified_since(request: Request, last_modified: datetime) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return True
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        return True
+    # HTTP dates have a one-second resolution
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0) > since
+
+@dataclass
+class Validators:
+    """
+    ETag et Last-Modified d'une réponse. L'ETag fait foi : Last-Modified
+    n'est envoyé qu'une fois sa seconde écoulée, car une date HTTP ne
+    distingue pas deux écritures dans la même seconde (un client qui
+    l'aurait reçue entre les deux recevrait ensuite 304 à tort).
+    """
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    @classmethod
+    def of(cls, parts: Iterable, last_modified: Optional[datetime] = None) -> "Validators":
+        """ETag faible dérivé de `parts` (révisions, paramètres de la requête...)."""
+        digest = etag_for("\x1f".join(map(str, parts)).encode())
+        return cls(f"W/{digest}", last_modified)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None and self._settled():
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+    def _settled(self) -> bool:
+        # Another write may still happen within the second of last_modified
+        second = self.last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        return datetime.now(timezone.utc).replace(microsecond=0) > second
+
+    def fresh(self, request: Request) -> bool:
+        """Le client a déjà cette version (If-None-Match prime sur If-Modified-Since)."""
+        if "if-none-match" in request.headers:
+            return not_modified(request, self.etag)
+        if self.last_modified is None:
+            return False
+        return not modified_since(request, self.last_modified)
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+@dataclass
+class CachedBody:
+    content: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    media_type: str = "application/json"
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", **self.headers}
+        if not_modified(request, self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.content, media_type=self.media_type, headers=headers)
+
+class VersionedCache:
+    """Cache LRU borné dont les entrées portent la révision qui les a produites."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, revision: int) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != revision:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, revision: int, body: CachedBody) -> CachedBody:
+        with self._lock:
+            self._entries[key] = (revision, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class TTLCache:
+    """Cache LRU borné dont les entrées expirent après `ttl` secondes."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
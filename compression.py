@@ -0,0 +1,141 @@
+"""
+Compression des réponses : brotli si le client l'accepte et que le module
+`brotli` est installé (dépendance optionnelle), gzip sinon.
+
+Seules les réponses d'au moins `COMPRESSION_MIN_SIZE` octets et d'un type
+textuel (JSON, NDJSON, CSV...) sont compressées : en dessous, le gain ne
+paie pas le temps de compression. Les réponses en flux (export) sont
+compressées morceau par morceau, sans être mises en mémoire.
+
+Contrairement au `GZipMiddleware` de Starlette, l'encodage est négocié
+selon les valeurs q de `Accept-Encoding`.
+
+Toute réponse d'un type compressible (et tout 304) porte
+`Vary: Accept-Encoding`, compressée ou non, pour qu'un cache partagé ne
+serve pas une version gzip à un client qui ne l'accepte pas. Une réponse
+compressée voit son ETag suffixé de l'encodage (`W/"…-gzip"`) : deux
+encodages d'une même ressource n'ont pas le même ETag.
+"""
+import os
+import zlib
+from typing import Callable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from cache import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# 0-11: low qualities compress faster than gzip -6 and still smaller
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+def supported_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Encodage à utiliser d'après `Accept-Encoding` (None : réponse non compressée)."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    candidates = [
+        (weights.get(coding, weights.get("*", 0.0)), -rank, coding)
+        for rank, coding in enumerate(supported_encodings())
+    ]
+    q, _, coding = max(candidates)
+    return coding if q > 0 else None
+
+def _compressor(encoding: str) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    # wbits=31: gzip container
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+
+        start: Optional[Message] = None
+        compress = finish = None
+
+        async def send_compressed(message: Message):
+            nonlocal start, compress, finish
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk tells whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                headers = MutableHeaders(scope=response_start)
+                if response_start["status"] == 304:
+                    headers.add_vary_header("Accept-Encoding")
+                    # Same ETag as the representation the client holds
+                    if encoding and "etag" in headers and f'-{encoding}"' in request_headers.get("if-none-match", ""):
+                        headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                    await send(response_start)
+                    await send(message)
+                    return
+                if not _compressible(headers):
+                    await send(response_start)
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None or (not more_body and len(body) < self.minimum_size):
+                    await send(response_start)
+                    await send(message)
+                    return
+                compress, finish = _compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                body = compress(body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body += finish()
+                    headers["Content-Length"] = str(len(body))
+                await send(response_start)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+            if compress is None:
+                await send(message)
+                return
+            body = compress(body)
+            if not more_body:
+                body += finish()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,65 @@
+"""
+Base de test partagée par tous les modules de test.
+
+L'application tourne sur un moteur asynchrone : les deux moteurs partagent
+un fichier temporaire. La dépendance `get_session` de l'app est redirigée
+vers cette base pour chaque test, puis rétablie, si bien que l'ordre
+d'import des modules de test n'a plus d'importance.
+"""
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from auth import get_password_hash, user_cache
+from availability import availability_index
+from database import get_session, make_async_engine, make_engine
+from geo import association_index, lieu_index
+from main import app
+from models import User
+from routers.admin_meta import metadata_cache
+
+tmp_dir = tempfile.TemporaryDirectory()
+db_path = os.path.join(tmp_dir.name, "test.db")
+sqlite_url = f"sqlite:///{db_path}"
+engine = make_engine(sqlite_url, echo=False)
+async_engine = make_async_engine(sqlite_url, echo=False)
+
+client = TestClient(app)
+
+async def get_session_override():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+@pytest.fixture(autouse=True)
+def app_database():
+    app.dependency_overrides[get_session] = get_session_override
+    yield
+    app.dependency_overrides.pop(get_session, None)
+
+@pytest.fixture(name="session")
+def session_fixture():
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Revisions restart at 0 with each fresh database: forget the previous one
+        availability_index.rebuild(session)
+        association_index.rebuild(session)
+        lieu_index.rebuild(session)
+        metadata_cache.clear()
+        user_cache.clear()
+        yield session
+    SQLModel.metadata.drop_all(engine)
+
+def login(session, email, is_admin=False):
+    """Crée un utilisateur (mot de passe "pw") et renvoie ses en-têtes d'authentification."""
+    session.add(User(nom="Test", prenom="T", email=email, password_hash=get_password_hash("pw"), is_admin=is_admin))
+    session.commit()
+    res = client.post("/auth/login", data={"username": email, "password": "pw"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+@pytest.fixture(name="admin_headers")
+def admin_headers_fixture(session):
+    return login(session, "admin@test.com", is_admin=True)
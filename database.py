@@ -1,15 +1,153 @@
+import asyncio
 import os
-from sqlmodel import SQLModel, create_engine, Session
+import sqlite3
+import weakref
+from contextlib import asynccontextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from metrics import instrument_engine
+from migrations import migrate
 
 sqlite_file_name = "database.db"
 sqlite_url = os.getenv("DATABASE_URL", f"sqlite:///{sqlite_file_name}")
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+def _env_bool(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# SQLite tuning, applied to every new connection
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer (several gunicorn workers share the file)
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # Safe with WAL: only the last transactions may be lost on power failure
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Wait for the write lock instead of failing with "database is locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative value = size in KiB
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    "temp_store": "MEMORY",
+}
+
+# Seconds a client should wait before retrying a write refused for lock timeout
+LOCK_RETRY_AFTER = os.getenv("LOCK_RETRY_AFTER_SECONDS", "1")
+
+# SQLSTATE lock_not_available (lock_timeout / NOWAIT) on Postgres
+_PG_LOCK_NOT_AVAILABLE = "55P03"
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+# Async drivers used by the request path
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def _engine_options(url, echo):
+    if echo is None:
+        echo = _env_bool("SQL_ECHO")
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        kwargs = {"echo": echo, "connect_args": {"check_same_thread": False}}
+        if not url.database or url.database == ":memory:":
+            kwargs["poolclass"] = StaticPool
+        else:
+            kwargs["pool_size"] = int(os.getenv("DB_POOL_SIZE", "5"))
+            kwargs["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        return kwargs
+    return {
+        "echo": echo,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+
+def make_engine(url: str = sqlite_url, echo: bool = None):
+    """
+    Crée le moteur SQLAlchemy synchrone adapté au backend de `url`
+    (scripts, migrations, tâches de fond).
+
+    SQLite : pragmas de performance sur chaque connexion et pool de
+    connexions par fichier (StaticPool pour une base en mémoire).
+    Autres backends (Postgres) : pool borné avec pre-ping.
+    """
+    engine = create_engine(url, **_engine_options(url, echo))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return instrument_engine(engine)
+
+def make_async_engine(url: str = sqlite_url, echo: bool = None):
+    """Moteur asynchrone des routes : aiosqlite pour SQLite, asyncpg pour Postgres."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    engine = create_async_engine(parsed, **_engine_options(url, echo))
+    if backend == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+def is_lock_timeout(exc: DBAPIError) -> bool:
+    """
+    Vrai si `exc` signale un verrou d'écriture non obtenu à temps : SQLite
+    "database is locked" après busy_timeout, Postgres lock_not_available.
+    La transaction n'a rien écrit, la requête peut être rejouée telle quelle.
+    """
+    orig = exc.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if code == _PG_LOCK_NOT_AVAILABLE:
+        return True
+    message = str(orig).lower()
+    return "database is locked" in message or "database table is locked" in message
+
+# One queue of SQLite writers per event loop (one per worker in production)
+_writer_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+@asynccontextmanager
+async def write_turn(session: AsyncSession):
+    """
+    Attend le tour d'écriture du process avant une transaction qui prend le
+    verrou d'écriture (BEGIN IMMEDIATE).
+
+    SQLite n'a qu'un écrivain et ses connexions en attente sondent le verrou
+    sans ordre : sous charge, l'une d'elles peut perdre jusqu'à dépasser
+    busy_timeout. Les écrivains du process passent donc un par un, dans
+    l'ordre d'arrivée, et seul le premier de la file dispute le verrou aux
+    autres process. Au-delà de busy_timeout dans la file, l'erreur est celle
+    de SQLite ("database is locked"). Sans effet hors SQLite (verrous de ligne).
+    """
+    if session.bind.dialect.name != "sqlite":
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    queue = _writer_queues.get(loop)
+    if queue is None:
+        queue = _writer_queues[loop] = asyncio.Lock()
+    try:
+        await asyncio.wait_for(queue.acquire(), SQLITE_PRAGMAS["busy_timeout"] / 1000)
+    except asyncio.TimeoutError:
+        raise OperationalError("BEGIN IMMEDIATE", None, sqlite3.OperationalError("database is locked")) from None
+    try:
+        yield
+    finally:
+        queue.release()
+
+engine = make_engine()
+async_engine = make_async_engine()
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    # create_all never alters existing tables: apply versioned migrations
+    migrate(engine)
 
-def get_session():
-    with Session(engine) as session:
+async def get_session():
+    # Objects stay readable after commit without another round-trip
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
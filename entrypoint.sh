@@ -1,9 +1,6 @@
 #!/bin/sh
 
-# Initialize/Seed the database
-echo "Seeding database..."
-python seed.py
-
-# Start the server
+# Schema checks and seeding run once in the gunicorn master (gunicorn.conf.py),
+# then each worker warms its pool and caches before /readyz reports ready
 echo "Starting server..."
-exec gunicorn main:app --workers 2 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
+exec gunicorn main:app -c gunicorn.conf.py
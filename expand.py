@@ -0,0 +1,61 @@
+"""
+Paramètre `expand` des listes d'objets et de réservations.
+
+`?expand=tag,association,consommables` inclut les relations demandées
+dans chaque élément au lieu de leur seul identifiant. Elles sont chargées
+pour toute la page en une requête (joinedload pour les relations simples,
+selectinload pour les collections) : le nombre de requêtes ne dépend pas
+de la taille de la page.
+"""
+from typing import Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException, Query
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import Session, select
+
+from models import Objet, Reservation
+from schemas import ObjetRead, ReservationRead
+
+# Relations that may be expanded, per model
+OBJET_RELATIONS = {"tag": Objet.tag, "association": Objet.association, "consommables": Objet.consommables}
+RESERVATION_RELATIONS = {"objet": Reservation.objet, "lieu": Reservation.lieu}
+# Fields shown per model: internal columns (Reservation.revision) stay out of the API
+READ_MODELS = {Objet: ObjetRead, Reservation: ReservationRead}
+
+def expand_params(relations: Dict[str, object]) -> Callable[..., Set[str]]:
+    """Dépendance FastAPI : lit `expand` et refuse les relations inconnues."""
+    async def dependency(
+        expand: Optional[str] = Query(None, description=f"Relations à inclure, parmi : {', '.join(relations)}"),
+    ) -> Set[str]:
+        names = {name.strip() for name in (expand or "").split(",") if name.strip()}
+        unknown = names - relations.keys()
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Cannot expand: {', '.join(sorted(unknown))}")
+        return names
+    return dependency
+
+def _loader(relation):
+    return selectinload(relation) if relation.property.uselist else joinedload(relation)
+
+def _dump(value):
+    if isinstance(value, list):
+        return [item.model_dump() for item in value]
+    return value.model_dump() if value is not None else None
+
+def expanded(session: Session, model, items: list, relations: Dict[str, object], expand: Set[str]) -> List[dict]:
+    """
+    Éléments de la page sous forme de dict, avec les relations `expand`.
+
+    Les lignes déjà lues sont rechargées avec leurs relations en une seule
+    requête (plus une par collection), quelle que soit la taille de la page.
+    """
+    if expand and items:
+        options = [_loader(relations[name]) for name in expand]
+        statement = select(model).where(model.id.in_([item.id for item in items])).options(*options)
+        # Same identity map: the page's instances get their relations populated
+        session.exec(statement).unique().all()
+    fields = set(READ_MODELS[model].model_fields) - relations.keys()
+    return [
+        dict(item.model_dump(include=fields), **{name: _dump(getattr(item, name)) for name in expand})
+        for item in items
+    ]
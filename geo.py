@@ -0,0 +1,133 @@
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from sqlmodel import Session, select
+
+import revisions
+from models import Association, Lieu
+
+EARTH_RADIUS_KM = 6371.0088
+# ~11 km in latitude: a city fits in a handful of cells
+CELL_DEG = 0.1
+
+def haversine_km(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    """Distance orthodromique en kilomètres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(long2 - long1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _cell(lat: float, long: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEG), math.floor(long / CELL_DEG)
+
+def _ring_bound_km(lat: float, ring: int) -> float:
+    """
+    Distance minimale entre (lat, long) et tout point hors du carré de
+    cellules de rayon `ring` centré sur sa cellule : au moins ring * CELL_DEG
+    en latitude, ou en longitude (distance au méridien le plus proche).
+    """
+    delta = math.radians(min(ring * CELL_DEG, 90.0))
+    along_meridian = EARTH_RADIUS_KM * delta
+    across_meridian = EARTH_RADIUS_KM * math.asin(math.sin(delta) * math.cos(math.radians(lat)))
+    return min(along_meridian, across_meridian)
+
+class GeoIndex:
+    """
+    Grille en mémoire des points (id, lat, long) d'une table, pour les
+    requêtes "k plus proches" et "dans un rayon de".
+
+    Les cellules sont parcourues en anneaux autour du point de requête et
+    le parcours s'arrête dès que l'anneau suivant est plus loin que le
+    k-ième résultat : seules quelques cellules sont lues, quel que soit le
+    nombre de sites. L'index est reconstruit quand la révision `metadata`
+    change (toute écriture sur lieux/associations passe par admin_meta).
+    La ligne de changement de date (±180°) n'est pas gérée.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.RLock()
+        self._cells: Dict[Tuple[int, int], List[Tuple[int, float, float]]] = {}
+        self._extent: Optional[Tuple[int, int, int, int]] = None
+        self.generation: Optional[int] = None
+
+    def rebuild(self, session: Session):
+        generation = revisions.current(session, revisions.METADATA)
+        rows = session.exec(select(self.model.id, self.model.lat, self.model.long)).all()
+        cells: Dict[Tuple[int, int], List[Tuple[int, float, float]]] = {}
+        for point_id, lat, long in rows:
+            cells.setdefault(_cell(lat, long), []).append((point_id, lat, long))
+        extent = None
+        if cells:
+            rows_, cols = zip(*cells)
+            extent = (min(rows_), max(rows_), min(cols), max(cols))
+        with self._lock:
+            self._cells = cells
+            self._extent = extent
+            self.generation = generation
+
+    def sync(self, session: Session):
+        """Reconstruit l'index si lieux ou associations ont changé."""
+        if revisions.outdated(session, revisions.METADATA, self.generation):
+            self.rebuild(session)
+
+    def nearest(self, lat: float, long: float, k: Optional[int] = None,
+                radius_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """(id, distance_km) des k points les plus proches, dans le rayon, triés par distance."""
+        with self._lock:
+            cells, extent = self._cells, self._extent
+        if extent is None or k == 0:
+            return []
+        row0, col0 = _cell(lat, long)
+        # Beyond this ring every occupied cell has been visited
+        last_ring = max(abs(row0 - extent[0]), abs(row0 - extent[1]),
+                        abs(col0 - extent[2]), abs(col0 - extent[3]))
+        found: List[Tuple[float, int]] = []
+
+        def visit(points):
+            for point_id, plat, plong in points:
+                distance = haversine_km(lat, long, plat, plong)
+                if radius_km is None or distance <= radius_km:
+                    found.append((distance, point_id))
+
+        for ring in range(last_ring + 1):
+            if (2 * ring + 1) ** 2 > 4 * len(cells):
+                # Far from the data, rings are mostly empty: scan the
+                # remaining occupied cells directly
+                visit(point for cell, points in cells.items()
+                      if max(abs(cell[0] - row0), abs(cell[1] - col0)) >= ring
+                      for point in points)
+                break
+            for cell in _ring_cells(row0, col0, ring, extent):
+                visit(cells.get(cell, ()))
+            limit = radius_km if radius_km is not None else math.inf
+            if k is not None and len(found) >= k:
+                found.sort()
+                del found[k:]
+                limit = min(limit, found[-1][0])
+            if _ring_bound_km(lat, ring) > limit:
+                break
+        found.sort()
+        if k is not None:
+            del found[k:]
+        return [(point_id, distance) for distance, point_id in found]
+
+    def within(self, lat: float, long: float, radius_km: float) -> Set[int]:
+        return {point_id for point_id, _ in self.nearest(lat, long, radius_km=radius_km)}
+
+def _ring_cells(row0: int, col0: int, ring: int, extent: Tuple[int, int, int, int]):
+    """Cellules à distance `ring` de (row0, col0), limitées à l'emprise des points."""
+    min_row, max_row, min_col, max_col = extent
+    cols = range(max(col0 - ring, min_col), min(col0 + ring, max_col) + 1)
+    for row in (row0 - ring, row0 + ring) if ring else (row0,):
+        if min_row <= row <= max_row:
+            for col in cols:
+                yield row, col
+    for row in range(max(row0 - ring + 1, min_row), min(row0 + ring - 1, max_row) + 1):
+        for col in (col0 - ring, col0 + ring) if ring else ():
+            if min_col <= col <= max_col:
+                yield row, col
+
+lieu_index = GeoIndex(Lieu)
+association_index = GeoIndex(Association)
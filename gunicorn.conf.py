@@ -0,0 +1,15 @@
+"""
+Configuration gunicorn : `gunicorn main:app -c gunicorn.conf.py`.
+
+Le schéma et les données initiales sont préparés une fois dans le process
+maître (startup.prepare_database), avant le lancement des workers.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+def on_starting(server):
+    from startup import prepare_database
+    prepare_database()
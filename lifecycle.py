@@ -0,0 +1,108 @@
+"""
+Cycle de vie des réservations, exécuté en tâche de fond (voir scheduler.py).
+
+- Les réservations actives dont la date de fin est dépassée depuis plus de
+  OVERDUE_GRACE_HOURS passent au statut `en_retard` : elles ne comptent
+  plus parmi les réservations actives parcourues par les contrôles de
+  disponibilité, et restent visibles de l'admin jusqu'au retour.
+- Les réservations terminées ou annulées depuis plus de ARCHIVE_AFTER_DAYS
+  sont déplacées dans `reservation_archive`.
+
+Ce sont deux tâches distinctes : le passage en retard, court, est rattrapé
+au démarrage avant de servir ; l'archivage, dont l'arriéré peut être long
+après un arrêt, est laissé aux workers.
+
+Les deux opérations travaillent par lots de LIFECYCLE_BATCH_SIZE lignes,
+chacun dans sa propre transaction courte : le verrou d'écriture est
+relâché entre deux lots et les réservations en cours ne sont pas bloquées.
+
+    python lifecycle.py     # exécute les deux tâches une fois
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, insert, literal, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from models import Reservation, ReservationArchive
+from scheduler import scheduler
+import revisions
+
+OVERDUE = "en_retard"
+CLOSED_STATUSES = ("terminee", "annulee")
+
+OVERDUE_GRACE = timedelta(hours=float(os.getenv("OVERDUE_GRACE_HOURS", "24")))
+ARCHIVE_AFTER = timedelta(days=float(os.getenv("ARCHIVE_AFTER_DAYS", "365")))
+BATCH_SIZE = int(os.getenv("LIFECYCLE_BATCH_SIZE", "500"))
+INTERVAL_SECONDS = float(os.getenv("LIFECYCLE_INTERVAL_SECONDS", "300"))
+# Gives waiting writers a chance to take the lock between two batches
+BATCH_PAUSE = 0.01
+
+_ARCHIVED_COLUMNS = ["id", "date_debut", "date_fin", "status", "user_id", "objet_id", "lieu_id"]
+
+def _batch_ids(session: Session, where, batch_size: int):
+    # No ORDER BY: SQLite walks ix_reservation_status_date_fin and stops at the limit
+    return session.exec(select(Reservation.id).where(*where).limit(batch_size)).all()
+
+def mark_overdue(engine: Engine, now: Optional[datetime] = None, grace: timedelta = OVERDUE_GRACE,
+                 batch_size: int = BATCH_SIZE) -> int:
+    """Passe en retard les réservations actives échues ; renvoie le nombre de lignes modifiées."""
+    where = (Reservation.status == "active", Reservation.date_fin < (now or datetime.now()) - grace)
+    marked = 0
+    while True:
+        with Session(engine) as session:
+            ids = _batch_ids(session, where, batch_size)
+            if not ids:
+                return marked
+            # Active reservations changed: availability indexes of every worker re-read these rows
+            generation = revisions.bump(session, revisions.RESERVATIONS)
+            session.exec(update(Reservation).where(Reservation.id.in_(ids), *where)
+                         .values(status=OVERDUE, revision=generation))
+            session.commit()
+        marked += len(ids)
+        if len(ids) < batch_size:
+            return marked
+        time.sleep(BATCH_PAUSE)
+
+def archive_reservations(engine: Engine, now: Optional[datetime] = None, horizon: timedelta = ARCHIVE_AFTER,
+                         batch_size: int = BATCH_SIZE) -> int:
+    """Déplace les réservations closes anciennes dans reservation_archive ; renvoie le nombre de lignes."""
+    now = now or datetime.now()
+    where = (Reservation.status.in_(CLOSED_STATUSES), Reservation.date_fin < now - horizon)
+    archived = 0
+    while True:
+        with Session(engine) as session:
+            ids = _batch_ids(session, where, batch_size)
+            if not ids:
+                return archived
+            rows = select(*[getattr(Reservation, c) for c in _ARCHIVED_COLUMNS], literal(now)).where(
+                Reservation.id.in_(ids))
+            session.exec(insert(ReservationArchive).from_select(_ARCHIVED_COLUMNS + ["archived_at"], rows))
+            session.exec(delete(Reservation).where(Reservation.id.in_(ids)))
+            # Only closed rows move: availability is unchanged, no revision bump
+            session.commit()
+        archived += len(ids)
+        if len(ids) < batch_size:
+            return archived
+        time.sleep(BATCH_PAUSE)
+
+# Availability checks skip overdue reservations: up to date before serving
+@scheduler.every(INTERVAL_SECONDS, name="reservation_overdue", at_startup=True)
+def run_overdue() -> int:
+    from database import engine
+    return mark_overdue(engine)
+
+@scheduler.every(INTERVAL_SECONDS, name="reservation_archive")
+def run_archive() -> int:
+    from database import engine
+    return archive_reservations(engine)
+
+def run_lifecycle() -> Dict[str, int]:
+    return {"overdue": run_overdue(), "archived": run_archive()}
+
+if __name__ == "__main__":
+    result = run_lifecycle()
+    print(f"{result['overdue']} reservation(s) marked overdue, {result['archived']} archived.")
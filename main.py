@@ -1,18 +1,57 @@
-from fastapi import FastAPI
-from database import create_db_and_tables
-from routers import users, admin_meta, objets, reservations
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import DBAPIError
+from routers import users, admin_meta, objets, reservations, export, bulk
+from scheduler import SCHEDULER_ENABLED, scheduler
+import availability_counters, lifecycle  # register their background jobs
+import metrics
+import replica
+import startup
+from database import LOCK_RETRY_AFTER, is_lock_timeout
+from compression import CompressionMiddleware
 
-app = FastAPI(title="Armoire Commune API")
+app = FastAPI(title="Armoire Commune API", default_response_class=ORJSONResponse)
+app.add_middleware(metrics.MetricsMiddleware)
+# Outermost: Server-Timing measures the application, not the compression
+app.add_middleware(CompressionMiddleware)
+
+@app.exception_handler(DBAPIError)
+async def database_busy(request: Request, exc: DBAPIError):
+    # Write lock still held by another writer after busy_timeout: nothing was
+    # written, the client retries instead of receiving a 500
+    if not is_lock_timeout(exc):
+        raise exc
+    return ORJSONResponse(
+        {"detail": "Database busy, retry later"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": LOCK_RETRY_AFTER},
+    )
+
+@app.on_event("startup")
+async def on_startup():
+    # Schema (unless the gunicorn master prepared it), then pool and cache warm-up
+    await startup.warm_up()
 
 @app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+async def start_scheduler():
+    if SCHEDULER_ENABLED:
+        # The gunicorn master may have caught up the startup jobs already
+        scheduler.start(caught_up=startup.state.caught_up)
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
 
 app.include_router(users.router)
 app.include_router(admin_meta.router)
 app.include_router(objets.router)
 app.include_router(reservations.router)
+app.include_router(export.router)
+app.include_router(bulk.router)
+app.include_router(metrics.router)
+app.include_router(replica.router)
+app.include_router(startup.router)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Bienvenue sur l'API de l'Armoire Commune de Dijon"}
@@ -0,0 +1,179 @@
+"""
+Instrumentation des requêtes : latence par route, requêtes SQL et temps
+passé en base.
+
+- `MetricsMiddleware` (ASGI) mesure chaque requête HTTP, l'attribue au
+  modèle de route (`/objets/{objet_id}`, pas l'URL brute) et ajoute un
+  en-tête `Server-Timing` (temps total, temps SQL, nombre de requêtes).
+- `instrument_engine` branche des événements SQLAlchemy sur un moteur
+  pour compter les requêtes SQL et leur durée, rattachées à la requête
+  HTTP en cours via une variable de contexte.
+- `GET /metrics` expose le tout au format texte de Prometheus.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from sqlalchemy import event
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# SQL statements per request: N+1 patterns land in the upper buckets
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Optional bearer token required to scrape /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Mutated in place: greenlets and tasks spawned by the request share the object
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+class Registry:
+    """Métriques du process (chaque worker gunicorn expose les siennes)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+        self.sql_total = 0
+        self.sql_seconds_total = 0.0
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            key = (method, route, str(status))
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault((method, route), Histogram(QUERY_BUCKETS)).observe(stats.queries)
+            self.db_seconds[(method, route)] = self.db_seconds.get((method, route), 0.0) + stats.db_seconds
+
+    def observe_sql(self, seconds: float):
+        with self._lock:
+            self.sql_total += 1
+            self.sql_seconds_total += seconds
+
+    def gauge(self, name: str, help_text: str, fn: Callable[[], float]):
+        """Jauge dont la valeur est lue par `fn` à chaque rendu."""
+        with self._lock:
+            self.gauges[name] = (help_text, fn)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            _histograms(lines, "http_request_duration_seconds", "Request latency by route", self.latency,
+                        ("method", "route", "status"))
+            _histograms(lines, "http_request_sql_queries", "SQL statements per request", self.queries,
+                        ("method", "route"))
+            lines += ["# HELP http_request_sql_seconds_total Time spent in SQL by route",
+                      "# TYPE http_request_sql_seconds_total counter"]
+            for labels, seconds in sorted(self.db_seconds.items()):
+                lines.append(f"http_request_sql_seconds_total{_labels(('method', 'route'), labels)} {seconds}")
+            lines += ["# HELP sql_queries_total SQL statements, requests and background work",
+                      "# TYPE sql_queries_total counter", f"sql_queries_total {self.sql_total}",
+                      "# HELP sql_seconds_total Time spent in SQL statements",
+                      "# TYPE sql_seconds_total counter", f"sql_seconds_total {self.sql_seconds_total}"]
+            for name, (help_text, fn) in sorted(self.gauges.items()):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {fn()}"]
+        return "\n".join(lines) + "\n"
+
+def _labels(names, values) -> str:
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+def _histograms(lines, name, help_text, histograms, label_names):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for values, histogram in sorted(histograms.items()):
+        base = ",".join(f'{n}="{v}"' for n, v in zip(label_names, values))
+        cumulative = 0
+        for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{base}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{base}}} {histogram.count}")
+
+registry = Registry()
+
+def instrument_engine(engine):
+    """Compte les requêtes SQL du moteur (synchrone, ou `async_engine.sync_engine`)."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        registry.observe_sql(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    return engine
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Middleware ASGI : histogrammes de latence et en-tête Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                          f"app;dur={total_ms:.1f}")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            registry.observe_request(scope["method"], _route_template(scope), status,
+                                     time.perf_counter() - start, stats)
+
+router = APIRouter(tags=["Monitoring"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,96 @@
+"""
+Migrations versionnées du schéma.
+
+`SQLModel.metadata.create_all` crée les tables manquantes mais ne modifie
+jamais une table existante : les changements apportés à un `database.db`
+déjà en production passent donc par ici. Chaque migration est appliquée
+une seule fois, dans l'ordre, et sa version est enregistrée dans la
+table `schema_migration`.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from models import Reservation, Revision
+from search import create_search_index
+
+_meta = MetaData()
+schema_migration = Table(
+    "schema_migration",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+
+def migration(version: int, description: str):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+def _create_indexes(conn: Connection, table: str, indexes: Dict[str, Tuple[str, ...]]):
+    # Fixed per migration: the live models may declare columns that a later migration adds
+    for name, columns in indexes.items():
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+@migration(1, "Index composites reservation et catalogue")
+def add_hot_column_indexes(conn: Connection):
+    _create_indexes(conn, "reservation", {
+        "ix_reservation_objet_status_dates": ("objet_id", "status", "date_debut", "date_fin"),
+        "ix_reservation_user_date_debut": ("user_id", "date_debut"),
+    })
+    _create_indexes(conn, "objet", {"ix_objet_tag_id": ("tag_id",), "ix_objet_nom": ("nom",)})
+
+@migration(2, "Index plein texte du catalogue (FTS5)")
+def add_search_index(conn: Connection):
+    create_search_index(conn)
+
+@migration(3, "Index des tâches de fond sur les réservations")
+def add_lifecycle_index(conn: Connection):
+    # reservation_archive itself is created by create_all
+    _create_indexes(conn, "reservation", {"ix_reservation_status_date_fin": ("status", "date_fin")})
+
+@migration(4, "Date de modification des révisions")
+def add_revision_timestamp(conn: Connection):
+    if "modifie_le" in {c["name"] for c in inspect(conn).get_columns("revision")}:
+        return
+    column_type = Revision.__table__.c.modifie_le.type.compile(conn.dialect)
+    conn.execute(text(f"ALTER TABLE revision ADD COLUMN modifie_le {column_type}"))
+
+@migration(5, "Révision des réservations (rattrapage incrémental des index)")
+def add_reservation_revision(conn: Connection):
+    if "revision" not in {c["name"] for c in inspect(conn).get_columns("reservation")}:
+        column_type = Reservation.__table__.c.revision.type.compile(conn.dialect)
+        conn.execute(text(f"ALTER TABLE reservation ADD COLUMN revision {column_type}"))
+    _create_indexes(conn, "reservation", {"ix_reservation_revision": ("revision",)})
+
+def current_version(conn: Connection) -> int:
+    versions = conn.execute(select(schema_migration.c.version)).scalars().all()
+    return max(versions, default=0)
+
+def migrate(engine: Engine) -> List[int]:
+    """Applique les migrations en attente et renvoie les versions appliquées."""
+    applied = []
+    _meta.create_all(engine)
+    with engine.begin() as conn:
+        version = current_version(conn)
+        for target, description, fn in MIGRATIONS:
+            if target <= version:
+                continue
+            fn(conn)
+            conn.execute(schema_migration.insert().values(
+                version=target, description=description, applied_at=datetime.utcnow()
+            ))
+            applied.append(target)
+    return applied
+
+if __name__ == "__main__":
+    from database import engine
+    applied = migrate(engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema up to date.")
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import Index
 from datetime import datetime
 
 # Link Table for Many-to-Many between Objet and Consommable
@@ -49,6 +50,11 @@ class Consommable(SQLModel, table=True):
     objets: List["Objet"] = Relationship(back_populates="consommables", link_model=ObjetConsommableLink)
 
 class Objet(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_objet_tag_id", "tag_id"),
+        Index("ix_objet_nom", "nom"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     nom: str
     description: str
@@ -66,10 +72,19 @@ class Objet(SQLModel, table=True):
     reservations: List["Reservation"] = Relationship(back_populates="objet")
 
 class Reservation(SQLModel, table=True):
+    __table_args__ = (
+        # Availability checks: overlap of active reservations for one objet
+        Index("ix_reservation_objet_status_dates", "objet_id", "status", "date_debut", "date_fin"),
+        # /reservations/me
+        Index("ix_reservation_user_date_debut", "user_id", "date_debut"),
+        # Background jobs: overdue and archivable rows
+        Index("ix_reservation_status_date_fin", "status", "date_fin"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     date_debut: datetime
     date_fin: datetime
-    status: str = "active"  # active, terminee, annulee
+    status: str = "active"  # active, en_retard, terminee, annulee
 
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     user: Optional[User] = Relationship()
@@ -79,3 +94,41 @@ class Reservation(SQLModel, table=True):
 
     lieu_id: Optional[int] = Field(default=None, foreign_key="lieu.id")
     lieu: Optional[Lieu] = Relationship()
+
+    # "reservations" revision of the transaction that last wrote the row:
+    # availability indexes re-read only the rows changed since their revision
+    revision: Optional[int] = Field(default=None, index=True)
+
+class ObjetDisponibilite(SQLModel, table=True):
+    """État de disponibilité matérialisé d'un objet (voir availability_counters.py)."""
+    __tablename__ = "objet_disponibilite"
+
+    objet_id: int = Field(foreign_key="objet.id", primary_key=True)
+    # Active reservations overlapping a 7-day booking that starts at refresh time
+    reservees: int = 0
+    # A reservation starting at refresh time would be accepted
+    reservable: bool = True
+    # The state may change after this date (a reservation ends or enters the window); None = never
+    valide_jusqu_a: Optional[datetime] = None
+
+class ReservationArchive(SQLModel, table=True):
+    """Réservations closes déplacées hors de la table chaude (voir lifecycle.py)."""
+    __tablename__ = "reservation_archive"
+
+    # Same id as the original reservation; no foreign keys so that archived
+    # history never blocks deleting an objet or a user
+    id: int = Field(primary_key=True)
+    date_debut: datetime
+    date_fin: datetime
+    status: str
+    user_id: Optional[int] = Field(default=None, index=True)
+    objet_id: Optional[int] = None
+    lieu_id: Optional[int] = None
+    archived_at: datetime
+
+class Revision(SQLModel, table=True):
+    """Compteur de version partagé entre workers, incrémenté à chaque écriture d'un domaine."""
+    nom: str = Field(primary_key=True)
+    valeur: int = 0
+    # Last bump (local time), used as Last-Modified
+    modifie_le: Optional[datetime] = None
@@ -0,0 +1,79 @@
+"""
+Pagination par curseur (keyset) des routes de liste.
+
+Le corps de la réponse reste une liste ; le curseur de la page suivante
+est renvoyé dans l'en-tête `X-Next-Cursor` (absent sur la dernière page).
+Le curseur est opaque pour les clients : il encode les valeurs des
+colonnes de tri de la dernière ligne renvoyée.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlmodel import Session
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+@dataclass
+class Page:
+    limit: int
+    cursor: Optional[str] = None
+
+# async: FastAPI runs plain `def` dependencies in its threadpool, one hop per call
+async def page_params(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Nombre maximum d'éléments"),
+    cursor: Optional[str] = Query(None, description=f"Valeur de l'en-tête {NEXT_CURSOR_HEADER} de la page précédente"),
+) -> Page:
+    return Page(limit=limit, cursor=cursor)
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(v) if col.type.python_type is datetime else v
+            for col, v in zip(columns, values)
+        )
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(session: Session, query, page: Page, response: Response, *columns, keep: Optional[Callable] = None):
+    """
+    Exécute `query` trié par `columns` à partir du curseur de `page`.
+    `keep` permet de filtrer les lignes en Python (disponibilité) : on lit
+    alors autant de lots que nécessaire pour remplir la page.
+    """
+    query = query.order_by(*columns)
+    after = decode_cursor(page.cursor, columns) if page.cursor else None
+    items = []
+    while True:
+        batch_query = query
+        if after is not None:
+            batch_query = batch_query.where(tuple_(*columns) > tuple_(*after))
+        batch = session.exec(batch_query.limit(page.limit + 1)).all()
+        for row in batch:
+            if keep is None or keep(row):
+                items.append(row)
+                if len(items) > page.limit:
+                    break
+            after = tuple(getattr(row, col.key) for col in columns)
+        if len(items) > page.limit or len(batch) <= page.limit:
+            break
+
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, col.key) for col in columns)
+    return items
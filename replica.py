@@ -0,0 +1,159 @@
+"""
+Lectures sur un réplica.
+
+Les routes publiques en lecture seule (catalogue, calendriers, métadonnées,
+exports) prennent leur session via `get_read_session`, servie par :
+
+- READ_DATABASE_URL : un réplica (Postgres en réplication en continu) ;
+- sinon, avec SQLite et SQLITE_SNAPSHOT_INTERVAL_SECONDS > 0 : un
+  instantané de la base (SQLITE_SNAPSHOT_PATH), recopié périodiquement
+  par l'API de sauvegarde en ligne de SQLite ;
+- sinon : la base principale, comme `get_session`.
+
+Le retard du réplica est estimé toutes les REPLICA_CHECK_INTERVAL_SECONDS
+en comparant ses révisions (revisions.py) à celles de la base principale.
+Tant qu'il n'a pas été mesuré, ou s'il dépasse MAX_REPLICA_LAG_SECONDS,
+les lectures restent sur la base principale. Les écritures et les
+lectures qui doivent voir leurs propres écritures (réservations de
+l'utilisateur) passent toujours par `get_session`.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.engine import make_url
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import revisions
+from auth import get_current_admin
+from database import SQLITE_PRAGMAS, engine, get_session, make_async_engine, make_engine, sqlite_url
+from metrics import registry
+from models import Revision, User
+from scheduler import scheduler
+
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or None
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SQLITE_SNAPSHOT_INTERVAL_SECONDS", "0"))
+MAX_LAG_SECONDS = float(os.getenv("MAX_REPLICA_LAG_SECONDS", "30"))
+CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+
+_primary = make_url(sqlite_url)
+SNAPSHOT_PATH = os.getenv("SQLITE_SNAPSHOT_PATH") or f"{_primary.database}.snapshot"
+
+if READ_DATABASE_URL:
+    MODE = "replica"
+elif SNAPSHOT_INTERVAL_SECONDS > 0 and _primary.get_backend_name() == "sqlite" and _primary.database not in (None, "", ":memory:"):
+    MODE = "snapshot"
+else:
+    MODE = None
+
+read_url = READ_DATABASE_URL or (f"sqlite:///{SNAPSHOT_PATH}" if MODE == "snapshot" else None)
+read_engine = make_engine(read_url) if read_url else None
+read_async_engine = make_async_engine(read_url) if read_url else None
+
+@dataclass
+class ReplicaStatus:
+    lag_seconds: Optional[float] = None
+    checked_at: Optional[datetime] = None
+    last_snapshot: Optional[datetime] = None
+
+    def current_lag(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Majorant du retard actuel : retard mesuré plus le temps écoulé depuis la mesure."""
+        if self.lag_seconds is None:
+            return None
+        return self.lag_seconds + ((now or datetime.now()) - self.checked_at).total_seconds()
+
+    def usable(self, now: Optional[datetime] = None) -> bool:
+        lag = self.current_lag(now)
+        return lag is not None and lag <= MAX_LAG_SECONDS
+
+status = ReplicaStatus()
+
+def measure_lag(primary: Session, replica: Session, now: datetime) -> float:
+    """
+    Retard (secondes) du réplica : 0 s'il a vu toutes les écritures de la
+    base principale. Sinon les écritures manquantes sont postérieures à la
+    dernière qu'il connaît pour le domaine concerné : le retard est au plus
+    le temps écoulé depuis celle-ci.
+    """
+    # Primary first: a write landing on the replica meanwhile can only lower the lag
+    principal = {nom: valeur for nom, valeur in primary.exec(select(Revision.nom, Revision.valeur))}
+    copie = {nom: (valeur, modifie_le) for nom, valeur, modifie_le in
+             replica.exec(select(Revision.nom, Revision.valeur, Revision.modifie_le))}
+    lag = 0.0
+    for nom, valeur in principal.items():
+        vu, modifie_le = copie.get(nom, (0, None))
+        if vu >= valeur:
+            continue
+        if modifie_le is None:
+            return float("inf")
+        lag = max(lag, (now - modifie_le).total_seconds())
+    return lag
+
+def check_lag() -> Optional[float]:
+    if read_engine is None:
+        return None
+    now = datetime.now()
+    try:
+        with Session(engine) as primary, Session(read_engine) as replica:
+            lag = measure_lag(primary, replica, now)
+    except Exception:
+        # Unreachable replica, or snapshot not taken yet: reads stay on the primary
+        status.lag_seconds = None
+        raise
+    status.lag_seconds, status.checked_at = lag, now
+    return lag
+
+def backup_sqlite(source_path: str, target_path: str):
+    """Copie cohérente d'une base SQLite en service (API de sauvegarde en ligne)."""
+    timeout = SQLITE_PRAGMAS["busy_timeout"] / 1000
+    with closing(sqlite3.connect(source_path, timeout=timeout)) as source, \
+            closing(sqlite3.connect(target_path, timeout=timeout)) as target:
+        # One step: a consistent image of the source; WAL readers of the
+        # target keep their view until the copy commits
+        source.backup(target)
+
+_snapshot_lock = threading.Lock()
+
+def take_snapshot() -> Optional[float]:
+    """Recopie la base principale dans l'instantané, puis mesure le retard."""
+    with _snapshot_lock:
+        started = datetime.now()
+        backup_sqlite(_primary.database, SNAPSHOT_PATH)
+        status.last_snapshot = started
+    return check_lag()
+
+if MODE == "snapshot":
+    scheduler.every(SNAPSHOT_INTERVAL_SECONDS, name="sqlite_snapshot")(take_snapshot)
+if MODE is not None:
+    scheduler.every(CHECK_INTERVAL_SECONDS, name="replica_lag")(check_lag)
+    registry.gauge("replica_lag_seconds", "Estimated read replica lag (-1: unknown)",
+                   lambda: status.current_lag() if status.lag_seconds is not None else -1)
+
+async def get_read_session(primary: AsyncSession = Depends(get_session)):
+    """Session des routes en lecture seule : le réplica s'il est assez à jour, la base principale sinon."""
+    if read_async_engine is None or not status.usable():
+        yield primary
+        return
+    # Caches synced from this session never go back to an older revision (revisions.outdated)
+    async with AsyncSession(read_async_engine, expire_on_commit=False, info={revisions.REPLICA: True}) as session:
+        yield session
+
+router = APIRouter(tags=["Monitoring"])
+
+@router.get("/admin/replica")
+async def replica_status(admin: User = Depends(get_current_admin)):
+    """Mode de lecture, retard mesuré du réplica et routage actuel des lectures."""
+    return {
+        "mode": MODE,
+        "lag_seconds": status.current_lag(),
+        "checked_at": status.checked_at,
+        "last_snapshot": status.last_snapshot,
+        "max_lag_seconds": MAX_LAG_SECONDS,
+        "reads_on_replica": read_async_engine is not None and status.usable(),
+    }
@@ -0,0 +1,69 @@
+"""
+Compteurs de révision stockés en base.
+
+Plusieurs workers gunicorn partagent la même base : un cache en mémoire
+ne peut pas savoir seul qu'un autre process a écrit. Chaque route qui
+modifie un domaine appelle `bump` dans sa transaction, et les caches
+comparent leur révision à `current` pour savoir s'ils sont périmés.
+La date de la dernière incrémentation sert de Last-Modified (`watermark`).
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlmodel import Session, select, update
+
+from models import Revision
+
+OBJETS = "objets"
+RESERVATIONS = "reservations"
+METADATA = "metadata"
+USERS = "users"
+
+# Session.info key of read sessions on a replica (replica.py)
+REPLICA = "replica"
+
+def current(session: Session, nom: str) -> int:
+    valeur = session.exec(select(Revision.valeur).where(Revision.nom == nom)).first()
+    return valeur or 0
+
+def outdated(session: Session, nom: str, generation: Optional[int]) -> bool:
+    """
+    Un cache calculé à la révision `generation` doit-il être reconstruit ?
+    Un réplica en retard ne fait pas revenir un cache à une révision plus ancienne.
+    """
+    valeur = current(session, nom)
+    if generation is not None and valeur < generation and session.info.get(REPLICA):
+        return False
+    return valeur != generation
+
+def bump(session: Session, nom: str) -> int:
+    """
+    Incrémente la révision dans la transaction en cours et renvoie la nouvelle valeur.
+
+    Les révisions suivent l'ordre des commits, ce sur quoi repose le
+    rattrapage incrémental (`Reservation.revision > generation`) : la
+    ligne du compteur reste verrouillée jusqu'au commit. Sur Postgres,
+    deux transactions qui incrémentent le même domaine s'attendent donc
+    l'une l'autre, même sur des objets différents ; d'où `bump` en dernier,
+    juste avant le commit. Une séquence ne convient pas : ses valeurs sont
+    prises dans l'ordre des appels, pas des commits, et un index pourrait
+    dépasser une réservation encore en cours d'écriture.
+    """
+    now = datetime.now()
+    result = session.exec(update(Revision).where(Revision.nom == nom).values(valeur=Revision.valeur + 1, modifie_le=now))
+    if result.rowcount == 0:
+        session.add(Revision(nom=nom, valeur=1, modifie_le=now))
+        session.flush()
+        return 1
+    return current(session, nom)
+
+def watermark(session: Session, *noms: str) -> Tuple[Tuple[int, ...], Optional[datetime]]:
+    """Révisions de plusieurs domaines en une requête, et date de la plus récente écriture."""
+    rows = {
+        nom: (valeur, modifie_le)
+        for nom, valeur, modifie_le in session.exec(
+            select(Revision.nom, Revision.valeur, Revision.modifie_le).where(Revision.nom.in_(noms))
+        )
+    }
+    valeurs = tuple(rows.get(nom, (0, None))[0] for nom in noms)
+    return valeurs, max((d for _, d in rows.values() if d is not None), default=None)
@@ -1,65 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 from database import get_session
+from replica import get_read_session
 from models import Tag, Lieu, Consommable, User, Association
 from auth import get_current_admin
+from cache import CachedBody, VersionedCache, etag_for
+from geo import GeoIndex, association_index, lieu_index
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER, Page, page_params, paginate
+from schemas import AssociationRead, ConsommableRead, LieuRead, TagRead, dump_rows, read_columns
+import revisions
 
 router = APIRouter(prefix="/admin_meta", tags=["Admin Metadata"])
 
+# Public lists only change through the admin routes below, which bump the
+# "metadata" revision: cached pages are reused until then.
+metadata_cache = VersionedCache()
+
+async def cached_page(session: AsyncSession, model, read_model, page: Page) -> CachedBody:
+    revision = await session.run_sync(revisions.current, revisions.METADATA)
+    key = (model.__name__, page.limit, page.cursor)
+    body = metadata_cache.get(key, revision)
+    if body is None:
+        response = Response()
+        query = select(*read_columns(read_model, model))
+        items = await session.run_sync(paginate, query, page, response, model.id)
+        content = dump_rows(items)
+        headers = {}
+        if NEXT_CURSOR_HEADER in response.headers:
+            headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+        body = metadata_cache.put(key, revision, CachedBody(content, etag_for(content), headers))
+    return body
+
+async def cached_list(request: Request, session: AsyncSession, model, read_model, page: Page):
+    return (await cached_page(session, model, read_model, page)).response(request)
+
+PUBLIC_LISTS = ((Association, AssociationRead), (Tag, TagRead), (Lieu, LieuRead), (Consommable, ConsommableRead))
+
+async def warm_metadata_cache(session: AsyncSession):
+    """Met en cache la première page de chaque liste publique (démarrage)."""
+    for model, read_model in PUBLIC_LISTS:
+        await cached_page(session, model, read_model, Page(limit=DEFAULT_LIMIT))
+
+async def nearby(session: AsyncSession, index: GeoIndex, lat: float, long: float, radius: Optional[float], k: int):
+    """Instances les plus proches de (lat, long), avec leur distance, via l'index géographique."""
+    await session.run_sync(index.sync)
+    distances = dict(index.nearest(lat, long, k=k, radius_km=radius))
+    if not distances:
+        return []
+    rows = (await session.exec(select(index.model).where(index.model.id.in_(distances)))).all()
+    results = [dict(row.model_dump(), distance_km=round(distances[row.id], 3)) for row in rows]
+    return sorted(results, key=lambda r: (r["distance_km"], r["id"]))
+
+class AssociationProche(AssociationRead):
+    distance_km: float
+
+class LieuProche(LieuRead):
+    distance_km: float
+
+async def save(session: AsyncSession, instance):
+    session.add(instance)
+    await session.run_sync(revisions.bump, revisions.METADATA)
+    await session.commit()
+    await session.refresh(instance)
+    return instance
+
 # Associations
 @router.post("/associations", response_model=Association)
-def create_association(association: Association, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    session.add(association)
-    session.commit()
-    session.refresh(association)
-    return association
+async def create_association(association: Association, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    return await save(session, association)
 
-@router.get("/associations", response_model=List[Association], tags=["Public Metadata"])
-def list_associations(session: Session = Depends(get_session)):
-    return session.exec(select(Association)).all()
+@router.get("/associations", response_model=List[AssociationRead], tags=["Public Metadata"])
+async def list_associations(request: Request, page: Page = Depends(page_params), session: AsyncSession = Depends(get_read_session)):
+    return await cached_list(request, session, Association, AssociationRead, page)
+
+@router.get("/associations/nearby", response_model=List[AssociationProche], tags=["Public Metadata"])
+async def nearby_associations(
+    lat: float = Query(..., ge=-90, le=90),
+    long: float = Query(..., ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0, description="Distance maximale en km"),
+    k: int = Query(10, ge=1, le=MAX_LIMIT, description="Nombre maximum de résultats"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    return await nearby(session, association_index, lat, long, radius, k)
 
 # Tags
 @router.post("/tags", response_model=Tag)
-def create_tag(tag: Tag, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    session.add(tag)
-    session.commit()
-    session.refresh(tag)
-    return tag
+async def create_tag(tag: Tag, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    return await save(session, tag)
 
-@router.get("/tags", response_model=List[Tag], tags=["Public Metadata"])
-def list_tags(session: Session = Depends(get_session)):
-    return session.exec(select(Tag)).all()
+@router.get("/tags", response_model=List[TagRead], tags=["Public Metadata"])
+async def list_tags(request: Request, page: Page = Depends(page_params), session: AsyncSession = Depends(get_read_session)):
+    return await cached_list(request, session, Tag, TagRead, page)
 
 # Lieux
 @router.post("/lieux", response_model=Lieu)
-def create_lieu(lieu: Lieu, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    session.add(lieu)
-    session.commit()
-    session.refresh(lieu)
-    return lieu
+async def create_lieu(lieu: Lieu, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    return await save(session, lieu)
+
+@router.get("/lieux", response_model=List[LieuRead], tags=["Public Metadata"])
+async def list_lieux(request: Request, page: Page = Depends(page_params), session: AsyncSession = Depends(get_read_session)):
+    return await cached_list(request, session, Lieu, LieuRead, page)
 
-@router.get("/lieux", response_model=List[Lieu], tags=["Public Metadata"])
-def list_lieux(session: Session = Depends(get_session)):
-    return session.exec(select(Lieu)).all()
+@router.get("/lieux/nearby", response_model=List[LieuProche], tags=["Public Metadata"])
+async def nearby_lieux(
+    lat: float = Query(..., ge=-90, le=90),
+    long: float = Query(..., ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0, description="Distance maximale en km"),
+    k: int = Query(10, ge=1, le=MAX_LIMIT, description="Nombre maximum de résultats"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Points de retrait les plus proches, triés par distance."""
+    return await nearby(session, lieu_index, lat, long, radius, k)
 
 @router.delete("/lieux/{lieu_id}")
-def delete_lieu(lieu_id: int, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    lieu = session.get(Lieu, lieu_id)
+async def delete_lieu(lieu_id: int, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    lieu = await session.get(Lieu, lieu_id)
     if not lieu:
         raise HTTPException(status_code=404, detail="Lieu not found")
-    session.delete(lieu)
-    session.commit()
+    await session.delete(lieu)
+    await session.run_sync(revisions.bump, revisions.METADATA)
+    await session.commit()
     return {"ok": True}
 
 # Consommables
 @router.post("/consommables", response_model=Consommable)
-def create_consommable(consommable: Consommable, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    session.add(consommable)
-    session.commit()
-    session.refresh(consommable)
-    return consommable
-
-@router.get("/consommables", response_model=List[Consommable], tags=["Public Metadata"])
-def list_consommables(session: Session = Depends(get_session)):
-    return session.exec(select(Consommable)).all()
+async def create_consommable(consommable: Consommable, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    return await save(session, consommable)
+
+@router.get("/consommables", response_model=List[ConsommableRead], tags=["Public Metadata"])
+async def list_consommables(request: Request, page: Page = Depends(page_params), session: AsyncSession = Depends(get_read_session)):
+    return await cached_list(request, session, Consommable, ConsommableRead, page)
@@ -0,0 +1,43 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from auth import get_current_admin
+from bulk_import import ImportReport, import_consommables, import_objets
+from database import get_session
+from models import User
+
+router = APIRouter(prefix="/admin", tags=["Import"])
+
+MAX_BULK_ROWS = 50_000
+
+async def run_import(session: AsyncSession, importer, rows: List[Dict[str, Any]], dry_run: bool) -> ImportReport:
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per import")
+    # Valid rows go in one transaction; invalid ones are only reported
+    report = await session.run_sync(importer, rows)
+    if dry_run:
+        await session.rollback()
+    else:
+        await session.commit()
+    return report
+
+@router.post("/objets/bulk", response_model=ImportReport)
+async def bulk_objets(
+    rows: List[Dict[str, Any]] = Body(..., description="Objets au format de POST /objets"),
+    dry_run: bool = False,
+    session: AsyncSession = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+):
+    """Importe un catalogue d'objets ; les erreurs sont rapportées ligne par ligne."""
+    return await run_import(session, import_objets, rows, dry_run)
+
+@router.post("/consommables/bulk", response_model=ImportReport)
+async def bulk_consommables(
+    rows: List[Dict[str, Any]] = Body(...),
+    dry_run: bool = False,
+    session: AsyncSession = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+):
+    return await run_import(session, import_consommables, rows, dry_run)
@@ -0,0 +1,93 @@
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from replica import get_read_session
+from models import Reservation, Objet, User
+from auth import get_current_admin
+
+router = APIRouter(prefix="/admin/export", tags=["Export"])
+
+# Rows are read from the database by chunks of this size
+YIELD_PER = 1000
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+def _columns(model, exclude=()):
+    return [c for c in model.__table__.columns if c.key not in exclude]
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def _stream(bind, query, names, fmt: ExportFormat):
+    # The request session is closed before the body is sent: stream from our own
+    async with AsyncSession(bind) as session:
+        rows = await session.stream(query.execution_options(yield_per=YIELD_PER))
+        if fmt == ExportFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            async for chunk in rows.partitions():
+                writer.writerows([[_encode(v) for v in row] for row in chunk])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for chunk in rows.partitions():
+                # orjson encodes datetimes in ISO 8601 itself
+                yield b"".join(orjson.dumps(dict(zip(names, row))) + b"\n" for row in chunk)
+
+def _response(session: AsyncSession, columns, query, fmt: ExportFormat, name: str):
+    names = [c.key for c in columns]
+    filename = f"{name}.{'csv' if fmt == ExportFormat.csv else 'ndjson'}"
+    return StreamingResponse(
+        _stream(session.bind, query, names, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/reservations")
+async def export_reservations(
+    format: ExportFormat = ExportFormat.ndjson,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    admin: User = Depends(get_current_admin),
+):
+    """Réservations dont le début est dans [date_from, date_to), filtrées par statut."""
+    columns = _columns(Reservation, exclude={"revision"})
+    query = select(*columns).order_by(Reservation.id)
+    if date_from:
+        query = query.where(Reservation.date_debut >= date_from)
+    if date_to:
+        query = query.where(Reservation.date_debut < date_to)
+    if status:
+        query = query.where(Reservation.status == status)
+    return _response(session, columns, query, format, "reservations")
+
+@router.get("/objets")
+async def export_objets(format: ExportFormat = ExportFormat.ndjson, session: AsyncSession = Depends(get_read_session), admin: User = Depends(get_current_admin)):
+    columns = _columns(Objet)
+    return _response(session, columns, select(*columns).order_by(Objet.id), format, "objets")
+
+@router.get("/users")
+async def export_users(format: ExportFormat = ExportFormat.ndjson, session: AsyncSession = Depends(get_read_session), admin: User = Depends(get_current_admin)):
+    columns = _columns(User, exclude={"password_hash"})
+    return _response(session, columns, select(*columns).order_by(User.id), format, "users")
@@ -1,14 +1,31 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from sqlmodel import Session, select, SQLModel
-from datetime import datetime, timedelta
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date, datetime, timedelta
 
-from database import get_session
-from models import Objet, User, Consommable, ObjetConsommableLink, Reservation
+import revisions
+from cache import Validators
+from database import get_session, write_turn
+from replica import get_read_session
+from models import Objet, ObjetDisponibilite, User, ObjetConsommableLink
 from auth import get_current_admin
+from expand import OBJET_RELATIONS, expand_params, expanded
+from availability import RESERVATION_DURATION, availability_index, booking_window, lock_objet
+from availability_counters import check_counters, refresh_counters, reservable_filter
+from geo import association_index
+from pagination import MAX_LIMIT, Page, page_params, paginate
+from schemas import ObjetRead, json_rows, read_columns
+from search import name_filter, search_objets
 
 router = APIRouter(tags=["Objets"])
 
+OBJET_COLUMNS = read_columns(ObjetRead, Objet)
+
+# Writes that can change a catalogue page (tags and associations are expandable)
+CATALOGUE_REVISIONS = (revisions.OBJETS, revisions.RESERVATIONS, revisions.METADATA)
+
 class ObjetCreate(SQLModel):
     nom: str
     description: str
@@ -19,14 +36,52 @@ class ObjetCreate(SQLModel):
     consommable_ids: List[int] = []
     disponibilite_globale: bool = True
 
+@dataclass
+class Proximite:
+    lat: float
+    long: float
+    radius: float
+
+async def proximite_params(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    long: Optional[float] = Query(None, ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0, description="Distance maximale (km) à l'association propriétaire"),
+) -> Optional[Proximite]:
+    given = [v is not None for v in (lat, long, radius)]
+    if not any(given):
+        return None
+    if not all(given):
+        raise HTTPException(status_code=400, detail="lat, long and radius must be given together")
+    return Proximite(lat, long, radius)
+
+async def catalogue_validators(request: Request, session: AsyncSession, available_now: bool) -> Validators:
+    """
+    ETag et Last-Modified d'une page du catalogue, calculés à partir des
+    révisions sans lire les objets. Les objets disponibles "maintenant"
+    changent aussi avec le temps (une réservation se termine) : la dernière
+    de ces échéances entre alors dans les validateurs.
+    """
+    valeurs, modifie_le = await session.run_sync(revisions.watermark, *CATALOGUE_REVISIONS)
+    parts = [request.url.path, sorted(request.query_params.multi_items()), *valeurs]
+    if available_now:
+        await session.run_sync(availability_index.sync)
+        change = availability_index.last_change(datetime.now())
+        parts.append(change)
+        modifie_le = max(filter(None, (modifie_le, change)), default=None)
+    return Validators.of(parts, modifie_le)
+
+async def associations_proches(session: AsyncSession, proximite: Proximite) -> Set[int]:
+    await session.run_sync(association_index.sync)
+    return association_index.within(proximite.lat, proximite.long, proximite.radius)
+
 @router.post("/objets", response_model=Objet)
-def create_objet(objet_in: ObjetCreate, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
+async def create_objet(objet_in: ObjetCreate, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
     # Create Objet, excluding extra fields
     objet_data = objet_in.dict(exclude={"consommable_ids"})
     db_objet = Objet(**objet_data)
     session.add(db_objet)
-    session.commit()
-    session.refresh(db_objet)
+    # Flush for the id, then link and commit once
+    await session.flush()
 
     # Link Consommables
     for c_id in objet_in.consommable_ids:
@@ -34,68 +89,215 @@ def create_objet(objet_in: ObjetCreate, session: Session = Depends(get_session),
         link = ObjetConsommableLink(objet_id=db_objet.id, consommable_id=c_id)
         session.add(link)
 
-    session.commit()
-    session.refresh(db_objet)
+    await session.run_sync(refresh_counters, [db_objet.id])
+    await session.run_sync(revisions.bump, revisions.OBJETS)
+    await session.commit()
+    await session.refresh(db_objet)
     return db_objet
 
-@router.get("/objets", response_model=List[Objet])
-def list_objets(
+@router.get("/objets", response_model=List[ObjetRead])
+async def list_objets(
+    request: Request,
+    response: Response,
     nom: Optional[str] = None,
     tag_id: Optional[int] = None,
     available: bool = Query(True, description="Filter by availability"),
     date_check: Optional[datetime] = None,
-    session: Session = Depends(get_session)
+    page: Page = Depends(page_params),
+    proximite: Optional[Proximite] = Depends(proximite_params),
+    expand: Set[str] = Depends(expand_params(OBJET_RELATIONS)),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    query = select(Objet)
+    # Revalidation (If-None-Match / If-Modified-Since) is answered before any catalogue read
+    validators = await catalogue_validators(request, session, available and date_check is None)
+    if validators.fresh(request):
+        return validators.not_modified()
+
+    # Without expand, rows are read as plain tuples and encoded straight to JSON
+    query = select(Objet) if expand else select(*OBJET_COLUMNS)
     if nom:
-        query = query.where(Objet.nom.contains(nom))
+        # Word-prefix match, case and accent insensitive (search.py)
+        query = query.where(name_filter(session.bind.dialect.name, nom))
     if tag_id:
         query = query.where(Objet.tag_id == tag_id)
-
-    objets = session.exec(query).all()
+    if proximite:
+        query = query.where(Objet.association_id.in_(await associations_proches(session, proximite)))
 
     if not available:
-        return objets
+        items = await session.run_sync(paginate, query, page, response, Objet.id)
+        if expand:
+            items = await session.run_sync(expanded, Objet, items, OBJET_RELATIONS, expand)
+        return json_rows(items, response, validators.headers)
 
     # Filter by availability
     if not date_check:
         date_check = datetime.now()
+        # Materialized state: objets known to be fully booked never reach Python
+        query = query.outerjoin(ObjetDisponibilite).where(reservable_filter(date_check))
 
     # We check if we can START a reservation at date_check (7 days duration)
-    check_start = date_check
-    check_end = date_check + timedelta(days=7)
+    check_start, check_end = booking_window(date_check)
+
+    # Overlaps are answered by the in-memory availability index
+    await session.run_sync(availability_index.sync)
+    query = query.where(Objet.disponibilite_globale == True)
+    items = await session.run_sync(
+        paginate, query, page, response, Objet.id,
+        keep=lambda obj: obj.quantite > availability_index.booked(obj.id, check_start, check_end),
+    )
+    if expand:
+        items = await session.run_sync(expanded, Objet, items, OBJET_RELATIONS, expand)
+    return json_rows(items, response, validators.headers)
+
+@router.get("/objets/search", response_model=List[ObjetRead])
+async def search(
+    q: str = Query(..., min_length=1, description="Mots recherchés dans le nom, la description et le tag"),
+    tag_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    proximite: Optional[Proximite] = Depends(proximite_params),
+    expand: Set[str] = Depends(expand_params(OBJET_RELATIONS)),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Recherche plein texte, résultats classés par pertinence."""
+    association_ids = await associations_proches(session, proximite) if proximite else None
+    items = await session.run_sync(search_objets, q, limit, tag_id, association_ids)
+    return json_rows(await session.run_sync(expanded, Objet, items, OBJET_RELATIONS, expand))
+
+@router.get("/objets/{objet_id}/next_free_slot")
+async def next_free_slot(objet_id: int, after: Optional[datetime] = None, session: AsyncSession = Depends(get_read_session)):
+    """Première date à laquelle une réservation de 7 jours peut commencer."""
+    obj = await session.get(Objet, objet_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail="Objet not found")
+    if after is None:
+        after = datetime.now()
+    free_at = None
+    if obj.disponibilite_globale:
+        await session.run_sync(availability_index.sync)
+        free_at = availability_index.earliest_free_slot(obj.id, obj.quantite, after)
+    return {"objet_id": obj.id, "next_free_slot": free_at}
+
+MAX_AVAILABILITY_CHECKS = 500
+
+class DemandeDisponibilite(SQLModel):
+    objet_id: int
+    date_debut: datetime
+
+class Disponibilite(SQLModel):
+    objet_id: int
+    date_debut: datetime
+    # Units not booked over the 7-day booking window (0 for an unknown objet)
+    disponible: int
+    reservable: bool
+
+@router.post("/objets/availability", response_model=List[Disponibilite])
+async def check_availability(demandes: List[DemandeDisponibilite], session: AsyncSession = Depends(get_read_session)):
+    """Réservabilité de plusieurs (objet, date de début), dans l'ordre de la demande."""
+    if len(demandes) > MAX_AVAILABILITY_CHECKS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_AVAILABILITY_CHECKS} checks per request")
+    rows = await session.exec(
+        select(Objet.id, Objet.quantite, Objet.disponibilite_globale)
+        .where(Objet.id.in_({d.objet_id for d in demandes}))
+    )
+    quantites = {objet_id: quantite if disponible else 0 for objet_id, quantite, disponible in rows}
+    # Overlaps are answered by the in-memory availability index
+    await session.run_sync(availability_index.sync)
+    resultats = []
+    for demande in demandes:
+        booked = availability_index.booked(demande.objet_id, *booking_window(demande.date_debut))
+        disponible = max(quantites.get(demande.objet_id, 0) - booked, 0)
+        resultats.append(Disponibilite(objet_id=demande.objet_id, date_debut=demande.date_debut,
+                                       disponible=disponible, reservable=disponible > 0))
+    return resultats
 
-    available_objets = []
+MAX_CALENDAR_DAYS = 366
+MAX_CALENDAR_OBJETS = 100
 
-    for obj in objets:
-        if not obj.disponibilite_globale:
-            continue
+class JourCalendrier(SQLModel):
+    date: date
+    # Units not booked on that day
+    disponible: int
+    # A 7-day reservation starting that day would be accepted
+    reservable: bool
 
-        # Count overlapping reservations
-        overlap_count = 0
-        for res in obj.reservations:
-            if res.status == 'active':
-                # Overlap logic: Res.start < CheckEnd AND Res.end > CheckStart
-                if res.date_debut < check_end and res.date_fin > check_start:
-                    overlap_count += 1
+class Calendrier(SQLModel):
+    objet_id: int
+    quantite: int
+    jours: List[JourCalendrier]
 
-        if obj.quantite > overlap_count:
-            available_objets.append(obj)
+async def calendar_params(
+    from_: Optional[date] = Query(None, alias="from", description="Premier jour (aujourd'hui par défaut)"),
+    to: Optional[date] = Query(None, description="Dernier jour inclus (90 jours par défaut)"),
+) -> Tuple[date, int]:
+    first_day = from_ or date.today()
+    last_day = to or first_day + timedelta(days=89)
+    days = (last_day - first_day).days + 1
+    if days <= 0:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if days > MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Calendar limited to {MAX_CALENDAR_DAYS} days")
+    return first_day, days
 
-    return available_objets
+def calendrier(obj: Objet, first_day: date, days: int) -> Calendrier:
+    """Capacité restante jour par jour, en un passage sur les réservations de l'objet (index en mémoire)."""
+    quantite = obj.quantite if obj.disponibilite_globale else 0
+    per_day = availability_index.daily_booked(obj.id, first_day, days)
+    # Same rule as POST /reservations: overlaps with the 7-day booking window
+    per_window = availability_index.daily_booked(obj.id, first_day, days, RESERVATION_DURATION)
+    jours = [
+        JourCalendrier(date=first_day + timedelta(days=i), disponible=max(quantite - booked, 0),
+                       reservable=quantite > window_booked)
+        for i, (booked, window_booked) in enumerate(zip(per_day, per_window))
+    ]
+    return Calendrier(objet_id=obj.id, quantite=obj.quantite, jours=jours)
+
+@router.get("/objets/calendar", response_model=List[Calendrier])
+async def objets_calendar(
+    ids: List[int] = Query(..., description="Identifiants des objets"),
+    period: Tuple[date, int] = Depends(calendar_params),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Calendrier de disponibilité de plusieurs objets (objets inconnus ignorés)."""
+    if len(ids) > MAX_CALENDAR_OBJETS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CALENDAR_OBJETS} objets per calendar")
+    objets = {obj.id: obj for obj in (await session.exec(select(Objet).where(Objet.id.in_(ids)))).all()}
+    await session.run_sync(availability_index.sync)
+    return [calendrier(objets[i], *period) for i in dict.fromkeys(ids) if i in objets]
+
+@router.get("/objets/{objet_id}/calendar", response_model=Calendrier)
+async def objet_calendar(objet_id: int, period: Tuple[date, int] = Depends(calendar_params), session: AsyncSession = Depends(get_read_session)):
+    """Disponibilité jour par jour d'un objet entre `from` et `to`."""
+    obj = await session.get(Objet, objet_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail="Objet not found")
+    await session.run_sync(availability_index.sync)
+    return calendrier(obj, *period)
 
 @router.put("/admin/objets/{objet_id}/available")
-def set_objet_availability(objet_id: int, available: bool, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
+async def set_objet_availability(objet_id: int, available: bool, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
     """
     Route spéciale pour dire qu'un objet est de nouveau disponible (physiquement),
     ou pour le marquer indisponible (réparation).
     Note: Cela change la 'disponibilite_globale', pas les réservations.
     Pour le retour de réservation, voir /reservations/return.
     """
-    obj = session.get(Objet, objet_id)
+    obj = await session.get(Objet, objet_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Objet not found")
+    async with write_turn(session):
+        return await session.run_sync(_set_availability, objet_id, available)
+
+def _set_availability(session: Session, objet_id: int, available: bool) -> Objet:
+    # Whole write-locked section in one block, as for bookings
+    obj = lock_objet(session, objet_id)
     obj.disponibilite_globale = available
     session.add(obj)
+    refresh_counters(session, [obj.id])
+    revisions.bump(session, revisions.OBJETS)
     session.commit()
     return obj
+
+@router.get("/admin/objets/counters/check")
+async def check_availability_counters(session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    """Compare les compteurs de disponibilité aux réservations, sans rien modifier."""
+    return await session.run_sync(check_counters)
@@ -1,24 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
-from typing import List
-from datetime import datetime, timedelta
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
 from pydantic import BaseModel
 
-from database import get_session
+from database import get_session, write_turn
 from models import Reservation, Objet, User, Lieu
 from auth import get_current_user, get_current_admin
+from availability import availability_index, booking_window, count_overlaps_many, lock_objet, lock_objets
+from availability_counters import refresh_counters
+from expand import RESERVATION_RELATIONS, expand_params, expanded
+from pagination import Page, page_params, paginate
+from schemas import ReservationCreated, ReservationRead, json_rows, read_columns
+import revisions
 
 router = APIRouter(tags=["Reservations"])
 
+RESERVATION_COLUMNS = read_columns(ReservationRead, Reservation)
+
+MAX_BASKET = 20
+
 class ReservationCreate(BaseModel):
     objet_id: int
     lieu_id: int
     date_debut: datetime
 
-@router.post("/reservations", response_model=Reservation)
-def create_reservation(res_in: ReservationCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+@router.post("/reservations", response_model=ReservationCreated)
+async def create_reservation(res_in: ReservationCreate, session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
     # 1. Check Objet
-    obj = session.get(Objet, res_in.objet_id)
+    obj = await session.get(Objet, res_in.objet_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Objet not found")
 
@@ -26,49 +37,141 @@ def create_reservation(res_in: ReservationCreate, session: Session = Depends(get
     if not obj.disponibilite_globale:
         raise HTTPException(status_code=400, detail="Objet currently unavailable (broken/maintenance)")
 
-    date_fin = res_in.date_debut + timedelta(days=7)
+    date_debut, date_fin = booking_window(res_in.date_debut)
 
-    # Count overlap
-    overlap_count = 0
-    # Note: accessing obj.reservations triggers a query if not loaded.
-    for res in obj.reservations:
-        if res.status == 'active':
-            # Overlap logic: Res.start < New.End AND Res.end > New.Start
-            if res.date_debut < date_fin and res.date_fin > res_in.date_debut:
-                overlap_count += 1
+    # Fast path: reject from the in-memory index without taking the write lock
+    await session.run_sync(availability_index.sync)
+    if availability_index.booked(obj.id, date_debut, date_fin) >= obj.quantite:
+        raise HTTPException(status_code=400, detail="Objet not available for this date")
 
-    if overlap_count >= obj.quantite:
+    # Authoritative check and insert under the objet's write lock
+    async with write_turn(session):
+        conflicts, reservations, generation = await session.run_sync(book, current_user.id, [res_in], [(date_debut, date_fin)])
+    if conflicts:
         raise HTTPException(status_code=400, detail="Objet not available for this date")
+    availability_index.record(reservations[0], generation)
+    return reservations[0]
+
+def basket_conflicts(items: List[ReservationCreate], windows: List[Tuple[datetime, datetime]],
+                     objets: Dict[int, Objet], booked: List[int]) -> List[int]:
+    """
+    Objets du panier qui ne peuvent pas être réservés. `booked[k]` compte les
+    réservations existantes qui chevauchent la ligne k ; les lignes précédentes
+    du panier sur le même objet comptent aussi (même règle qu'une suite de
+    POST /reservations).
+    """
+    conflicts = set()
+    for k, (item, (debut, fin)) in enumerate(zip(items, windows)):
+        obj = objets.get(item.objet_id)
+        in_basket = sum(
+            1 for j in range(k)
+            if items[j].objet_id == item.objet_id and windows[j][0] < fin and windows[j][1] > debut
+        )
+        if obj is None or not obj.disponibilite_globale or booked[k] + in_basket >= obj.quantite:
+            conflicts.add(item.objet_id)
+    return sorted(conflicts)
 
-    # 3. Create
-    db_res = Reservation(
-        objet_id=res_in.objet_id,
-        user_id=current_user.id,
-        lieu_id=res_in.lieu_id,
-        date_debut=res_in.date_debut,
-        date_fin=date_fin,
-        status="active"
-    )
-    session.add(db_res)
+def book(session: Session, user_id: int, items: List[ReservationCreate],
+         windows: List[Tuple[datetime, datetime]]) -> Tuple[List[int], List[Reservation], Optional[int]]:
+    """
+    Section critique d'une réservation ou d'un panier : verrou des objets,
+    contrôle des chevauchements en base, insertion, compteurs et commit.
+
+    Exécutée d'un seul `run_sync`, à son tour d'écriture (`write_turn`) :
+    aucune autre étape de la requête ne s'intercale tant que le verrou
+    d'écriture est tenu, les autres écrivains attendent le moins longtemps
+    possible. La révision est prise en dernier, juste avant le commit (voir
+    revisions.bump). Renvoie (objets en conflit, réservations créées,
+    révision) ; rien n'est écrit en cas de conflit.
+    """
+    objets = lock_objets(session, {item.objet_id for item in items})
+    booked = count_overlaps_many(session, [(item.objet_id, *window) for item, window in zip(items, windows)])
+    conflicts = basket_conflicts(items, windows, objets, booked)
+    if conflicts:
+        session.rollback()
+        return conflicts, [], None
+
+    reservations = [
+        Reservation(objet_id=item.objet_id, user_id=user_id, lieu_id=item.lieu_id,
+                    date_debut=debut, date_fin=fin, status="active")
+        for item, (debut, fin) in zip(items, windows)
+    ]
+    session.add_all(reservations)
+    refresh_counters(session, objets.keys())
+    generation = stamp(session, reservations)
     session.commit()
-    session.refresh(db_res)
-    return db_res
+    return [], reservations, generation
+
+def stamp(session: Session, reservations: List[Reservation]) -> int:
+    # Last statements before commit: the revision row stays locked as briefly as possible
+    generation = revisions.bump(session, revisions.RESERVATIONS)
+    for reservation in reservations:
+        reservation.revision = generation
+    return generation
 
-@router.get("/reservations/me", response_model=List[Reservation])
-def list_my_reservations(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    return session.exec(select(Reservation).where(Reservation.user_id == current_user.id)).all()
+@router.post("/reservations/batch", response_model=List[ReservationCreated])
+async def create_reservations(items: List[ReservationCreate], session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
+    """Réserve plusieurs objets en une transaction : tout le panier est réservé, ou rien."""
+    if not items:
+        raise HTTPException(status_code=400, detail="Empty basket")
+    if len(items) > MAX_BASKET:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BASKET} reservations per basket")
+    windows = [booking_window(item.date_debut) for item in items]
 
-@router.get("/admin/reservations", response_model=List[Reservation])
-def list_all_reservations(session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    return session.exec(select(Reservation)).all()
+    objets = {obj.id: obj for obj in (await session.exec(select(Objet).where(Objet.id.in_({i.objet_id for i in items})))).all()}
+    unknown = sorted({item.objet_id for item in items} - objets.keys())
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Objets not found: {unknown}")
+
+    # Fast path: reject from the in-memory index without taking the write lock
+    await session.run_sync(availability_index.sync)
+    booked = [availability_index.booked(item.objet_id, *window) for item, window in zip(items, windows)]
+    conflicts = basket_conflicts(items, windows, objets, booked)
+    if conflicts:
+        raise HTTPException(status_code=400, detail=f"Objets not available for these dates: {conflicts}")
+
+    # Authoritative check: every objet locked, one overlap query for the whole basket
+    async with write_turn(session):
+        conflicts, db_reservations, generation = await session.run_sync(book, current_user.id, items, windows)
+    if conflicts:
+        raise HTTPException(status_code=400, detail=f"Objets not available for these dates: {conflicts}")
+    availability_index.record_many(db_reservations, generation)
+    return db_reservations
+
+@router.get("/reservations/me", response_model=List[ReservationRead])
+async def list_my_reservations(response: Response, page: Page = Depends(page_params), expand: Set[str] = Depends(expand_params(RESERVATION_RELATIONS)), session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
+    query = (select(Reservation) if expand else select(*RESERVATION_COLUMNS)).where(Reservation.user_id == current_user.id)
+    items = await session.run_sync(paginate, query, page, response, Reservation.date_debut, Reservation.id)
+    if expand:
+        items = await session.run_sync(expanded, Reservation, items, RESERVATION_RELATIONS, expand)
+    return json_rows(items, response)
+
+@router.get("/admin/reservations", response_model=List[ReservationRead])
+async def list_all_reservations(response: Response, page: Page = Depends(page_params), expand: Set[str] = Depends(expand_params(RESERVATION_RELATIONS)), session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    query = select(Reservation) if expand else select(*RESERVATION_COLUMNS)
+    items = await session.run_sync(paginate, query, page, response, Reservation.date_debut, Reservation.id)
+    if expand:
+        items = await session.run_sync(expanded, Reservation, items, RESERVATION_RELATIONS, expand)
+    return json_rows(items, response)
 
 @router.post("/admin/reservations/{reservation_id}/return")
-def return_object(reservation_id: int, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
-    res = session.get(Reservation, reservation_id)
+async def return_object(reservation_id: int, session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    res = await session.get(Reservation, reservation_id)
     if not res:
         raise HTTPException(status_code=404, detail="Reservation not found")
 
+    # Same lock as bookings of the objet: its availability counters are rewritten
+    async with write_turn(session):
+        generation = await session.run_sync(close_reservation, res)
+    availability_index.discard(res.id, generation)
+    return {"message": "Object returned", "reservation_id": reservation_id}
+
+def close_reservation(session: Session, res: Reservation) -> int:
+    """Termine la réservation sous le verrou de son objet, d'un seul bloc comme `book` ; renvoie la révision."""
+    lock_objet(session, res.objet_id)
     res.status = "terminee"
     session.add(res)
+    refresh_counters(session, [res.objet_id])
+    generation = stamp(session, [res])
     session.commit()
-    return {"message": "Object returned", "reservation_id": reservation_id}
+    return generation
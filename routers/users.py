@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 from datetime import timedelta
 from pydantic import BaseModel
@@ -8,7 +9,7 @@ import os
 
 from database import get_session
 from models import User
-from auth import get_password_hash, create_access_token, verify_password, get_current_admin, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import get_password_hash_async, create_access_token, verify_password_async, get_current_admin, get_current_user, commit_user_change, hash_stats, user_cache, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter()
 
@@ -35,14 +36,17 @@ class SuperPromoteRequest(BaseModel):
     password: str
     is_admin: bool
 
+async def find_user(session: AsyncSession, email: str) -> Optional[User]:
+    return (await session.exec(select(User).where(User.email == email))).first()
+
 @router.post("/auth/signup", response_model=UserRead)
-def create_user(user: UserCreate, session: Session = Depends(get_session)):
+async def create_user(user: UserCreate, session: AsyncSession = Depends(get_session)):
     # Check if user exists
-    existing_user = session.exec(select(User).where(User.email == user.email)).first()
+    existing_user = await find_user(session, user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         nom=user.nom,
         prenom=user.prenom,
@@ -52,15 +56,15 @@ def create_user(user: UserCreate, session: Session = Depends(get_session)):
         association_id=user.association_id
     )
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
     return db_user
 
 @router.post("/auth/login", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_session)):
     # OAuth2PasswordRequestForm expects username and password
-    user = session.exec(select(User).where(User.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await find_user(session, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -73,24 +77,23 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), ses
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=UserRead)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.put("/admin/users/{user_id}/promote")
-def promote_user(user_id: int, is_admin: bool, current_admin: User = Depends(get_current_admin), session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+async def promote_user(user_id: int, is_admin: bool, current_admin: User = Depends(get_current_admin), session: AsyncSession = Depends(get_session)):
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.is_admin = is_admin
-    session.add(user)
-    session.commit()
+    await commit_user_change(session, user)
     return {"message": f"User {user.email} admin status set to {is_admin}"}
 
 @router.post("/admin/users/{user_id}/super-promote")
-def promote_user_super(
+async def promote_user_super(
     user_id: int,
     request: SuperPromoteRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     super_password = os.getenv("superUserPassword")
     if not super_password or request.password != super_password:
@@ -99,11 +102,18 @@ def promote_user_super(
             detail="Could not validate credentials"
         )
 
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.is_admin = request.is_admin
-    session.add(user)
-    session.commit()
+    await commit_user_change(session, user)
     return {"message": f"User {user.email} admin status set to {request.is_admin}"}
+
+@router.get("/admin/auth-cache")
+async def auth_cache_stats(current_admin: User = Depends(get_current_admin)):
+    return user_cache.stats()
+
+@router.get("/admin/password-hashing")
+async def password_hashing_stats(current_admin: User = Depends(get_current_admin)):
+    return hash_stats.snapshot()
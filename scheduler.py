@@ -0,0 +1,105 @@
+"""
+Tâches périodiques exécutées dans le process de l'application.
+
+Chaque tâche est une fonction synchrone (accès base via le moteur
+synchrone) lancée dans un thread, pour ne jamais bloquer la boucle
+d'événements qui sert les requêtes. Une tâche qui échoue est journalisée
+et relancée à l'échéance suivante.
+
+Avec plusieurs workers gunicorn, chacun lance ses tâches : elles doivent
+donc être idempotentes. SCHEDULER_ENABLED=false désactive le planificateur
+(par exemple pour ne le garder que sur un conteneur dédié).
+
+Une tâche déclarée `at_startup` est courte et conditionne ce que
+l'application sert : le maître gunicorn la rattrape avant de lancer les
+workers (`catch_up`). Les autres (archivage...) peuvent avoir un arriéré
+long après un arrêt : elles ne retardent pas le démarrage et les workers
+les lancent dès leur démarrage.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+class Job:
+    def __init__(self, name: str, interval: float, fn: Callable[[], Any], at_startup: bool = False):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.at_startup = at_startup
+        self.runs = 0
+        self.failures = 0
+        self.last_result: Any = None
+        self.last_duration: Optional[float] = None
+
+    def run_once(self):
+        start = time.perf_counter()
+        try:
+            self.last_result = self.fn()
+        except Exception:
+            self.failures += 1
+            logger.exception("Scheduled job %s failed", self.name)
+        finally:
+            self.runs += 1
+            self.last_duration = time.perf_counter() - start
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def every(self, seconds: float, name: Optional[str] = None, at_startup: bool = False):
+        """
+        Décorateur : exécute la fonction toutes les `seconds` secondes.
+        `at_startup` : la rattraper au démarrage, avant de servir (voir catch_up).
+        """
+        def decorator(fn):
+            job_name = name or fn.__name__
+            self.jobs[job_name] = Job(job_name, seconds, fn, at_startup)
+            return fn
+        return decorator
+
+    async def _loop(self, job: Job, run_now: bool):
+        # First run right away: catches up on what happened while the app was down
+        # (unless catch_up already ran this job before the workers started)
+        if not run_now:
+            await asyncio.sleep(job.interval)
+        while True:
+            await asyncio.to_thread(job.run_once)
+            await asyncio.sleep(job.interval)
+
+    def catch_up(self, all_jobs: bool = False) -> List[str]:
+        """
+        Exécute une fois, dans le thread courant, les tâches `at_startup`
+        (toutes avec `all_jobs`) : rattrapage au démarrage. Renvoie leurs noms.
+        """
+        jobs = [job for job in self.jobs.values() if all_jobs or job.at_startup]
+        for job in jobs:
+            job.run_once()
+        return [job.name for job in jobs]
+
+    def start(self, caught_up: Iterable[str] = ()):
+        """
+        Lance les tâches sur la boucle courante (à appeler au démarrage de l'app).
+        Les tâches déjà rattrapées (noms renvoyés par `catch_up`) attendent un
+        intervalle complet avant leur première exécution, les autres partent tout de suite.
+        """
+        if self._tasks:
+            return
+        caught_up = set(caught_up)
+        self._tasks = [asyncio.create_task(self._loop(job, job.name not in caught_up), name=f"job:{job.name}")
+                       for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        # A job already running in its thread finishes its current batch
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+scheduler = Scheduler()
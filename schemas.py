@@ -0,0 +1,100 @@
+"""
+Schémas de lecture des routes, et chemin de sérialisation rapide des listes.
+
+Les schémas `*Read` ne contiennent que les colonnes exposées (pas de
+relations ni de champs de table) : leur validation est plus légère que
+celle des modèles `table=True`.
+
+Les routes de liste lisent directement ces colonnes (`read_columns`) :
+SQLAlchemy renvoie des tuples, sans construire d'instances ORM, et
+`json_rows` les encode avec orjson sans repasser par la validation du
+`response_model` (qui reste déclaré pour la documentation OpenAPI).
+Avec `expand`, les éléments sont des dicts (expand.py), encodés de même.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlmodel import SQLModel
+
+from pagination import NEXT_CURSOR_HEADER
+
+class AssociationRead(SQLModel):
+    id: int
+    nom: str
+    lat: float
+    long: float
+    description: str
+
+class TagRead(SQLModel):
+    id: int
+    nom: str
+
+class LieuRead(SQLModel):
+    id: int
+    nom: str
+    lat: float
+    long: float
+    adresse: str
+
+class ConsommableRead(SQLModel):
+    id: int
+    nom: str
+    description: Optional[str] = None
+    quantite: int
+    prix: float
+
+class ObjetRead(SQLModel):
+    id: int
+    nom: str
+    description: str
+    image: Optional[str] = None
+    quantite: int
+    disponibilite_globale: bool
+    tag_id: Optional[int] = None
+    association_id: Optional[int] = None
+    # Only present when expanded
+    tag: Optional[TagRead] = None
+    association: Optional[AssociationRead] = None
+    consommables: Optional[List[ConsommableRead]] = None
+
+class ReservationCreated(SQLModel):
+    """Réservation renvoyée à sa création : colonnes exposées, sans relations."""
+    id: int
+    date_debut: datetime
+    date_fin: datetime
+    status: str
+    user_id: Optional[int] = None
+    objet_id: Optional[int] = None
+    lieu_id: Optional[int] = None
+
+class ReservationRead(ReservationCreated):
+    # Only present when expanded
+    objet: Optional[ObjetRead] = None
+    lieu: Optional[LieuRead] = None
+
+def read_columns(read_model, table_model) -> list:
+    """Colonnes de `table_model` exposées par `read_model`, dans l'ordre du schéma."""
+    columns = table_model.__table__.columns
+    return [getattr(table_model, name) for name in read_model.model_fields if name in columns]
+
+def dump_rows(rows) -> bytes:
+    """Tuples de `select(*read_columns(...))`, ou dicts, encodés en tableau JSON d'objets."""
+    if not rows or isinstance(rows[0], dict):
+        return orjson.dumps(rows)
+    # dict(zip()) is several times faster than Row._asdict()
+    keys = rows[0]._fields
+    return orjson.dumps([dict(zip(keys, row)) for row in rows])
+
+def json_rows(rows, response: Optional[Response] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Réponse JSON d'une liste de lignes. Les en-têtes posés sur la `response`
+    injectée (curseur de pagination) ne sont pas recopiés par FastAPI quand
+    la route renvoie elle-même une Response : on les reprend ici.
+    """
+    headers = dict(headers or {})
+    if response is not None and NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    return Response(dump_rows(rows), media_type=ORJSONResponse.media_type, headers=headers)
@@ -0,0 +1,122 @@
+"""
+Recherche plein texte dans le catalogue d'objets.
+
+Sous SQLite, une table virtuelle FTS5 `objet_fts` indexe le nom, la
+description et le nom du tag de chaque objet. Le tokenizer unicode61
+ignore la casse et les accents ("evenementiel" trouve "Événementiel") et
+les résultats sont classés par pertinence (bm25). Des triggers tiennent
+l'index à jour à chaque écriture sur `objet` ou `tag`, y compris pour les
+insertions en masse qui ne passent pas par l'ORM.
+
+Les autres backends se rabattent sur un filtre ILIKE, sans classement.
+"""
+import re
+from typing import Collection, List, Optional
+
+from sqlalchemy import DDL, and_, column, event, func, literal_column, or_, table, text
+from sqlmodel import Session, select
+
+from models import Objet
+
+FTS_TABLE = "objet_fts"
+# Column weights for bm25: nom, description, tag
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+objet_fts = table(FTS_TABLE, column("rowid"), column("nom"), column("description"), column("tag"))
+
+_TAG_NAME = "(SELECT nom FROM tag WHERE tag.id = new.tag_id)"
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        nom, description, tag, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS objet_fts_insert AFTER INSERT ON objet BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, nom, description, tag)
+        VALUES (new.id, new.nom, new.description, {_TAG_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS objet_fts_update AFTER UPDATE OF nom, description, tag_id ON objet BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, nom, description, tag)
+        VALUES (new.id, new.nom, new.description, {_TAG_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS objet_fts_delete AFTER DELETE ON objet BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS objet_fts_tag_update AFTER UPDATE OF nom ON tag BEGIN
+        UPDATE {FTS_TABLE} SET tag = new.nom
+        WHERE rowid IN (SELECT id FROM objet WHERE tag_id = new.id);
+    END""",
+]
+
+SQLITE_REBUILD = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""INSERT INTO {FTS_TABLE}(rowid, nom, description, tag)
+        SELECT objet.id, objet.nom, objet.description, tag.nom
+        FROM objet LEFT JOIN tag ON tag.id = objet.tag_id""",
+]
+
+# Fresh databases (create_all) get the index with the objet table
+for statement in SQLITE_DDL:
+    event.listen(Objet.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Objet.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+def create_search_index(conn):
+    """Crée l'index et ses triggers sur une base existante, puis le remplit."""
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in SQLITE_DDL + SQLITE_REBUILD:
+        conn.execute(text(statement))
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query)
+
+def fts_query(query: str, column_name: Optional[str] = None) -> Optional[str]:
+    """
+    Traduit une saisie libre en requête FTS5 : chaque mot devient un
+    préfixe ("perc" trouve "perceuse") et tous doivent être présents.
+    """
+    terms = _terms(query)
+    if not terms:
+        return None
+    expression = " ".join(f'"{t}"*' for t in terms)
+    if column_name:
+        expression = f"{{{column_name}}} : ({expression})"
+    return expression
+
+def _match(expression: str):
+    return literal_column(FTS_TABLE).op("MATCH")(expression)
+
+def _like_all(query: str, *columns):
+    return and_(*(or_(*(c.ilike(f"%{t}%") for c in columns)) for t in _terms(query)))
+
+def name_filter(dialect_name: str, nom: str):
+    """Clause WHERE du filtre `nom` de GET /objets."""
+    expression = fts_query(nom, "nom")
+    if dialect_name != "sqlite" or expression is None:
+        return Objet.nom.contains(nom)
+    return Objet.id.in_(select(objet_fts.c.rowid).where(_match(expression)))
+
+def search_objets(session: Session, query: str, limit: int, tag_id: Optional[int] = None,
+                  association_ids: Optional[Collection[int]] = None) -> List[Objet]:
+    """Objets correspondant à `query`, du plus pertinent au moins pertinent."""
+    expression = fts_query(query)
+    if expression is None:
+        return []
+    filters = []
+    if tag_id:
+        filters.append(Objet.tag_id == tag_id)
+    if association_ids is not None:
+        filters.append(Objet.association_id.in_(association_ids))
+
+    if session.get_bind().dialect.name != "sqlite":
+        statement = select(Objet).where(_like_all(query, Objet.nom, Objet.description), *filters)
+        return session.exec(statement.order_by(Objet.id).limit(limit)).all()
+
+    # Rank and cut in the FTS table first, then load only the top rows
+    rank = func.bm25(literal_column(FTS_TABLE), *RANK_WEIGHTS).label("rank")
+    ranked = select(objet_fts.c.rowid.label("id"), rank).where(_match(expression))
+    if filters:
+        ranked = ranked.join(Objet, Objet.id == objet_fts.c.rowid).where(*filters)
+    ranked = ranked.order_by(rank).limit(limit).subquery()
+    statement = select(Objet).join(ranked, ranked.c.id == Objet.id).order_by(ranked.c.rank, Objet.id)
+    return session.exec(statement).all()
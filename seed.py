@@ -2,12 +2,14 @@ from sqlmodel import Session, select
 from database import engine, create_db_and_tables
 from models import User, Tag, Lieu, Consommable, Objet, Association
 from auth import get_password_hash
+import revisions
 
-def seed():
-    create_db_and_tables()
+def seed(create_schema: bool = True):
+    if create_schema:
+        create_db_and_tables()
     with Session(engine) as session:
-        # Check if already seeded
-        if session.exec(select(User).where(User.email == "admin@armoire.com")).first():
+        # Check if already seeded, before any password hashing
+        if session.exec(select(User.id).where(User.email == "admin@armoire.com")).first():
             print("Already seeded.")
             return
 
@@ -82,6 +84,7 @@ def seed():
         # Append consumable
         perceuse.consommables.append(vis)
 
+        revisions.bump(session, revisions.METADATA)
         session.commit()
         print("Seeding complete.")
 
@@ -0,0 +1,139 @@
+"""
+Démarrage de l'application : schéma, données initiales, préchauffage.
+
+Avec gunicorn (gunicorn.conf.py), le schéma (create_all et migrations) et
+les données initiales sont préparés une seule fois, dans le process maître,
+avant le lancement des workers. Le maître y rattrape aussi les tâches
+périodiques courtes qui conditionnent ce qui est servi (`at_startup` :
+passage en retard des réservations) ; les autres, comme l'archivage dont
+l'arriéré peut être long, sont lancées par les workers dès leur démarrage
+sans retarder celui-ci. Chaque worker se contente ensuite de
+préchauffer : connexions du pool, index en mémoire (disponibilités,
+géographie) et première page des listes publiques de métadonnées. Lancée
+seule (`uvicorn main:app`), l'application prépare elle-même la base.
+
+`GET /healthz` répond dès que le process sert des requêtes ; `GET /readyz`
+répond 503 tant que le préchauffage n'est pas terminé ou que la base ne
+répond pas (sonde de disponibilité du répartiteur de charge).
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import availability_counters, lifecycle  # register their background jobs
+from availability import availability_index
+from database import async_engine, create_db_and_tables, engine, get_session
+from geo import association_index, lieu_index
+from replica import read_async_engine, read_engine
+from routers.admin_meta import warm_metadata_cache
+from scheduler import SCHEDULER_ENABLED, scheduler
+
+logger = logging.getLogger(__name__)
+
+# Set by the gunicorn master once the schema is prepared (and the names of the jobs it caught up), inherited by the workers
+SCHEMA_READY_ENV = "ARMOIRE_SCHEMA_READY"
+CAUGHT_UP_ENV = "ARMOIRE_JOBS_CAUGHT_UP"
+SEED_ON_START = os.getenv("SEED_ON_START", "true").strip().lower() in ("1", "true", "yes", "on")
+WARMUP_ENABLED = os.getenv("STARTUP_WARMUP", "true").strip().lower() in ("1", "true", "yes", "on")
+WARM_CONNECTIONS = int(os.getenv("WARM_CONNECTIONS", os.getenv("DB_POOL_SIZE", "5")))
+
+@dataclass
+class StartupState:
+    ready: bool = False
+    caught_up: Tuple[str, ...] = ()
+    warmup_seconds: Optional[float] = None
+
+state = StartupState()
+
+def prepare_database(seed_data: bool = SEED_ON_START, catch_up: bool = SCHEDULER_ENABLED):
+    """Schéma, données initiales et rattrapage des tâches de démarrage, une fois par déploiement (maître gunicorn)."""
+    create_db_and_tables()
+    if seed_data:
+        from seed import seed
+        seed(create_schema=False)
+    if catch_up:
+        os.environ[CAUGHT_UP_ENV] = ",".join(scheduler.catch_up())
+    dispose_engines()
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+def dispose_engines():
+    """
+    Ferme les connexions ouvertes par le maître, sur tous les moteurs
+    (principal, réplica, synchrones et asynchrones) : un worker forké ne
+    doit pas hériter d'une connexion partagée avec un autre process.
+    Chaque worker ouvre les siennes dans warm_up.
+    """
+    for target in (engine, read_engine):
+        if target is not None:
+            target.dispose()
+    # Closing async connections needs a loop of its own: called from the master or a thread
+    async def dispose_async():
+        for target in (async_engine, read_async_engine):
+            if target is not None:
+                await target.dispose()
+    asyncio.run(dispose_async())
+
+async def warm_pool(target, connections: int):
+    """Ouvre `connections` connexions du moteur (pragmas SQLite compris) puis les rend au pool."""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = await target.connect()
+            opened.append(conn)
+            await conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            await conn.close()
+
+def warm_indexes():
+    with Session(engine) as session:
+        availability_index.rebuild(session)
+        association_index.rebuild(session)
+        lieu_index.rebuild(session)
+
+async def warm_up():
+    """Démarrage d'un worker : schéma si le maître ne l'a pas préparé, puis préchauffage."""
+    start = time.perf_counter()
+    if not os.getenv(SCHEMA_READY_ENV):
+        # Alone (no gunicorn master): the scheduler catches up in the background as usual
+        await asyncio.to_thread(prepare_database, False, False)
+    state.caught_up = tuple(name for name in os.getenv(CAUGHT_UP_ENV, "").split(",") if name)
+    if WARMUP_ENABLED:
+        await warm_pool(async_engine, WARM_CONNECTIONS)
+        if read_async_engine is not None:
+            await warm_pool(read_async_engine, WARM_CONNECTIONS)
+        await asyncio.to_thread(warm_indexes)
+        async with AsyncSession(async_engine) as session:
+            await warm_metadata_cache(session)
+    state.warmup_seconds = round(time.perf_counter() - start, 3)
+    state.ready = True
+    logger.info("Worker ready in %.3f s", state.warmup_seconds)
+
+router = APIRouter(tags=["Monitoring"])
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Le process répond (sonde de vivacité)."""
+    return {"status": "ok"}
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz(session: AsyncSession = Depends(get_session)):
+    """Le worker est préchauffé et la base répond (sonde de disponibilité)."""
+    if not state.ready:
+        return ORJSONResponse({"status": "starting"}, status_code=503)
+    try:
+        await session.exec(text("SELECT 1"))
+    except SQLAlchemyError:
+        logger.exception("Readiness check failed")
+        return ORJSONResponse({"status": "database unavailable"}, status_code=503)
+    return {"status": "ready", "warmup_seconds": state.warmup_seconds}
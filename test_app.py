@@ -1,31 +1,7 @@
-from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, create_engine, select
-from main import app
-from database import get_session
-from models import User, Tag, Lieu, Objet, Reservation
+from conftest import client
+from models import User, Tag, Lieu
 from auth import get_password_hash
-import pytest
 from datetime import datetime
-from sqlalchemy.pool import StaticPool
-
-# Use an in-memory SQLite database for testing
-sqlite_url = "sqlite://"
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args, poolclass=StaticPool)
-
-def get_session_override():
-    with Session(engine) as session:
-        yield session
-
-app.dependency_overrides[get_session] = get_session_override
-client = TestClient(app)
-
-@pytest.fixture(name="session")
-def session_fixture():
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
-    SQLModel.metadata.drop_all(engine)
 
 def test_full_flow(session):
     # 1. Create Data
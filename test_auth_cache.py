@@ -0,0 +1,32 @@
+from conftest import client
+from models import User
+from auth import get_password_hash
+
+def login(email, password):
+    res = client.post("/auth/login", data={"username": email, "password": password})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+def test_current_user_is_cached(session):
+    session.add(User(nom="Admin", prenom="A", email="admin@test.com", password_hash=get_password_hash("admin"), is_admin=True))
+    session.commit()
+    headers = login("admin@test.com", "admin")
+
+    before = client.get("/admin/auth-cache", headers=headers).json()
+    assert client.get("/users/me", headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).status_code == 200
+    after = client.get("/admin/auth-cache", headers=headers).json()
+    assert after["hits"] - before["hits"] >= 3
+    assert after["misses"] == before["misses"]
+
+def test_demotion_takes_effect_immediately(session, monkeypatch):
+    monkeypatch.setenv("superUserPassword", "secret123")
+    admin = User(nom="Admin", prenom="A", email="admin@test.com", password_hash=get_password_hash("admin"), is_admin=True)
+    session.add(admin)
+    session.commit()
+    session.refresh(admin)
+    headers = login("admin@test.com", "admin")
+    assert client.get("/admin/auth-cache", headers=headers).status_code == 200
+
+    res = client.post(f"/admin/users/{admin.id}/super-promote", json={"password": "secret123", "is_admin": False})
+    assert res.status_code == 200
+    assert client.get("/admin/auth-cache", headers=headers).status_code == 403
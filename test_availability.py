@@ -0,0 +1,147 @@
+from conftest import client
+from models import User, Lieu, Objet, Reservation
+from auth import get_password_hash
+from availability import AvailabilityIndex
+import revisions
+from datetime import datetime, timedelta
+
+def test_index_counts_and_free_slot(session):
+    start = datetime(2024, 1, 1)
+    objet = Objet(nom="Echelle", description="3m", quantite=2)
+    session.add(objet)
+    session.commit()
+    session.refresh(objet)
+    for days, status in [(0, "active"), (3, "active"), (10, "terminee")]:
+        session.add(Reservation(objet_id=objet.id, date_debut=start + timedelta(days=days),
+                                date_fin=start + timedelta(days=days + 7), status=status))
+    session.commit()
+
+    index = AvailabilityIndex()
+    index.rebuild(session)
+    assert index.booked(objet.id, start, start + timedelta(days=7)) == 2
+    assert index.booked(objet.id, start + timedelta(days=7), start + timedelta(days=14)) == 1
+    assert index.booked(objet.id, start + timedelta(days=10), start + timedelta(days=17)) == 0
+    # Both units are busy until the first reservation ends
+    assert index.earliest_free_slot(objet.id, 2, start) == start + timedelta(days=7)
+    assert index.earliest_free_slot(objet.id, 1, start) == start + timedelta(days=10)
+
+def test_index_follows_writes_from_another_worker(session):
+    objet = Objet(nom="Scie", description="Sauteuse", quantite=1)
+    session.add(objet)
+    session.commit()
+    session.refresh(objet)
+
+    index = AvailabilityIndex()
+    index.rebuild(session)
+    now = datetime.now()
+    assert index.booked(objet.id, now, now + timedelta(days=7)) == 0
+
+    # Another process books the objet: its row carries the bumped revision
+    generation = revisions.bump(session, revisions.RESERVATIONS)
+    session.add(Reservation(objet_id=objet.id, date_debut=now, date_fin=now + timedelta(days=7),
+                            revision=generation))
+    session.commit()
+
+    index.sync(session)
+    assert index.booked(objet.id, now, now + timedelta(days=7)) == 1
+
+def test_sync_applies_missed_writes_without_rebuilding(session, monkeypatch):
+    objet = Objet(nom="Ponceuse", description="Orbitale", quantite=3)
+    session.add(objet)
+    session.commit()
+    index = AvailabilityIndex()
+    index.rebuild(session)
+    generation = index.generation
+    now = datetime.now()
+
+    def book(days):
+        res = Reservation(objet_id=objet.id, date_debut=now + timedelta(days=days),
+                          date_fin=now + timedelta(days=days + 7),
+                          revision=revisions.bump(session, revisions.RESERVATIONS))
+        session.add(res)
+        session.commit()
+        return res
+
+    # Another worker commits first: our own write cannot be applied in order
+    autre = book(0)
+    notre = book(2)
+    index.record(notre, notre.revision)
+    assert index.generation == generation
+
+    def rebuild(session):
+        raise AssertionError("full rebuild")
+    monkeypatch.setattr(index, "rebuild", rebuild)
+    index.sync(session)
+    assert index.generation == notre.revision
+    assert index.booked(objet.id, now + timedelta(days=3), now + timedelta(days=4)) == 2
+
+    # A status change made elsewhere (return, overdue job) is picked up too
+    autre.status = "terminee"
+    autre.revision = revisions.bump(session, revisions.RESERVATIONS)
+    session.commit()
+    index.sync(session)
+    assert index.booked(objet.id, now + timedelta(days=3), now + timedelta(days=4)) == 1
+    # Applying a row a second time does not count it twice
+    index.record(notre, index.generation + 1)
+    assert index.booked(objet.id, now + timedelta(days=3), now + timedelta(days=4)) == 1
+
+def test_reservation_conflict_and_next_free_slot(session):
+    user = User(nom="User", prenom="B", email="user@test.com", password_hash=get_password_hash("user"), is_admin=False)
+    lieu = Lieu(nom="LieuTest", lat=0, long=0, adresse="Street")
+    objet = Objet(nom="Perceuse", description="Puissante", quantite=1)
+    session.add(user)
+    session.add(lieu)
+    session.add(objet)
+    session.commit()
+    session.refresh(lieu)
+    session.refresh(objet)
+
+    res = client.post("/auth/login", data={"username": "user@test.com", "password": "user"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    debut = datetime(2030, 5, 1, 10, 0)
+    payload = {"objet_id": objet.id, "lieu_id": lieu.id, "date_debut": debut.isoformat()}
+    assert client.post("/reservations", json=payload, headers=headers).status_code == 200
+
+    payload["date_debut"] = (debut + timedelta(days=3)).isoformat()
+    res = client.post("/reservations", json=payload, headers=headers)
+    assert res.status_code == 400
+
+    res = client.get(f"/objets/{objet.id}/next_free_slot", params={"after": debut.isoformat()})
+    assert res.status_code == 200
+    assert res.json()["next_free_slot"] == (debut + timedelta(days=7)).isoformat()
+
+def test_calendar(session):
+    objet = Objet(nom="Remorque", description="750kg", quantite=2)
+    autre = Objet(nom="Diable", description="", quantite=1)
+    session.add(objet)
+    session.add(autre)
+    session.commit()
+    session.refresh(objet)
+    session.refresh(autre)
+    debut = datetime(2030, 6, 10, 14, 0)
+    generation = revisions.bump(session, revisions.RESERVATIONS)
+    for days in (0, 3):
+        session.add(Reservation(objet_id=objet.id, date_debut=debut + timedelta(days=days),
+                                date_fin=debut + timedelta(days=days + 7), revision=generation))
+    session.commit()
+
+    res = client.get(f"/objets/{objet.id}/calendar", params={"from": "2030-06-01", "to": "2030-06-30"})
+    assert res.status_code == 200
+    jours = {j["date"]: j for j in res.json()["jours"]}
+    assert len(jours) == 30
+    assert jours["2030-06-09"]["disponible"] == 2
+    assert jours["2030-06-10"]["disponible"] == 1
+    assert jours["2030-06-14"]["disponible"] == 0
+    assert jours["2030-06-20"]["disponible"] == 1
+    assert jours["2030-06-21"]["disponible"] == 2
+    # Matches GET /objets?date_check=<day> for every day
+    for day, jour in jours.items():
+        listed = client.get("/objets", params={"date_check": f"{day}T00:00:00"}).json()
+        assert jour["reservable"] == any(o["id"] == objet.id for o in listed), day
+
+    res = client.get("/objets/calendar", params={"ids": [autre.id, objet.id, 999], "from": "2030-06-14", "to": "2030-06-14"})
+    assert [(c["objet_id"], c["jours"][0]["disponible"]) for c in res.json()] == [(autre.id, 1), (objet.id, 0)]
+
+    assert client.get(f"/objets/{objet.id}/calendar", params={"from": "2030-06-02", "to": "2030-06-01"}).status_code == 400
+    assert client.get(f"/objets/{objet.id}/calendar", params={"from": "2030-01-01", "to": "2031-06-01"}).status_code == 400
@@ -0,0 +1,78 @@
+from conftest import client, engine, login
+from models import Lieu, Objet, ObjetDisponibilite, Reservation
+from availability_counters import check_counters, compute_state, reconcile
+import revisions
+from datetime import datetime, timedelta
+
+def listed_ids():
+    return {o["id"] for o in client.get("/objets").json()}
+
+def test_compute_state():
+    now = datetime(2030, 1, 1)
+    later = (now + timedelta(days=10), now + timedelta(days=17))
+    assert compute_state(1, True, [later], now) == (0, True, later[0] - timedelta(days=7))
+    running = (now - timedelta(days=5), now + timedelta(days=2))
+    assert compute_state(1, True, [running, later], now) == (1, False, now + timedelta(days=2))
+    assert compute_state(2, True, [running, later], now) == (1, True, now + timedelta(days=2))
+    assert compute_state(3, False, [], now) == (0, False, None)
+
+def test_routes_maintain_counters(session):
+    admin = login(session, "admin@test.com", is_admin=True)
+    user = login(session, "user@test.com")
+    lieu = Lieu(nom="LieuTest", lat=0, long=0, adresse="Street")
+    session.add(lieu)
+    session.commit()
+
+    objet_id = client.post("/objets", json={"nom": "Tondeuse", "description": "Thermique"}, headers=admin).json()["id"]
+    assert session.get(ObjetDisponibilite, objet_id).reservable
+    assert objet_id in listed_ids()
+
+    payload = {"objet_id": objet_id, "lieu_id": lieu.id, "date_debut": datetime.now().isoformat()}
+    reservation_id = client.post("/reservations", json=payload, headers=user).json()["id"]
+    session.expire_all()
+    etat = session.get(ObjetDisponibilite, objet_id)
+    assert (etat.reservees, etat.reservable) == (1, False)
+    assert objet_id not in listed_ids()
+
+    client.post(f"/admin/reservations/{reservation_id}/return", headers=admin)
+    session.expire_all()
+    assert session.get(ObjetDisponibilite, objet_id).reservable
+    assert objet_id in listed_ids()
+
+    client.put(f"/admin/objets/{objet_id}/available", params={"available": False}, headers=admin)
+    session.expire_all()
+    assert not session.get(ObjetDisponibilite, objet_id).reservable
+    assert check_counters(session)["mismatches"] == []
+    assert client.get("/admin/objets/counters/check", headers=admin).json()["mismatches"] == []
+
+def test_checker_and_reconciler(session):
+    now = datetime.now()
+    libre = Objet(nom="Scie", description="Sauteuse", quantite=1)
+    prise = Objet(nom="Perceuse", description="Sans fil", quantite=1)
+    session.add(libre)
+    session.add(prise)
+    session.commit()
+    assert reconcile(engine) == 2
+    assert check_counters(session) == {"objets": 2, "stale": 0, "mismatches": []}
+
+    # Written behind the application's back: the counters drift
+    generation = revisions.bump(session, revisions.RESERVATIONS)
+    session.add(Reservation(objet_id=prise.id, date_debut=now, date_fin=now + timedelta(days=7), revision=generation))
+    session.commit()
+    report = check_counters(session)
+    assert [m["objet_id"] for m in report["mismatches"]] == [prise.id]
+    # The drifted counter still says reservable: the index filters the objet out
+    assert listed_ids() == {libre.id}
+
+    assert reconcile(engine) == 1
+    session.expire_all()
+    assert check_counters(session)["mismatches"] == []
+    assert not session.get(ObjetDisponibilite, prise.id).reservable
+
+    # A stale "fully booked" state never hides an objet that became free
+    etat = session.get(ObjetDisponibilite, libre.id)
+    etat.reservable, etat.valide_jusqu_a = False, now - timedelta(minutes=1)
+    session.add(etat)
+    session.commit()
+    assert check_counters(session)["stale"] == 1
+    assert listed_ids() == {libre.id}
@@ -0,0 +1,93 @@
+from sqlmodel import select, func
+from conftest import client
+from models import User, Lieu, Objet, ObjetDisponibilite, Reservation
+from auth import get_password_hash
+from availability import availability_index, count_overlaps, count_overlaps_many
+import pytest
+from datetime import datetime, timedelta
+
+START = datetime(2030, 3, 1, 10, 0)
+
+@pytest.fixture(name="setup")
+def setup_fixture(session):
+    session.add(User(nom="User", prenom="U", email="user@test.com", password_hash=get_password_hash("pw")))
+    lieu = Lieu(nom="LieuTest", lat=0, long=0, adresse="Street")
+    perceuse = Objet(nom="Perceuse", description="Sans fil", quantite=1)
+    echelle = Objet(nom="Echelle", description="3 m", quantite=2)
+    ponceuse = Objet(nom="Ponceuse", description="Orbitale", quantite=1)
+    for row in (lieu, perceuse, echelle, ponceuse):
+        session.add(row)
+    session.commit()
+    res = client.post("/auth/login", data={"username": "user@test.com", "password": "pw"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    return headers, lieu.id, perceuse.id, echelle.id, ponceuse.id
+
+def reservations_count(session):
+    return session.exec(select(func.count(Reservation.id))).one()
+
+def test_availability_for_many_pairs(session, setup):
+    headers, lieu_id, perceuse, echelle, ponceuse = setup
+    client.post("/reservations", json={"objet_id": echelle, "lieu_id": lieu_id, "date_debut": START.isoformat()}, headers=headers)
+    objet = session.get(Objet, ponceuse)
+    objet.disponibilite_globale = False
+    session.add(objet)
+    session.commit()
+
+    demandes = [
+        {"objet_id": echelle, "date_debut": START.isoformat()},
+        {"objet_id": echelle, "date_debut": (START + timedelta(days=7)).isoformat()},
+        {"objet_id": perceuse, "date_debut": START.isoformat()},
+        {"objet_id": ponceuse, "date_debut": START.isoformat()},
+        {"objet_id": 999, "date_debut": START.isoformat()},
+    ]
+    res = client.post("/objets/availability", json=demandes)
+    assert res.status_code == 200
+    assert [(r["objet_id"], r["disponible"], r["reservable"]) for r in res.json()] == [
+        (echelle, 1, True), (echelle, 2, True), (perceuse, 1, True), (ponceuse, 0, False), (999, 0, False),
+    ]
+    assert client.post("/objets/availability", json=demandes * 101).status_code == 400
+
+def test_basket_is_booked_atomically(session, setup):
+    headers, lieu_id, perceuse, echelle, ponceuse = setup
+    basket = [{"objet_id": objet_id, "lieu_id": lieu_id, "date_debut": START.isoformat()}
+              for objet_id in (perceuse, echelle, ponceuse)]
+    res = client.post("/reservations/batch", json=basket, headers=headers)
+    assert res.status_code == 200
+    assert sorted(r["objet_id"] for r in res.json()) == sorted([perceuse, echelle, ponceuse])
+    assert all(r["date_fin"] == (START + timedelta(days=7)).isoformat() for r in res.json())
+    # The revision column is internal
+    assert all("revision" not in r for r in res.json())
+    # Counters and in-memory index follow the whole basket
+    assert session.get(ObjetDisponibilite, perceuse).valide_jusqu_a == START - timedelta(days=7)
+    assert availability_index.generation is not None
+    assert availability_index.booked(echelle, START, START + timedelta(days=7)) == 1
+
+    # The perceuse is taken: nothing from this basket is booked
+    res = client.post("/reservations/batch", json=basket[1:2] + basket[:1], headers=headers)
+    assert res.status_code == 400 and str(perceuse) in res.json()["detail"]
+    assert reservations_count(session) == 3
+
+    # One échelle left: the basket's own lines count against it
+    twice = [basket[1], basket[1]]
+    assert client.post("/reservations/batch", json=twice, headers=headers).status_code == 400
+    later = {**basket[1], "date_debut": (START + timedelta(days=7)).isoformat()}
+    assert client.post("/reservations/batch", json=[later, later], headers=headers).status_code == 200
+
+    assert client.post("/reservations/batch", json=[], headers=headers).status_code == 400
+    unknown = {**basket[0], "objet_id": 999}
+    assert client.post("/reservations/batch", json=[unknown], headers=headers).status_code == 404
+    assert client.post("/reservations/batch", json=basket).status_code == 401
+
+def test_basket_checked_in_database(session, setup):
+    headers, lieu_id, perceuse, echelle, ponceuse = setup
+    # Written behind the index's back: only the locked database check sees it
+    session.add(Reservation(objet_id=ponceuse, date_debut=START, date_fin=START + timedelta(days=7)))
+    session.commit()
+    basket = [{"objet_id": objet_id, "lieu_id": lieu_id, "date_debut": START.isoformat()} for objet_id in (perceuse, ponceuse)]
+    res = client.post("/reservations/batch", json=basket, headers=headers)
+    assert res.status_code == 400
+    assert reservations_count(session) == 1
+
+    windows = [(objet_id, START + timedelta(days=d), START + timedelta(days=d + 7))
+               for objet_id in (perceuse, ponceuse) for d in (-7, -3, 7)]
+    assert count_overlaps_many(session, windows) == [count_overlaps(session, *w) for w in windows] == [0, 0, 0, 0, 1, 0]
@@ -0,0 +1,66 @@
+from sqlmodel import select
+from conftest import client, engine
+from models import User, Tag, Consommable, Objet, ObjetConsommableLink
+from auth import get_password_hash, verify_password
+from bulk_import import import_users, main as bulk_main
+import search
+
+def test_bulk_objets(session, admin_headers):
+    tag = Tag(nom="Bricolage")
+    vis = Consommable(nom="Vis", prix=0.1)
+    session.add(tag)
+    session.add(vis)
+    session.commit()
+
+    rows = [
+        {"nom": "Perceuse", "description": "Filaire", "quantite": 2, "tag_id": tag.id, "consommable_ids": [vis.id]},
+        {"nom": "Scie", "description": "Sauteuse"},
+        {"nom": "Sans description"},
+        {"nom": "Ponceuse", "description": "", "tag_id": 999},
+        {"nom": "Visseuse", "description": "", "consommable_ids": [vis.id, 42]},
+    ]
+    res = client.post("/admin/objets/bulk", json=rows, headers=admin_headers)
+    assert res.status_code == 200
+    report = res.json()
+    assert report["inserted"] == 2
+    assert [e["row"] for e in report["errors"]] == [3, 4, 5]
+    assert "description" in report["errors"][0]["detail"]
+    assert "tag_id=999" in report["errors"][1]["detail"]
+
+    objets = {o.nom: o for o in session.exec(select(Objet)).all()}
+    assert set(objets) == {"Perceuse", "Scie"}
+    assert objets["Perceuse"].quantite == 2
+    links = session.exec(select(ObjetConsommableLink)).all()
+    assert [(l.objet_id, l.consommable_id) for l in links] == [(objets["Perceuse"].id, vis.id)]
+    # Raw inserts reach the full-text index through its triggers
+    assert [o.nom for o in search.search_objets(session, "perc", 10)] == ["Perceuse"]
+
+    # Dry run validates without writing
+    res = client.post("/admin/objets/bulk", params={"dry_run": True}, json=rows[:2], headers=admin_headers)
+    assert res.json()["inserted"] == 2
+    assert len(session.exec(select(Objet)).all()) == 2
+
+    assert client.post("/admin/objets/bulk", json=rows).status_code == 401
+
+def test_bulk_users_and_cli(session, tmp_path, monkeypatch):
+    session.add(User(nom="Deja", prenom="La", email="deja@test.com", password_hash="x"))
+    session.commit()
+
+    report = import_users(session, [
+        {"nom": "A", "prenom": "a", "email": "a@test.com", "password": "secret-a"},
+        {"nom": "B", "prenom": "b", "email": "a@test.com", "password": "secret-b"},
+        {"nom": "C", "prenom": "c", "email": "deja@test.com", "password": "secret-c"},
+    ], hash_many=lambda passwords: [get_password_hash(p) for p in passwords])
+    session.commit()
+    assert report.inserted == 1
+    assert [e["row"] for e in report.errors] == [2, 3]
+    user = session.exec(select(User).where(User.email == "a@test.com")).one()
+    assert verify_password("secret-a", user.password_hash)
+
+    # CLI on the application database
+    import database
+    monkeypatch.setattr(database, "engine", engine)
+    csv_path = tmp_path / "consommables.csv"
+    csv_path.write_text("nom,description,quantite,prix\nVis,Boite de 50,100,5.5\nClous,,200,pas un prix\n", encoding="utf-8")
+    assert bulk_main(["consommables", str(csv_path)]) == 1
+    assert [c.nom for c in session.exec(select(Consommable)).all()] == ["Vis"]
@@ -0,0 +1,99 @@
+from conftest import client, login
+from models import Lieu, Objet, Reservation
+from availability import AvailabilityIndex
+from cache import Validators
+from compression import choose_encoding
+from datetime import datetime, timedelta, timezone
+
+def test_catalogue_revalidation(session, monkeypatch):
+    admin = login(session, "admin@test.com", is_admin=True)
+    user = login(session, "user@test.com")
+    lieu = Lieu(nom="LieuTest", lat=0, long=0, adresse="Street")
+    session.add(lieu)
+    session.commit()
+    objet_id = client.post("/objets", json={"nom": "Tondeuse", "description": "Thermique"}, headers=admin).json()["id"]
+
+    # As if the second of the last write were over (gating: test_last_modified_waits_for_its_second)
+    monkeypatch.setattr(Validators, "_settled", lambda self: True)
+    res = client.get("/objets")
+    etag, last_modified = res.headers["etag"], res.headers["last-modified"]
+    assert etag.startswith('W/"') and res.headers["cache-control"] == "no-cache"
+    assert [o["id"] for o in res.json()] == [objet_id]
+
+    res = client.get("/objets", headers={"If-None-Match": etag})
+    assert res.status_code == 304 and res.content == b""
+    assert res.headers["etag"] == etag
+    assert client.get("/objets", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # If-None-Match takes precedence over If-Modified-Since
+    assert client.get("/objets", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified}).status_code == 200
+    # Each query has its own validator
+    assert client.get("/objets", params={"available": False}).headers["etag"] != etag
+
+    # A booking makes the objet unavailable: the cached page is stale
+    payload = {"objet_id": objet_id, "lieu_id": lieu.id, "date_debut": datetime.now().isoformat()}
+    client.post("/reservations", json=payload, headers=user)
+    res = client.get("/objets", headers={"If-None-Match": etag})
+    assert res.status_code == 200 and res.json() == []
+    etag = res.headers["etag"]
+
+    client.put(f"/admin/objets/{objet_id}/available", params={"available": False}, headers=admin)
+    res = client.get("/objets", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+    client.post("/objets", json={"nom": "Scie", "description": "Sauteuse"}, headers=admin)
+    assert client.get("/objets", headers={"If-None-Match": etag}).status_code == 200
+
+def test_last_change_follows_reservation_windows():
+    index = AvailabilityIndex()
+    index.generation = 0
+    debut = datetime(2030, 6, 10)
+    index.record(Reservation(id=1, objet_id=1, date_debut=debut, date_fin=debut + timedelta(days=7)), 1)
+    # A 7-day booking starting after debut - 7 days overlaps the reservation
+    assert index.last_change(debut - timedelta(days=8)) is None
+    assert index.last_change(debut) == debut - timedelta(days=7)
+    assert index.last_change(debut + timedelta(days=8)) == debut + timedelta(days=7)
+    index.discard(1, 2)
+    assert index.last_change(debut + timedelta(days=8)) is None
+
+def test_large_listings_are_compressed(session):
+    session.add_all(Objet(nom=f"Objet {i}", description="Description assez longue " * 4) for i in range(50))
+    session.commit()
+
+    res = client.get("/objets", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert int(res.headers["content-length"]) < len(res.content) / 3
+    assert len(res.json()) == 50
+
+    assert "content-encoding" not in client.get("/objets", headers={"Accept-Encoding": "identity"}).headers
+    # Small bodies are sent as is
+    assert "content-encoding" not in client.get("/", headers={"Accept-Encoding": "gzip"}).headers
+
+def test_compressed_responses_have_their_own_etag(session):
+    session.add_all(Objet(nom=f"Objet {i}", description="Description assez longue " * 4) for i in range(50))
+    session.commit()
+
+    gzipped = client.get("/objets", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/objets", headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    # Caches keep both encodings apart, compressed or not
+    assert "Accept-Encoding" in gzipped.headers["vary"] and "Accept-Encoding" in plain.headers["vary"]
+
+    res = client.get("/objets", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert res.status_code == 304
+    assert res.headers["etag"] == gzipped.headers["etag"] and "Accept-Encoding" in res.headers["vary"]
+    res = client.get("/objets", headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]})
+    assert res.status_code == 304 and res.headers["etag"] == plain.headers["etag"]
+
+def test_last_modified_waits_for_its_second():
+    now = datetime.now(timezone.utc)
+    # A second write within the same second would not change the HTTP date
+    assert "Last-Modified" not in Validators.of([1], now + timedelta(milliseconds=500)).headers
+    assert "Last-Modified" in Validators.of([1], now - timedelta(seconds=2)).headers
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("deflate") is None
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") in ("br", "gzip")
+    assert choose_encoding("") is None
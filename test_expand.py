@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from conftest import client, async_engine
+from models import Association, Consommable, Lieu, Objet, Reservation, Tag, User
+from auth import get_password_hash
+import pytest
+
+@contextmanager
+def count_queries():
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+def add_objets(session, n):
+    asso = Association(nom="Asso", lat=47.3, long=5.0, description="")
+    vis, clous = Consommable(nom="Vis", prix=0.1), Consommable(nom="Clous", prix=0.05)
+    session.add_all([asso, vis, clous])
+    session.commit()
+    objets = []
+    for i in range(n):
+        tag = Tag(nom=f"Tag {i}")
+        objet = Objet(nom=f"Objet {i}", description="", tag=tag, association_id=asso.id, consommables=[vis, clous][:i % 3])
+        session.add(objet)
+        objets.append(objet)
+    session.commit()
+    return objets
+
+def test_objets_expand(session):
+    add_objets(session, 3)
+    res = client.get("/objets", params={"available": False, "expand": "tag,consommables"})
+    assert res.status_code == 200
+    data = res.json()
+    assert data[0]["tag"]["nom"] == "Tag 0"
+    assert [c["nom"] for c in data[2]["consommables"]] == ["Vis", "Clous"]
+    assert [c["nom"] for c in data[1]["consommables"]] == ["Vis"]
+    assert "association" not in data[0]
+
+    # Without expand the payload is unchanged
+    data = client.get("/objets", params={"available": False}).json()
+    assert set(data[0]) == {"id", "nom", "description", "image", "quantite", "disponibilite_globale", "tag_id", "association_id"}
+
+    assert client.get("/objets", params={"expand": "reservations"}).status_code == 400
+
+@pytest.mark.parametrize("route,params", [
+    ("/objets", {"available": False}),
+    ("/objets", {}),
+    ("/objets/search", {"q": "objet", "limit": 100}),
+])
+def test_objets_expand_query_count(session, route, params):
+    def queries_for_page(limit):
+        params_ = dict(params, limit=limit, expand="tag,association,consommables")
+        with count_queries() as statements:
+            res = client.get(route, params=params_)
+        assert res.status_code == 200
+        assert len(res.json()) == limit
+        return len(statements)
+
+    add_objets(session, 40)
+    client.get(route, params=params)  # build the availability index
+    # A page of 40 objets costs as many queries as a page of 2
+    assert queries_for_page(40) == queries_for_page(2)
+
+def test_reservations_expand_query_count(session):
+    user = User(nom="User", prenom="B", email="user@test.com", password_hash=get_password_hash("user"))
+    lieu = Lieu(nom="Lieu", lat=0, long=0, adresse="Rue")
+    session.add_all([user, lieu])
+    session.commit()
+    start = datetime(2030, 1, 1)
+    for i, objet in enumerate(add_objets(session, 30)):
+        session.add(Reservation(objet_id=objet.id, user_id=user.id, lieu_id=lieu.id, status="terminee",
+                                date_debut=start + timedelta(days=i), date_fin=start + timedelta(days=i + 7)))
+    session.commit()
+    res = client.post("/auth/login", data={"username": "user@test.com", "password": "user"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    def get_page(limit):
+        with count_queries() as statements:
+            res = client.get("/reservations/me", params={"limit": limit, "expand": "objet,lieu"}, headers=headers)
+        return res.json(), len(statements)
+
+    client.get("/reservations/me", headers=headers)  # warm the user cache
+    page, queries = get_page(30)
+    assert page[0]["objet"]["nom"] == "Objet 0"
+    assert "revision" not in page[0]
+    assert page[29]["lieu"]["nom"] == "Lieu"
+    assert get_page(3)[1] == queries
+
+def test_expanded_reservations_hide_revision(session):
+    session.add_all([
+        User(nom="Admin", prenom="A", email="admin@test.com", password_hash=get_password_hash("admin"), is_admin=True),
+        Lieu(nom="Lieu", lat=0, long=0, adresse="Rue"),
+    ])
+    session.commit()
+    objet = add_objets(session, 1)[0]
+    res = client.post("/auth/login", data={"username": "admin@test.com", "password": "admin"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    payload = {"objet_id": objet.id, "lieu_id": 1, "date_debut": datetime(2030, 1, 1).isoformat()}
+    booked = client.post("/reservations", json=payload, headers=headers).json()
+    assert "revision" not in booked
+
+    for route in ("/reservations/me", "/admin/reservations"):
+        items = client.get(route, params={"expand": "objet,lieu"}, headers=headers).json()
+        assert [item["id"] for item in items] == [booked["id"]]
+        assert "revision" not in items[0] and items[0]["objet"]["nom"] == "Objet 0"
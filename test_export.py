@@ -0,0 +1,36 @@
+from conftest import client
+from models import Objet, Reservation
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+def test_export_reservations_ndjson_filters(session, admin_headers):
+    objet = Objet(nom="Drill", description="Powerful")
+    session.add(objet)
+    session.commit()
+    session.refresh(objet)
+    start = datetime(2024, 1, 1)
+    for i, status in enumerate(["active", "terminee", "terminee", "annulee"]):
+        debut = start + timedelta(days=10 * i)
+        session.add(Reservation(objet_id=objet.id, date_debut=debut, date_fin=debut + timedelta(days=7), status=status))
+    session.commit()
+
+    params = {"status": "terminee", "date_from": "2024-01-15T00:00:00"}
+    res = client.get("/admin/export/reservations", params=params, headers=admin_headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["date_debut"] for r in rows] == ["2024-01-21T00:00:00"]
+    assert rows[0]["status"] == "terminee"
+
+def test_export_users_csv_hides_password(session, admin_headers):
+    res = client.get("/admin/export/users", params={"format": "csv"}, headers=admin_headers)
+    assert res.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [r["email"] for r in rows] == ["admin@test.com"]
+    assert "password_hash" not in rows[0]
+
+def test_export_requires_admin(session):
+    res = client.get("/admin/export/objets")
+    assert res.status_code == 401
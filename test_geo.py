@@ -0,0 +1,65 @@
+from conftest import client
+from models import Association, Lieu, Objet
+from geo import haversine_km
+import revisions
+
+DIJON = (47.3220, 5.0415)
+
+def add_all(session, *instances):
+    session.add_all(instances)
+    # Direct writes must announce themselves like the admin routes do
+    revisions.bump(session, revisions.METADATA)
+    session.commit()
+
+def test_haversine():
+    # Dijon - Paris, ~263 km
+    assert 260 < haversine_km(*DIJON, 48.8566, 2.3522) < 266
+    assert haversine_km(*DIJON, *DIJON) == 0
+
+def test_nearby_lieux(session):
+    add_all(
+        session,
+        Lieu(nom="Ressourcerie", lat=47.3220, long=5.0415, adresse="Dijon"),
+        Lieu(nom="Chenove", lat=47.2930, long=5.0050, adresse="Chenôve"),
+        Lieu(nom="Beaune", lat=47.0260, long=4.8400, adresse="Beaune"),
+        Lieu(nom="Paris", lat=48.8566, long=2.3522, adresse="Paris"),
+    )
+    res = client.get("/admin_meta/lieux/nearby", params={"lat": 47.32, "long": 5.04, "k": 3})
+    assert res.status_code == 200
+    data = res.json()
+    assert [l["nom"] for l in data] == ["Ressourcerie", "Chenove", "Beaune"]
+    assert data[0]["distance_km"] < 1
+    assert data[0]["adresse"] == "Dijon"
+
+    res = client.get("/admin_meta/lieux/nearby", params={"lat": 47.32, "long": 5.04, "radius": 10})
+    assert [l["nom"] for l in res.json()] == ["Ressourcerie", "Chenove"]
+
+    # The index follows writes made through the admin routes' revision
+    add_all(session, Lieu(nom="Talant", lat=47.3360, long=5.0040, adresse="Talant"))
+    res = client.get("/admin_meta/lieux/nearby", params={"lat": 47.32, "long": 5.04, "radius": 10})
+    assert [l["nom"] for l in res.json()] == ["Ressourcerie", "Talant", "Chenove"]
+
+    res = client.get("/admin_meta/lieux/nearby", params={"lat": 95, "long": 5.04})
+    assert res.status_code == 422
+
+def test_objets_near_association(session):
+    dijon = Association(nom="Dijon", lat=47.3220, long=5.0415, description="")
+    lyon = Association(nom="Lyon", lat=45.7640, long=4.8357, description="")
+    add_all(session, dijon, lyon)
+    add_all(
+        session,
+        Objet(nom="Perceuse Dijon", description="", association_id=dijon.id),
+        Objet(nom="Perceuse Lyon", description="", association_id=lyon.id),
+    )
+
+    res = client.get("/admin_meta/associations/nearby", params={"lat": 45.75, "long": 4.85, "k": 1})
+    assert [a["nom"] for a in res.json()] == ["Lyon"]
+
+    near_dijon = {"lat": 47.3, "long": 5.0, "radius": 50}
+    res = client.get("/objets", params={"available": False, **near_dijon})
+    assert [o["nom"] for o in res.json()] == ["Perceuse Dijon"]
+    res = client.get("/objets/search", params={"q": "perceuse", **near_dijon})
+    assert [o["nom"] for o in res.json()] == ["Perceuse Dijon"]
+
+    res = client.get("/objets", params={"lat": 47.3, "long": 5.0})
+    assert res.status_code == 400
@@ -0,0 +1,89 @@
+from sqlmodel import select
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import engine
+from lifecycle import archive_reservations, mark_overdue
+from models import Objet, Reservation, ReservationArchive
+from scheduler import Scheduler
+import revisions
+
+NOW = datetime(2024, 6, 1)
+
+def add_reservations(session, specs):
+    objet = Objet(nom="Perceuse", description="Sans fil")
+    session.add(objet)
+    session.commit()
+    ids = {}
+    for name, ended_days_ago, status in specs:
+        res = Reservation(objet_id=objet.id, status=status, date_debut=NOW - timedelta(days=ended_days_ago + 7),
+                          date_fin=NOW - timedelta(days=ended_days_ago))
+        session.add(res)
+        session.commit()
+        ids[name] = res.id
+    return ids
+
+def test_mark_overdue_in_batches(session):
+    ids = add_reservations(session, [
+        ("late", 3, "active"), ("later", 10, "active"), ("grace", 0.5, "active"),
+        ("ongoing", -3, "active"), ("returned", 10, "terminee"),
+    ])
+    before = revisions.current(session, revisions.RESERVATIONS)
+
+    assert mark_overdue(engine, now=NOW, grace=timedelta(days=1), batch_size=1) == 2
+    session.expire_all()
+    statuses = {name: session.get(Reservation, i).status for name, i in ids.items()}
+    assert statuses == {"late": "en_retard", "later": "en_retard", "grace": "active",
+                        "ongoing": "active", "returned": "terminee"}
+    # One bump per batch: availability indexes rebuild
+    assert revisions.current(session, revisions.RESERVATIONS) == before + 2
+    assert mark_overdue(engine, now=NOW, grace=timedelta(days=1)) == 0
+
+def test_archive_moves_old_closed_reservations(session):
+    ids = add_reservations(session, [
+        ("old_done", 400, "terminee"), ("old_cancelled", 500, "annulee"), ("old_late", 400, "en_retard"),
+        ("recent_done", 30, "terminee"), ("active", -3, "active"),
+    ])
+
+    assert archive_reservations(engine, now=NOW, horizon=timedelta(days=365), batch_size=1) == 2
+    remaining = set(session.exec(select(Reservation.id)).all())
+    assert remaining == {ids["old_late"], ids["recent_done"], ids["active"]}
+    archived = session.exec(select(ReservationArchive).order_by(ReservationArchive.id)).all()
+    assert [a.id for a in archived] == [ids["old_done"], ids["old_cancelled"]]
+    assert archived[1].status == "annulee" and archived[1].date_fin == NOW - timedelta(days=500)
+    assert all(a.archived_at == NOW for a in archived)
+
+def test_scheduler_runs_and_survives_failures():
+    scheduler = Scheduler()
+    calls = []
+
+    @scheduler.every(0.01)
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    async def run():
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    job = scheduler.jobs["flaky"]
+    assert job.failures == 1 and job.runs >= 2
+
+def test_scheduler_delays_only_caught_up_jobs():
+    scheduler = Scheduler()
+    calls = []
+    scheduler.every(300, name="overdue", at_startup=True)(lambda: calls.append("overdue"))
+    scheduler.every(300, name="archive")(lambda: calls.append("archive"))
+    assert scheduler.catch_up() == ["overdue"] and calls == ["overdue"]
+
+    async def run():
+        scheduler.start(caught_up=["overdue"])
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    # The archive backlog runs as soon as the worker starts, overdue waits its interval
+    assert calls == ["overdue", "archive"]
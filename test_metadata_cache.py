@@ -0,0 +1,30 @@
+from conftest import client
+from models import User, Tag
+from auth import get_password_hash
+
+def test_tags_etag_and_invalidation(session):
+    admin = User(nom="Admin", prenom="A", email="admin@test.com", password_hash=get_password_hash("admin"), is_admin=True)
+    session.add(admin)
+    session.add(Tag(nom="Bricolage"))
+    session.commit()
+
+    res = client.get("/admin_meta/tags")
+    assert res.status_code == 200
+    assert [t["nom"] for t in res.json()] == ["Bricolage"]
+    etag = res.headers["ETag"]
+
+    # Unchanged data: 304 without body
+    res = client.get("/admin_meta/tags", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["ETag"] == etag
+
+    # An admin write invalidates the cached list
+    res = client.post("/auth/login", data={"username": "admin@test.com", "password": "admin"})
+    admin_headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    assert client.post("/admin_meta/tags", json={"nom": "Jardinage"}, headers=admin_headers).status_code == 200
+
+    res = client.get("/admin_meta/tags", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert [t["nom"] for t in res.json()] == ["Bricolage", "Jardinage"]
+    assert res.headers["ETag"] != etag
@@ -0,0 +1,49 @@
+from conftest import client
+from models import Objet, Tag
+import metrics
+import re
+
+def sample(text, name, **labels):
+    selector = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(rf"^{name}\{{{re.escape(selector)}\}} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+def test_server_timing_counts_queries(session):
+    for i in range(5):
+        session.add(Objet(nom=f"Objet {i}", description="", tag=Tag(nom=f"Tag {i}")))
+    session.commit()
+
+    res = client.get("/objets", params={"available": False, "expand": "tag"})
+    assert res.status_code == 200
+    timing = res.headers["server-timing"]
+    db = re.search(r'db;dur=([\d.]+);desc="(\d+) queries"', timing)
+    # Revision watermark (ETag) + page query + relation reload
+    assert int(db.group(2)) == 3
+    assert re.search(r"app;dur=[\d.]+", timing)
+
+def test_metrics_endpoint(session, monkeypatch):
+    labels = {"method": "GET", "route": "/objets/{objet_id}/next_free_slot", "status": "404"}
+
+    def counts(text):
+        return [
+            sample(text, "http_request_duration_seconds_count", **labels) or 0,
+            sample(text, "http_request_duration_seconds_bucket", **labels, le="+Inf") or 0,
+            sample(text, "http_request_sql_queries_count", method="GET", route=labels["route"]) or 0,
+            sample(text, "http_request_duration_seconds_count", method="GET", route="unmatched", status="404") or 0,
+        ]
+
+    # The registry is process-wide: other test modules may have filled it already
+    before = counts(client.get("/metrics").text)
+    client.get(f"/objets/{12345}/next_free_slot")
+    client.get("/objets/67890/next_free_slot")
+    client.get("/does-not-exist")
+
+    text = client.get("/metrics").text
+    # Raw URLs are folded into their route template
+    assert [after - b for after, b in zip(counts(text), before)] == [2, 2, 2, 1]
+    assert "67890" not in text
+    assert re.search(r"^sql_queries_total \d+$", text, re.MULTILINE)
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,50 @@
+from sqlmodel import SQLModel, create_engine
+from sqlalchemy import inspect, text
+from sqlalchemy.pool import StaticPool
+
+from migrations import migrate, MIGRATIONS
+from models import Reservation, Objet
+
+# Tables as created by the first release, before any migration
+BASELINE_DDL = [
+    """CREATE TABLE objet (
+        id INTEGER NOT NULL, nom VARCHAR NOT NULL, description VARCHAR NOT NULL, image VARCHAR,
+        quantite INTEGER NOT NULL, disponibilite_globale BOOLEAN NOT NULL, tag_id INTEGER,
+        association_id INTEGER, PRIMARY KEY (id),
+        FOREIGN KEY(tag_id) REFERENCES tag (id), FOREIGN KEY(association_id) REFERENCES association (id))""",
+    """CREATE TABLE reservation (
+        id INTEGER NOT NULL, date_debut DATETIME NOT NULL, date_fin DATETIME NOT NULL,
+        status VARCHAR NOT NULL, user_id INTEGER, objet_id INTEGER, lieu_id INTEGER, PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(objet_id) REFERENCES objet (id),
+        FOREIGN KEY(lieu_id) REFERENCES lieu (id))""",
+    "INSERT INTO objet VALUES (1, 'Perceuse', 'Puissante', NULL, 1, 1, NULL, NULL)",
+    "INSERT INTO reservation VALUES (1, '2030-01-01 00:00:00', '2030-01-08 00:00:00', 'active', NULL, 1, NULL)",
+]
+
+def test_migrate_upgrades_baseline_db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        for statement in BASELINE_DDL:
+            conn.execute(text(statement))
+    # Same steps as create_db_and_tables: missing tables, then migrations
+    SQLModel.metadata.create_all(engine)
+    assert "revision" not in {c["name"] for c in inspect(engine).get_columns("reservation")}
+
+    applied = migrate(engine)
+    assert applied == [m[0] for m in MIGRATIONS]
+
+    assert "revision" in {c["name"] for c in inspect(engine).get_columns("reservation")}
+    # Every index the models declare exists once the migrations ran
+    for model in (Reservation, Objet):
+        names = {i["name"] for i in inspect(engine).get_indexes(model.__tablename__)}
+        assert {index.name for index in model.__table__.indexes} <= names
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT objet_id, status, revision FROM reservation")).all() == [(1, "active", None)]
+
+    # Already applied migrations are not replayed
+    assert migrate(engine) == []
+
+def test_migrate_on_fresh_db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    assert migrate(engine) == [m[0] for m in MIGRATIONS]
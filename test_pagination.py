@@ -0,0 +1,44 @@
+from conftest import client
+from models import Tag, Objet, Reservation
+import revisions
+from datetime import datetime, timedelta
+
+def fetch_all(url, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        res = client.get(url, params=params)
+        assert res.status_code == 200
+        pages.append(res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_tags_pagination(session):
+    for i in range(5):
+        session.add(Tag(nom=f"Tag {i}"))
+    session.commit()
+
+    pages = fetch_all("/admin_meta/tags", limit=2)
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert [t["nom"] for p in pages for t in p] == [f"Tag {i}" for i in range(5)]
+
+def test_available_objets_pagination_skips_booked(session):
+    now = datetime.now()
+    objets = [Objet(nom=f"Objet {i}", description="d", quantite=1) for i in range(6)]
+    session.add_all(objets)
+    session.commit()
+    generation = revisions.bump(session, revisions.RESERVATIONS)
+    for objet in objets[1::2]:
+        session.add(Reservation(objet_id=objet.id, date_debut=now, date_fin=now + timedelta(days=7),
+                                revision=generation))
+    session.commit()
+
+    pages = fetch_all("/objets", limit=2)
+    assert [o["nom"] for p in pages for o in p] == ["Objet 0", "Objet 2", "Objet 4"]
+
+def test_invalid_cursor(session):
+    res = client.get("/admin_meta/lieux", params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
@@ -0,0 +1,22 @@
+from conftest import client
+from models import User
+from auth import get_password_hash, hash_stats
+import auth
+
+def test_signup_and_login_record_hash_latency(session):
+    before = hash_stats.snapshot()["count"]
+    payload = {"nom": "Dupont", "prenom": "Jean", "email": "jean@test.com", "password": "secret"}
+    assert client.post("/auth/signup", json=payload).status_code == 200
+    res = client.post("/auth/login", data={"username": "jean@test.com", "password": "secret"})
+    assert res.status_code == 200
+    assert client.post("/auth/login", data={"username": "jean@test.com", "password": "wrong"}).status_code == 401
+    assert hash_stats.snapshot()["count"] - before == 3
+
+def test_login_rejected_when_hash_queue_is_full(session, monkeypatch):
+    session.add(User(nom="User", prenom="B", email="user@test.com", password_hash=get_password_hash("user")))
+    session.commit()
+
+    monkeypatch.setattr(auth, "PASSWORD_HASH_QUEUE", 0)
+    res = client.post("/auth/login", data={"username": "user@test.com", "password": "user"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
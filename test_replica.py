@@ -0,0 +1,80 @@
+from sqlmodel import Session
+from conftest import client, db_path as primary_path
+from database import make_engine, make_async_engine
+from models import Objet
+from availability import availability_index
+import replica
+import revisions
+import pytest
+import os
+from datetime import datetime, timedelta
+
+snapshot_path = f"{primary_path}.snapshot"
+snapshot_engine = make_engine(f"sqlite:///{snapshot_path}", echo=False)
+snapshot_async_engine = make_async_engine(f"sqlite:///{snapshot_path}", echo=False)
+
+@pytest.fixture(name="session")
+def session_fixture(session, monkeypatch):
+    monkeypatch.setattr(replica, "read_async_engine", snapshot_async_engine)
+    monkeypatch.setattr(replica, "status", replica.ReplicaStatus())
+    yield session
+    if os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+
+def add_objet(session, nom):
+    session.add(Objet(nom=nom, description=""))
+    revisions.bump(session, revisions.OBJETS)
+    session.commit()
+
+def listed(available=False):
+    return {o["nom"] for o in client.get("/objets", params={"available": available}).json()}
+
+def test_measure_lag(session):
+    add_objet(session, "Perceuse")
+    replica.backup_sqlite(primary_path, snapshot_path)
+    now = datetime.now()
+    with Session(snapshot_engine) as copie:
+        assert replica.measure_lag(session, copie, now) == 0
+        seen = revisions.watermark(copie, revisions.OBJETS)[1]
+
+    add_objet(session, "Scie")
+    with Session(snapshot_engine) as copie:
+        # Bounded by the age of the last write the replica has seen
+        assert replica.measure_lag(session, copie, now + timedelta(seconds=10)) == pytest.approx(
+            (now + timedelta(seconds=10) - seen).total_seconds())
+    revisions.bump(session, revisions.METADATA)
+    session.commit()
+    with Session(snapshot_engine) as copie:
+        assert replica.measure_lag(session, copie, now) == float("inf")
+
+def test_replica_status():
+    now = datetime.now()
+    status = replica.ReplicaStatus()
+    assert not status.usable(now)
+    status.lag_seconds, status.checked_at = 1.0, now
+    assert status.usable(now + timedelta(seconds=replica.MAX_LAG_SECONDS - 2))
+    # Checks stopped: the lag grows with the age of the last measure
+    assert not status.usable(now + timedelta(seconds=replica.MAX_LAG_SECONDS))
+
+def test_reads_follow_replica_status(session):
+    add_objet(session, "Perceuse")
+    replica.backup_sqlite(primary_path, snapshot_path)
+    add_objet(session, "Scie")
+
+    # Lag not measured yet: reads stay on the primary
+    assert listed() == {"Perceuse", "Scie"}
+
+    replica.status.lag_seconds, replica.status.checked_at = 0.0, datetime.now()
+    assert listed() == {"Perceuse"}
+    assert listed(available=True) == {"Perceuse"}
+    # The lagging snapshot does not send the availability index back in time
+    generation = availability_index.generation
+    assert generation is not None
+    revisions.bump(session, revisions.RESERVATIONS)
+    session.commit()
+    availability_index.sync(session)
+    listed(available=True)
+    assert availability_index.generation == generation + 1
+
+    replica.status.lag_seconds = replica.MAX_LAG_SECONDS + 1
+    assert listed() == {"Perceuse", "Scie"}
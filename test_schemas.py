@@ -0,0 +1,22 @@
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import select
+import orjson
+from datetime import datetime
+
+from models import Association, Objet, Reservation
+from schemas import AssociationRead, ObjetRead, ReservationRead, dump_rows, read_columns
+
+def test_rows_encode_like_the_table_models(session):
+    session.add(Association(nom="Café vélo", lat=47.3, long=5.04, description="Réparation"))
+    session.add(Objet(nom="Clé à pédale", description="15 mm", disponibilite_globale=False))
+    session.add(Reservation(objet_id=1, date_debut=datetime(2030, 5, 1, 10, 0),
+                            date_fin=datetime(2030, 5, 8, 10, 0, 0, 123456)))
+    session.commit()
+
+    for model, read_model in ((Association, AssociationRead), (Objet, ObjetRead), (Reservation, ReservationRead)):
+        rows = session.exec(select(*read_columns(read_model, model))).all()
+        instances = session.exec(select(model)).all()
+        # Same JSON as the generic encoder on ORM instances (dates, booleans, accents),
+        # internal bookkeeping columns aside
+        assert orjson.loads(dump_rows(rows)) == jsonable_encoder(instances, exclude={"revision"})
+    assert dump_rows([]) == b"[]"
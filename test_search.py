@@ -0,0 +1,58 @@
+from conftest import client, engine
+from models import Tag, Objet
+from migrations import migrate
+import pytest
+
+@pytest.fixture(name="catalogue")
+def catalogue_fixture(session):
+    evenementiel = Tag(nom="Événementiel")
+    bricolage = Tag(nom="Bricolage")
+    session.add(evenementiel)
+    session.add(bricolage)
+    session.commit()
+    session.add(Objet(nom="Tonnelle pliante", description="Abri pour fête", tag_id=evenementiel.id))
+    session.add(Objet(nom="Perceuse", description="Perceuse à percussion", tag_id=bricolage.id))
+    session.add(Objet(nom="Scie sauteuse", description="Pour découper le bois, pas une perceuse", tag_id=bricolage.id))
+    session.commit()
+    return {"evenementiel": evenementiel, "bricolage": bricolage}
+
+def search(q, **params):
+    res = client.get("/objets/search", params={"q": q, **params})
+    assert res.status_code == 200
+    return [o["nom"] for o in res.json()]
+
+def test_search_is_accent_insensitive_and_covers_tags(catalogue):
+    assert search("evenementiel") == ["Tonnelle pliante"]
+    assert search("FETE") == ["Tonnelle pliante"]
+
+def test_search_ranks_name_matches_first(catalogue):
+    assert search("perc") == ["Perceuse", "Scie sauteuse"]
+    assert search("perceuse bois") == ["Scie sauteuse"]
+
+def test_search_index_follows_updates(session, catalogue):
+    objet = session.get(Objet, 1)
+    objet.nom = "Barnum"
+    session.add(objet)
+    tag = catalogue["bricolage"]
+    tag.nom = "Outillage"
+    session.add(tag)
+    session.commit()
+
+    assert search("tonnelle") == []
+    assert search("barnum") == ["Barnum"]
+    assert search("outillage") == ["Perceuse", "Scie sauteuse"]
+
+def test_nom_filter_uses_search_index(catalogue):
+    res = client.get("/objets", params={"nom": "SCIE", "available": False})
+    assert [o["nom"] for o in res.json()] == ["Scie sauteuse"]
+
+def test_migration_backfills_existing_catalogue(session, catalogue):
+    # Simulate a database from before the search index
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM objet_fts")
+        conn.exec_driver_sql("DELETE FROM schema_migration WHERE version >= 2")
+    assert search("perceuse") == []
+
+    assert migrate(engine)[0] == 2
+    assert search("perceuse") == ["Perceuse", "Scie sauteuse"]
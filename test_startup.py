@@ -0,0 +1,74 @@
+from sqlmodel import Session, SQLModel, select
+from conftest import client, engine, async_engine
+from migrations import migrate
+from models import Tag, User
+from availability import availability_index
+from routers.admin_meta import metadata_cache
+from scheduler import Scheduler
+import seed
+import startup
+import pytest
+import asyncio
+import os
+
+def create_db_and_tables():
+    SQLModel.metadata.create_all(engine)
+    migrate(engine)
+
+@pytest.fixture(autouse=True)
+def test_database(monkeypatch):
+    # Startup works on the test database, and its flags are restored afterwards
+    monkeypatch.setattr(startup, "create_db_and_tables", create_db_and_tables)
+    monkeypatch.setattr(startup, "engine", engine)
+    monkeypatch.setattr(startup, "async_engine", async_engine)
+    monkeypatch.setattr(seed, "engine", engine)
+    # The background jobs work on the app database: no catch-up here
+    monkeypatch.setattr(startup, "scheduler", Scheduler())
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    monkeypatch.delenv(startup.SCHEMA_READY_ENV, raising=False)
+    monkeypatch.delenv(startup.CAUGHT_UP_ENV, raising=False)
+    yield
+    SQLModel.metadata.drop_all(engine)
+
+def test_prepare_seeds_once(monkeypatch):
+    runs, backlog = [], []
+    startup.scheduler.every(300, name="catch_up", at_startup=True)(lambda: runs.append(1))
+    startup.scheduler.every(300, name="backlog")(lambda: backlog.append(1))
+    startup.prepare_database(seed_data=True, catch_up=True)
+    assert os.environ[startup.SCHEMA_READY_ENV] == "1"
+    # Only startup jobs are caught up in the master: the long ones are left to the workers
+    assert runs == [1] and backlog == []
+    assert os.environ[startup.CAUGHT_UP_ENV] == "catch_up"
+    with Session(engine) as session:
+        assert session.exec(select(User).where(User.email == "admin@armoire.com")).first()
+
+    def no_hashing(password):
+        raise AssertionError("seed passwords hashed again")
+    monkeypatch.setattr(seed, "get_password_hash", no_hashing)
+    startup.prepare_database(seed_data=True, catch_up=False)
+    assert runs == [1]
+
+def test_prepare_leaves_no_connection_to_fork():
+    asyncio.run(startup.warm_pool(async_engine, 2))
+    assert async_engine.sync_engine.pool.checkedin() >= 2
+    startup.prepare_database(seed_data=False, catch_up=False)
+    assert engine.pool.checkedin() == 0
+    assert async_engine.sync_engine.pool.checkedin() == 0
+
+def test_readiness_follows_warm_up():
+    assert client.get("/healthz").json() == {"status": "ok"}
+    assert client.get("/readyz").status_code == 503
+
+    metadata_cache.clear()
+    availability_index.generation = None
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add(Tag(nom="Jardinage"))
+        session.commit()
+    asyncio.run(startup.warm_up())
+
+    res = client.get("/readyz")
+    assert res.status_code == 200 and res.json()["status"] == "ready"
+    assert availability_index.generation is not None
+    # First page of the public lists is already serialized
+    assert metadata_cache.get(("Tag", 100, None), 0) is not None